@@ -0,0 +1,149 @@
+"""Compare the fasttext models: compressed ("mini"), full ("cc") and distilled (game.distill).
+
+    PYTHONPATH=src python -m benchmarks.distilled fr [--pairs 2000] [--output results.json]
+
+Each model available locally is loaded in a fresh process: load time, resident memory after
+the load and after the lookups, and time per lookup are measured. The cosine similarities of
+random pairs of vocabulary words, and of the same pairs with a typo (out of the vocabulary,
+embedded from subwords), are compared to those of the full model (Spearman correlation and
+mean absolute difference), or to the first model available if it is missing.
+"""
+
+import argparse
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from benchmarks.load_players import _rss_mb
+from game.distill import distilled_path
+from game.vocabulary import get_vocabulary
+
+MODELS_DIR = "models"
+VARIANTS = ("cc", "mini", "distilled")  # The first one available is the reference
+
+
+def _available(language: str, variant: str) -> bool:
+    if variant == "cc":
+        return os.path.exists(f"{MODELS_DIR}/cc.{language}.300.bin")
+    if variant == "mini":
+        return os.path.exists(f"{MODELS_DIR}/fasttext-{language}-mini")
+    return os.path.exists(distilled_path(language))
+
+
+def _typo(word: str, rng: random.Random) -> str:
+    """The word with two neighbouring letters swapped, or a letter added to short words"""
+    if len(word) < 4:
+        return word + "e"
+    i = rng.randrange(1, len(word) - 2)
+    return word[:i] + word[i + 1] + word[i] + word[i + 2 :]
+
+
+def word_pairs(language: str, count: int, seed: int = 0) -> Dict[str, List[Tuple[str, str]]]:
+    rng = random.Random(seed)
+    words = get_vocabulary(language).words
+    pairs = [(rng.choice(words), rng.choice(words)) for _ in range(count)]
+    return {
+        "vocabulary": pairs,
+        "typos": [(_typo(a, rng), _typo(b, rng)) for a, b in pairs],
+    }
+
+
+def _measure(
+    language: str, variant: str, groups: Dict[str, List[str]]
+) -> Tuple[Dict, Dict[str, np.ndarray]]:
+    """Run in a fresh process, so that each model starts from the same memory"""
+    from game.embedding_utils import get_vector
+    from game.models import read_fasttext_model
+
+    rss_before = _rss_mb()
+    start = time.perf_counter()
+    model = read_fasttext_model(language, variant)
+    result = {"load_seconds": round(time.perf_counter() - start, 3)}
+    result["rss_mb_loaded"] = round(_rss_mb() - rss_before, 1)
+
+    vectors, lookup_us = {}, {}
+    for name, words in groups.items():
+        start = time.perf_counter()
+        vectors[name] = np.array([get_vector(model, word) for word in words], dtype=np.float32)
+        lookup_us[name] = round((time.perf_counter() - start) / len(words) * 1e6, 1)
+    result["rss_mb_after_lookups"] = round(_rss_mb() - rss_before, 1)
+    result["lookup_us"] = lookup_us
+    return result, vectors
+
+
+def _similarities(vectors: np.ndarray) -> np.ndarray:
+    """Cosine similarities of consecutive rows (the two words of each pair)"""
+    norms = np.linalg.norm(vectors, axis=1)
+    norms[norms == 0] = 1
+    unit = vectors / norms[:, None]
+    return (unit[0::2] * unit[1::2]).sum(axis=1)
+
+
+def _spearman(a: np.ndarray, b: np.ndarray) -> float:
+    ranks_a, ranks_b = a.argsort().argsort(), b.argsort().argsort()
+    return float(np.corrcoef(ranks_a, ranks_b)[0, 1])
+
+
+def run(language: str, pairs_count: int) -> Dict:
+    pairs = word_pairs(language, pairs_count)
+    groups = {name: [word for pair in group for word in pair] for name, group in pairs.items()}
+    results: Dict = {"language": language, "pairs": pairs_count, "models": {}}
+    reference = None
+    for variant in VARIANTS:
+        if not _available(language, variant):
+            print(f"{variant}: not found, skipped")
+            continue
+        with ProcessPoolExecutor(1, mp_context=get_context("spawn")) as pool:
+            result, vectors = pool.submit(_measure, language, variant, groups).result()
+        similarities = {name: _similarities(group) for name, group in vectors.items()}
+        if reference is None:
+            reference = variant, similarities
+        result["agreement"] = {
+            name: {
+                "reference": reference[0],
+                "spearman": round(_spearman(values, reference[1][name]), 4),
+                "mean_abs_diff": round(float(np.abs(values - reference[1][name]).mean()), 4),
+            }
+            for name, values in similarities.items()
+        }
+        results["models"][variant] = result
+        _print(variant, result)
+    return results
+
+
+def _print(variant: str, result: Dict):
+    print(
+        f"{variant}: loaded in {result['load_seconds']:.2f}s, RSS {result['rss_mb_loaded']:.0f} MB "
+        f"({result['rss_mb_after_lookups']:.0f} MB after lookups)"
+    )
+    for name, agreement in result["agreement"].items():
+        print(
+            f"  {name}: {result['lookup_us'][name]:.0f} µs/lookup, "
+            f"Spearman {agreement['spearman']:.3f} and mean |Δcos| "
+            f"{agreement['mean_abs_diff']:.3f} against {agreement['reference']}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("language", choices=["fr", "en"])
+    parser.add_argument("--pairs", type=int, default=2000)
+    parser.add_argument("--output", help="Write the results as JSON")
+    args = parser.parse_args()
+
+    results = run(args.language, args.pairs)
+    if not results["models"]:
+        raise SystemExit(f"No fasttext model of {args.language} in {MODELS_DIR}/")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
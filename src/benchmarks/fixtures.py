@@ -0,0 +1,88 @@
+"""Fixed inputs of the micro-benchmarks: a deterministic embedding model and generated
+Wikipedia-like pages, so that results only change when the code does."""
+
+import random
+import zlib
+from typing import List
+
+import numpy as np
+
+from game.embedding_utils import normalize_word
+from game.vocab_matrix import VocabMatrix
+
+DIM = 300
+BUCKETS = 1 << 14
+
+SENTENCES = [
+    "La guerre de Cent Ans est un conflit entre le royaume de France et le royaume "
+    "d'Angleterre qui dure de 1337 à 1453.",
+    "Les rois de France et les rois d'Angleterre se disputent la couronne pendant plusieurs "
+    "générations, au fil de trêves et de batailles.",
+    "La bataille de Crécy, en 1346, marque la supériorité des archers anglais sur la "
+    "chevalerie française.",
+    "Jeanne d'Arc lève le siège d'Orléans en 1429 et fait sacrer Charles VII à Reims.",
+    "Les chroniqueurs de l'époque décrivent des campagnes dévastées, des villes assiégées et "
+    "des populations décimées par la peste noire.",
+    "Après la bataille de Castillon, les Anglais ne conservent plus que Calais sur le "
+    "continent, jusqu'en 1558.",
+    "Le conflit accélère la formation d'une armée permanente et d'un impôt royal régulier.",
+    "Œuvres, traités et chartes de cette période sont conservés dans les archives "
+    "départementales et nationales.",
+]
+MATH = r'<span class="mwe-math-element"><img alt="{\displaystyle \frac{a^{2}+b_{1}}{2}}"></span>'
+
+
+class HashedModel:
+    """Deterministic fasttext-like model: the mean of hashed character trigram vectors"""
+
+    def __init__(self, dim: int = DIM, buckets: int = BUCKETS, seed: int = 0):
+        self.buckets = np.random.default_rng(seed).standard_normal((buckets, dim), np.float32)
+
+    def __getitem__(self, word: str) -> np.ndarray:
+        padded = f"<{word}>"
+        rows = [
+            zlib.crc32(padded[i : i + 3].encode()) % len(self.buckets)
+            for i in range(max(len(padded) - 2, 1))
+        ]
+        return self.buckets[rows].mean(axis=0)
+
+
+def build_vocab_matrix(model: HashedModel, words: List[str]) -> VocabMatrix:
+    """In-memory vocabulary matrix of the model (as game.vocab_matrix builds on disk)"""
+    words = list(dict.fromkeys(normalize_word(w) for w in words))
+    vectors = np.array([model[word] for word in words], dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return VocabMatrix(vectors, words)
+
+
+def _paragraph(rng: random.Random, nb_sentences: int, words: List[str]) -> str:
+    sentences = [rng.choice(SENTENCES) for _ in range(nb_sentences)]
+    # Vocabulary words give the page as many distinct words as a real article
+    sentences.append(" ".join(rng.choice(words) for _ in range(rng.randint(10, 30))) + ".")
+    return (
+        f"<p>{' '.join(sentences)}"
+        f'<sup class="reference"><a href="#cite_note-{rng.randint(1, 99)}">[1]</a></sup> '
+        f"{MATH if rng.random() < 0.2 else ''} {rng.choice(SENTENCES)}</p>\n"
+    )
+
+
+def wikipedia_html(nb_paragraphs: int, words: List[str], seed: int = 0) -> str:
+    """Page shaped like the output of the Wikipedia parse API (infobox, banners, references,
+    math, navigation boxes), mixing fixed sentences and the given words"""
+    rng = random.Random(seed)
+    parts = [
+        '<div class="mw-parser-output">',
+        "<style>.mw-parser-output .infobox{float:right}</style>",
+        '<table class="infobox"><tr><td><p>' + " ".join(SENTENCES[:3]) + "</p></td></tr></table>",
+        "<p>Cet article est une ébauche concernant l'histoire de France, vous pouvez partager "
+        "vos connaissances en l'améliorant.</p>",
+    ]
+    for i in range(nb_paragraphs):
+        parts.append(_paragraph(rng, rng.randint(2, 5), words))
+        if i % 50 == 49:
+            parts.append(
+                '<div class="navbox"><p>' + " ".join(SENTENCES) + "</p></div>"
+                "<script>mw.loader.load('x');</script>"
+            )
+    parts.append("</div>")
+    return "\n".join(parts)
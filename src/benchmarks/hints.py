@@ -0,0 +1,55 @@
+"""Benchmark of the hint engine: index build time and query latency.
+
+PYTHONPATH=src python -m benchmarks.hints fr [--rebuild] [--queries 200]
+"""
+
+import argparse
+import random
+import time
+
+import numpy as np
+
+from game.hints import HintIndex
+from game.vocab_matrix import build_vocab_matrix, get_vocab_matrix
+
+
+def _percentiles(durations):
+    ms = np.array(durations) * 1000
+    return f"p50 {np.percentile(ms, 50):.2f} ms, p95 {np.percentile(ms, 95):.2f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("language", choices=["fr", "en"])
+    parser.add_argument("--rebuild", action="store_true", help="Time the matrix build too")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.rebuild:
+        from game.models import load_fasttext_model
+
+        model = load_fasttext_model(args.language)
+        start = time.perf_counter()
+        build_vocab_matrix(args.language, model)
+        print(f"Matrix build: {time.perf_counter() - start:.2f}s")
+
+    start = time.perf_counter()
+    matrix = get_vocab_matrix(args.language)
+    if matrix is None:
+        raise SystemExit("No vocabulary matrix: run with --rebuild or python -m game.vocab_matrix")
+    index = HintIndex(matrix)
+    print(f"Index open: {(time.perf_counter() - start) * 1000:.1f} ms for {len(matrix)} words")
+
+    words = random.Random(0).sample(matrix.words, args.queries)
+    for label in ("Uncached query", "Cached query"):
+        durations = []
+        for word in words:
+            start = time.perf_counter()
+            index.nearest_words(word, matrix.lookup(word), args.k)
+            durations.append(time.perf_counter() - start)
+        print(f"{label}: {_percentiles(durations)}")
+
+
+if __name__ == "__main__":
+    main()
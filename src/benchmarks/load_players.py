@@ -0,0 +1,269 @@
+"""Load test of the game engine: simulated players loading games and guessing concurrently.
+
+Cache some pages once (online), then run offline against them and the local model:
+
+    PYTHONPATH=src python -m benchmarks.load_players record fr --random 20 -o articles-fr.json
+    PYTHONPATH=src python -m benchmarks.load_players run articles-fr.json --players 50
+        [--guesses 100] [--output results.json]
+
+Each player loads a game on a random cached page, then guesses vocabulary words mixed with
+words of the article, and starts a new game when it wins. Guess and game-load latencies,
+throughput and RSS over time are printed, and written as JSON with --output.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from types import SimpleNamespace
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from classes import WikipediaPage
+from game.engine import corrections, guess_vectors
+from game.game_logic import build_game_from_title, process_guess, shared_articles
+from game.models import load_fasttext_model
+from game.transport import client_session
+from game.vocabulary import get_vocabulary
+from game.wiki_api import fetch_random_titles, fetch_wikipedia_content
+
+
+def read_cached_pages(path: str) -> Tuple[str, Dict[str, WikipediaPage]]:
+    """Language and pages by title of a file written by the record command"""
+    with open(path, encoding="utf-8") as f:
+        cached = json.load(f)
+    pages = {page["title"]: WikipediaPage(**page) for page in cached["pages"]}
+    if not pages:
+        raise SystemExit(f"No page in {path}")
+    return cached["language"], pages
+
+
+def _rss_mb() -> float:
+    """Resident memory of the process (peak memory where /proc is not available)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except OSError:
+        import resource
+
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3
+
+
+def _latency_summary(durations: List[float]) -> Dict[str, float]:
+    if not durations:
+        return {}
+    ms = np.array(durations) * 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {
+        "count": len(ms),
+        "mean": round(float(ms.mean()), 3),
+        "p50": round(float(p50), 3),
+        "p95": round(float(p95), 3),
+        "p99": round(float(p99), 3),
+        "max": round(float(ms.max()), 3),
+    }
+
+
+def _git_commit():
+    try:
+        result = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True)
+        return result.stdout.strip() or None
+    except OSError:
+        return None
+
+
+class RSSSampler(threading.Thread):
+    """Background thread recording (elapsed seconds, RSS in MB) at a fixed interval"""
+
+    def __init__(self, interval: float):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.samples: List[List[float]] = []
+        self._began = time.perf_counter()
+        self._done = threading.Event()
+
+    def sample(self):
+        self.samples.append([round(time.perf_counter() - self._began, 3), round(_rss_mb(), 1)])
+
+    def run(self):
+        while not self._done.wait(self.interval):
+            self.sample()
+
+    def stop(self):
+        self._done.set()
+        self.join()
+        self.sample()
+
+
+def _play(args, seed: int, pages: Dict[str, WikipediaPage], vocabulary) -> Dict[str, Any]:
+    """One simulated player: games one after the other until it made its guesses"""
+    rng = random.Random(seed)
+    titles = sorted(pages)
+    result = {"guess": [], "load": [], "games": 0, "won": 0, "failed_loads": 0}
+
+    def fetch_page(title, language):
+        return pages[title]
+
+    guesses = 0
+    while guesses < args.guesses and result["failed_loads"] < len(titles):
+        start = time.perf_counter()
+        game = build_game_from_title(rng.choice(titles), args.language, fetch_page=fetch_page)
+        result["load"].append(time.perf_counter() - start)
+        if game is None:
+            result["failed_loads"] += 1
+            continue
+        result["games"] += 1
+
+        # Guesses go through the same entry point as the app's, with a stand-in session
+        session_state = SimpleNamespace(game=game, guess_input="")
+        article_words = [w for w in game.article_words.words if not w.isdigit()] or ["le"]
+        while guesses < args.guesses and not game.won:
+            if rng.random() < args.article_ratio:
+                guess = rng.choice(article_words)
+            else:
+                guess = rng.choice(vocabulary)
+
+            start = time.perf_counter()
+            process_guess(guess, session_state)
+            result["guess"].append(time.perf_counter() - start)
+            guesses += 1
+            if args.think_time:
+                time.sleep(args.think_time / 1000)
+        result["won"] += game.won
+    return result
+
+
+def run(args):
+    args.language, pages = read_cached_pages(args.articles)
+
+    sampler = RSSSampler(args.sample_interval)
+    sampler.sample()
+    start = time.perf_counter()
+    load_fasttext_model(args.language)
+    vocabulary = get_vocabulary(args.language).words
+    model_load = time.perf_counter() - start
+
+    sampler.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.players) as executor:
+        players = list(
+            executor.map(
+                lambda seed: _play(args, seed, pages, vocabulary),
+                range(args.seed, args.seed + args.players),
+            )
+        )
+    duration = time.perf_counter() - start
+    sampler.stop()
+
+    guess_durations = [d for p in players for d in p["guess"]]
+    load_durations = [d for p in players for d in p["load"]]
+    rss = [mb for _, mb in sampler.samples]
+    results = {
+        "config": {k: v for k, v in vars(args).items() if k != "func"},
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "cpus": os.cpu_count(),
+            "commit": _git_commit(),
+        },
+        "model_load_s": round(model_load, 3),
+        "duration_s": round(duration, 3),
+        "guesses": len(guess_durations),
+        "games": sum(p["games"] for p in players),
+        "games_won": sum(p["won"] for p in players),
+        "failed_loads": sum(p["failed_loads"] for p in players),
+        "throughput_guesses_per_s": round(len(guess_durations) / duration, 1),
+        "guess_latency_ms": _latency_summary(guess_durations),
+        "game_load_latency_ms": _latency_summary(load_durations),
+        "rss_mb": {"start": rss[0], "peak": max(rss), "end": rss[-1], "samples": sampler.samples},
+        "caches": {
+            "articles": shared_articles.stats(),
+            "guess_vectors": guess_vectors.stats(),
+            "corrections": corrections.stats(),
+        },
+    }
+
+    guess_ms, load_ms = results["guess_latency_ms"], results["game_load_latency_ms"]
+    print(
+        f"{results['guesses']} guesses in {results['games']} games by {args.players} players "
+        f"in {duration:.2f}s: {results['throughput_guesses_per_s']} guesses/s"
+    )
+    if guess_ms:
+        print(
+            f"Guess: p50 {guess_ms['p50']} ms, p95 {guess_ms['p95']} ms, p99 {guess_ms['p99']} ms"
+        )
+    if load_ms:
+        print(
+            f"Game load: p50 {load_ms['p50']} ms, p95 {load_ms['p95']} ms, max {load_ms['max']} ms"
+        )
+    print(f"RSS: {rss[0]:.0f} MB at start, {max(rss):.0f} MB peak, {rss[-1]:.0f} MB at the end")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"Results written to {args.output}")
+
+
+async def _random_titles(language: str, count: int) -> List[str]:
+    async with client_session() as session:
+        return await fetch_random_titles(session, language, count)
+
+
+def record(args):
+    titles = list(args.titles)
+    if args.random:
+        titles += asyncio.run(_random_titles(args.language, args.random))
+
+    pages = []
+    for title in titles:
+        try:
+            pages.append(asdict(fetch_wikipedia_content(title, args.language)))
+            print(f"Fetched {title}")
+        except Exception as e:
+            print(f"Skipping {title}: {e}")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"language": args.language, "pages": pages}, f, ensure_ascii=False)
+    print(f"{len(pages)} pages written to {args.output}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(required=True)
+
+    record_parser = commands.add_parser("record", help="Cache pages for offline runs (online)")
+    record_parser.add_argument("language", choices=["fr", "en"])
+    record_parser.add_argument("titles", nargs="*", help="Pages to cache")
+    record_parser.add_argument("--random", type=int, default=0, help="Add N random pages")
+    record_parser.add_argument("-o", "--output", required=True)
+    record_parser.set_defaults(func=record)
+
+    run_parser = commands.add_parser("run", help="Run the load test on cached pages (offline)")
+    run_parser.add_argument("articles", help="Pages cached by the record command")
+    run_parser.add_argument("--players", type=int, default=50)
+    run_parser.add_argument("--guesses", type=int, default=100, help="Guesses per player")
+    run_parser.add_argument(
+        "--article-ratio", type=float, default=0.3, help="Share of guesses drawn from the article"
+    )
+    run_parser.add_argument(
+        "--think-time", type=float, default=0, help="Pause between guesses (ms)"
+    )
+    run_parser.add_argument("--sample-interval", type=float, default=0.5, help="RSS sampling (s)")
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--output", help="Write the results as JSON")
+    run_parser.set_defaults(func=run)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Load generator for the game server: concurrent players sending guesses over WebSockets.
+
+PYTHONPATH=src python -m benchmarks.load_server "Tour Eiffel" [--url http://localhost:8080]
+    [--players 200] [--guesses 50] [--http]
+
+Every player plays its own game on the same page (shared by the server), with guesses drawn
+from the vocabulary and a few numbers.
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+import aiohttp
+import numpy as np
+
+from game.vocabulary import get_vocabulary
+
+
+def _guesses(language: str, count: int, seed: int):
+    rng = random.Random(seed)
+    words = get_vocabulary(language).words
+    return [
+        str(rng.randint(1, 2025)) if rng.random() < 0.05 else rng.choice(words)
+        for _ in range(count)
+    ]
+
+
+async def _player(session, args, seed, latencies, errors):
+    async with session.post(
+        f"{args.url}/games", json={"language": args.language, "title": args.title}
+    ) as r:
+        if r.status != 201:
+            errors.append(f"create: HTTP {r.status}")
+            return
+        game_id = (await r.json())["id"]
+
+    guesses = _guesses(args.language, args.guesses, seed)
+    if args.http:
+        for guess in guesses:
+            start = time.perf_counter()
+            async with session.post(
+                f"{args.url}/games/{game_id}/guess", json={"guess": guess}
+            ) as r:
+                reply = await r.json()
+            latencies.append(time.perf_counter() - start)
+            if "error" in reply and reply["error"] != "Game over":
+                errors.append(reply["error"])
+        return
+
+    async with session.ws_connect(f"{args.url}/games/{game_id}/ws") as ws:
+        await ws.receive_json()  # Snapshot of the game
+        for i, guess in enumerate(guesses):
+            start = time.perf_counter()
+            await ws.send_json({"guess": guess, "request": i})
+            reply = await ws.receive_json()
+            latencies.append(time.perf_counter() - start)
+            if "error" in reply and reply["error"] != "Game over":
+                errors.append(reply["error"])
+
+
+async def run(args):
+    latencies, errors = [], []
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        # First game alone: the server fetches and prepares the page once
+        await _player(session, argparse.Namespace(**{**vars(args), "guesses": 1}), -1, [], errors)
+
+        start = time.perf_counter()
+        await asyncio.gather(
+            *(_player(session, args, seed, latencies, errors) for seed in range(args.players))
+        )
+        duration = time.perf_counter() - start
+
+    ms = np.array(latencies) * 1000
+    print(f"{len(latencies)} guesses by {args.players} players in {duration:.2f}s")
+    print(f"Throughput: {len(latencies) / duration:.0f} guesses/s")
+    if len(ms):
+        p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+        print(f"Latency: p50 {p50:.1f} ms, p95 {p95:.1f} ms, p99 {p99:.1f} ms")
+    if errors:
+        print(f"{len(errors)} errors, e.g. {errors[0]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("title", help="Page played by every player")
+    parser.add_argument("--url", default="http://localhost:8080")
+    parser.add_argument("--language", choices=["fr", "en"], default="fr")
+    parser.add_argument("--players", type=int, default=200)
+    parser.add_argument("--guesses", type=int, default=50, help="Guesses per player")
+    parser.add_argument("--http", action="store_true", help="POST guesses instead of WebSockets")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+"""Micro-benchmarks of the per-guess and per-load hot paths, with JSON baselines.
+
+    PYTHONPATH=src python -m benchmarks.micro run [-k guess] [--output results.json]
+        [--compare [baseline.json]] [--tolerance 0.15]
+    PYTHONPATH=src python -m benchmarks.micro compare baseline.json results.json
+
+Inputs are fixed (see benchmarks.fixtures): a hashed trigram model instead of fasttext and
+generated pages, so that only code changes move the numbers. `compare` exits with status 1
+when a median is slower than its baseline by more than the tolerance. `--compare` alone uses
+the committed baseline (src/benchmarks/baseline.json, regenerated with
+`run --output src/benchmarks/baseline.json` when a change is accepted); as its environment
+shows, it is only meaningful on a similar machine.
+"""
+
+import argparse
+import json
+import os
+import platform
+import re
+import sys
+import time
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+from benchmarks.fixtures import HashedModel, build_vocab_matrix, wikipedia_html
+from classes import ArticleIndex, WikipediaPage
+from game.embedding_utils import compute_similarity, tokenize_text, words_match
+from game.engine import Game, corrections, get_guess_vector, guess_vectors
+from game.game_logic import feedback_for, process_guess
+from game.vocab_matrix import set_vocab_matrix
+from game.vocabulary import get_vocabulary
+from game.wiki_api import extract_first_paragraphs, latex_to_plain
+
+LANGUAGE = "fr"
+MIN_TIME = 0.5  # Seconds spent measuring each benchmark (at least MIN_ROUNDS calls)
+MIN_ROUNDS = 5
+MAX_ROUNDS = 2000
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+class Benchmark(NamedTuple):
+    name: str
+    run: Callable[[Any], Any]
+    setup: Optional[Callable[[], Any]] = None  # Fresh state for each call, not timed
+
+
+class Fixtures:
+    def __init__(self):
+        self.model = HashedModel()
+        words = get_vocabulary(LANGUAGE).words
+        # Vocabulary lookups as in production, with vectors of the fixed model
+        set_vocab_matrix(LANGUAGE, build_vocab_matrix(self.model, list(words[:20000])))
+
+        self.small_html = wikipedia_html(15, words[:20000], seed=1)
+        self.huge_html = wikipedia_html(3000, words[:20000], seed=2)
+        self.page = WikipediaPage(
+            "Guerre de Cent Ans", extract_first_paragraphs(self.small_html), "url"
+        )
+        self.long_text = " ".join(
+            re.sub(r"<[^>]+>", " ", self.huge_html).split()[:20000]
+        )  # 20,000 words, far more than an extracted article
+        self.article_data = tokenize_text(self.page.text, self.model)
+        self.title_data = tokenize_text(self.page.title, self.model)
+        self.guess_vector = get_guess_vector("bataille", LANGUAGE, self.model)
+        self.word_pairs = [(w, v) for w in self.article_data.words[:40] for v in words[:25]]
+        self.latex = r"{\displaystyle \textstyle  E=mc^{2}\quad  \frac{a}{b}}  " * 20
+
+    def game(self) -> Game:
+        """Fresh game on the fixture page, with cold guess caches"""
+        guess_vectors.clear()
+        corrections.clear()
+        return Game(
+            LANGUAGE,
+            self.page,
+            ArticleIndex(self.article_data),
+            ArticleIndex(self.title_data),
+            self.model,
+        )
+
+    def played_game(self) -> Game:
+        game = self.game()
+        for guess in ("guerre", "bataille", "roi", "1340", "anglais"):
+            game.guess(guess)
+        return game
+
+
+def suite(fx: Fixtures) -> List[Benchmark]:
+    from ui.display_article import build_display_parts  # Imports Streamlit
+
+    def guess(path, word):
+        return Benchmark(f"guess/{path}", lambda game: feedback_for(game.guess(word)), fx.game)
+
+    def rendered_game():
+        game = fx.played_game()
+        build_display_parts(game, game.article_words, fx.page.text, game.guesses[-1])
+        game.guess("couronne")
+        return game
+
+    return [
+        Benchmark("tokenize_text/article", lambda _: tokenize_text(fx.page.text, fx.model)),
+        Benchmark("tokenize_text/20k_words", lambda _: tokenize_text(fx.long_text, fx.model)),
+        Benchmark(
+            "compute_similarity",
+            lambda words: compute_similarity(fx.guess_vector, words, set()),
+            lambda: ArticleIndex(fx.article_data),
+        ),
+        guess("hit", "guerre"),  # Reveals words
+        guess("similar", "guerrier"),  # Closest guess of hidden words
+        guess("miss", "maison"),  # Vocabulary word, nothing close in the page
+        guess("corrected", "ordinateru"),  # Typo corrected against the vocabulary
+        guess("no_close_word", "zzkqw"),  # Vocabulary scanned for nothing
+        guess("number", "1340"),
+        Benchmark(
+            "process_guess",
+            lambda state: process_guess("couronne", state),
+            lambda: SimpleNamespace(game=fx.played_game(), guess_input=""),
+        ),
+        Benchmark(
+            "words_match/1000_pairs", lambda _: [words_match(w, v) for w, v in fx.word_pairs]
+        ),
+        Benchmark(
+            "extract_first_paragraphs/small",
+            lambda _: extract_first_paragraphs(fx.small_html),
+        ),
+        Benchmark(
+            "extract_first_paragraphs/huge",
+            lambda _: extract_first_paragraphs(fx.huge_html),
+        ),
+        Benchmark("latex_to_plain", lambda _: latex_to_plain(fx.latex)),
+        Benchmark(
+            "build_display_parts/first",
+            lambda game: build_display_parts(
+                game, game.article_words, fx.page.text, game.guesses[-1]
+            ),
+            fx.played_game,
+        ),
+        Benchmark(
+            "build_display_parts/after_guess",
+            lambda game: build_display_parts(
+                game, game.article_words, fx.page.text, game.guesses[-1]
+            ),
+            rendered_game,
+        ),
+    ]
+
+
+def measure(benchmark: Benchmark) -> Dict[str, float]:
+    durations = []
+    started = time.perf_counter()
+    while len(durations) < MAX_ROUNDS and (
+        len(durations) < MIN_ROUNDS or time.perf_counter() - started < MIN_TIME
+    ):
+        state = benchmark.setup() if benchmark.setup else None
+        start = time.perf_counter()
+        benchmark.run(state)
+        durations.append(time.perf_counter() - start)
+
+    ms = np.array(durations) * 1000
+    return {
+        "median_ms": round(float(np.median(ms)), 5),
+        "min_ms": round(float(ms.min()), 5),
+        "mean_ms": round(float(ms.mean()), 5),
+        "stddev_ms": round(float(ms.std()), 5),
+        "rounds": len(ms),
+    }
+
+
+def compare(baseline: Dict, current: Dict, tolerance: float, partial: bool = False) -> bool:
+    """Print the change of each median, and return whether none regressed (partial: only some
+    benchmarks were run)"""
+    ok = True
+    for name, result in current["benchmarks"].items():
+        base = baseline["benchmarks"].get(name)
+        if base is None:
+            print(f"  {name:<36} new")
+            continue
+        ratio = result["median_ms"] / base["median_ms"]
+        flag = ""
+        if ratio > 1 + tolerance:
+            flag, ok = "  REGRESSION", False
+        elif ratio < 1 - tolerance:
+            flag = "  improved"
+        print(
+            f"  {name:<36} {base['median_ms']:>10.4f} -> {result['median_ms']:>10.4f} ms "
+            f"({ratio - 1:+.1%}){flag}"
+        )
+    if not partial:
+        for name in baseline["benchmarks"].keys() - current["benchmarks"].keys():
+            print(f"  {name:<36} missing")
+    return ok
+
+
+def _load(path: str) -> Dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def run(args):
+    fx = Fixtures()
+    results = {}
+    for benchmark in suite(fx):
+        if args.k and args.k not in benchmark.name:
+            continue
+        results[benchmark.name] = measure(benchmark)
+        r = results[benchmark.name]
+        print(
+            f"{benchmark.name:<36} median {r['median_ms']:>10.4f} ms  "
+            f"min {r['min_ms']:>10.4f} ms  ({r['rounds']} rounds)"
+        )
+
+    current = {
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+        },
+        "benchmarks": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=2)
+        print(f"Results written to {args.output}")
+    if args.compare:
+        print(f"Compared to {args.compare}:")
+        if not compare(_load(args.compare), current, args.tolerance, partial=bool(args.k)):
+            sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(required=True)
+
+    run_parser = commands.add_parser("run", help="Run the benchmarks")
+    run_parser.add_argument("-k", help="Only run benchmarks whose name contains this")
+    run_parser.add_argument("--output", help="Write the results as JSON (e.g. a new baseline)")
+    run_parser.add_argument(
+        "--compare",
+        nargs="?",
+        const=BASELINE,
+        help="Baseline to compare the results to (default: the committed one)",
+    )
+    run_parser.add_argument("--tolerance", type=float, default=0.15)
+    run_parser.set_defaults(func=run)
+
+    compare_parser = commands.add_parser("compare", help="Compare two result files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--tolerance", type=float, default=0.15)
+    compare_parser.set_defaults(
+        func=lambda args: sys.exit(
+            0 if compare(_load(args.baseline), _load(args.current), args.tolerance) else 1
+        )
+    )
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""Solver bot playing whole games, as a reproducible end-to-end workload.
+
+    PYTHONPATH=src python -m benchmarks.solver articles-fr.json [--games 10] [--seed 0]
+        [--max-guesses 1000] [--output solver.json]
+
+The bot only uses what a player sees (revealed words, lengths of the hidden words and their
+closest guess): it guesses the vocabulary words closest to its best orange guesses, keeps
+trying frequent words, and sometimes makes typos or guesses numbers. With the same pages and
+seed it sends the same guesses, so guesses-to-win and CPU time per game can be compared
+between versions. Pages are cached with `python -m benchmarks.load_players record`.
+"""
+
+import argparse
+import json
+import random
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from benchmarks.load_players import read_cached_pages
+from game.embedding_utils import normalize_word
+from game.engine import Game
+from game.game_logic import build_game_from_title, process_guess
+from game.hints import HintIndex, get_hint_index
+from game.vocabulary import get_vocabulary
+
+NB_NEIGHBOURS = 50  # Vocabulary words considered around each orange guess
+OPENING_RATE = 0.3  # Share of guesses taken from the frequent words even with orange guesses
+
+
+class SolverBot:
+    """Picks the next guess of a game from the feedback shown to the player"""
+
+    def __init__(
+        self,
+        game: Game,
+        rng: random.Random,
+        index: Optional[HintIndex],
+        typo_rate: float,
+        number_rate: float,
+    ):
+        self.game = game
+        self.rng = rng
+        self.index = index
+        self.typo_rate = typo_rate
+        self.number_rate = number_rate
+        self.opening = iter(get_vocabulary(game.language).words)  # Most frequent words first
+        self.neighbours: Dict[str, List[str]] = {}  # Closest vocabulary words of each guess
+
+    def _guessed(self, word: str) -> bool:
+        return normalize_word(word) in self.game.guesses
+
+    def _neighbours(self, guess: str) -> List[str]:
+        if guess not in self.neighbours:
+            vector = self.index.matrix.lookup(normalize_word(guess))
+            rows = self.index.search(vector, NB_NEIGHBOURS) if vector is not None else []
+            self.neighbours[guess] = [self.index.matrix.words[row] for row, _ in rows]
+        return self.neighbours[guess]
+
+    def _orange_candidate(self) -> Optional[str]:
+        """Unplayed neighbour of the length of a hidden word, around its closest guess (title
+        words first, then the closest guesses first)"""
+        if self.index is None:
+            return None
+        hidden = [
+            (section, -words.best_similarity[t], len(words.words[t]), words.best_guess[t])
+            for section, words in enumerate((self.game.title_words, self.game.article_words))
+            for t in range(words.nb_types)
+            if words.best_guess[t]
+            and words.normalized[t] not in self.game.revealed
+            and not words.words[t].isdigit()
+        ]
+        for _, _, length, guess in sorted(hidden):
+            for word in self._neighbours(guess):
+                if len(word) == length and not self._guessed(word):
+                    return word
+        return None
+
+    def _typo(self, word: str) -> str:
+        i = self.rng.randrange(len(word) - 1)
+        if self.rng.random() < 0.5:
+            return word[:i] + word[i + 1] + word[i] + word[i + 2 :]  # Swapped letters
+        return word[:i] + word[i + 1 :]  # Missing letter
+
+    def next_guess(self) -> Optional[str]:
+        if self.rng.random() < self.number_rate:
+            return str(self.rng.randint(1000, 2025))
+
+        word = None
+        if self.rng.random() >= OPENING_RATE:
+            word = self._orange_candidate()
+        while word is None:
+            word = next(self.opening, None)
+            if word is None:
+                return None  # Vocabulary exhausted
+            if self._guessed(word):
+                word = None
+
+        if len(word) > 3 and self.rng.random() < self.typo_rate:
+            return self._typo(word)
+        return word
+
+
+def play(title: str, args, pages, index) -> Dict[str, Any]:
+    """Play one game to the end and measure it"""
+    game = build_game_from_title(title, args.language, fetch_page=lambda t, lang: pages[t])
+    if game is None:
+        return {"title": title, "error": "No usable text"}
+
+    session_state = SimpleNamespace(game=game, guess_input="")
+    bot = SolverBot(game, random.Random(f"{args.seed}:{title}"), index, args.typos, args.numbers)
+    counts = {"misses": 0, "numbers": 0, "repeats": 0}
+    engine_cpu = 0.0
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+
+    while not game.won and len(game.guesses) < args.max_guesses:
+        guess = bot.next_guess()
+        if guess is None:
+            break
+        counts["numbers"] += guess.isdigit()
+
+        start = time.process_time()
+        text, color = process_guess(guess, session_state)
+        engine_cpu += time.process_time() - start
+
+        counts["misses"] += color == "red"
+        counts["repeats"] += "déjà" in text
+
+    if not game.won:
+        game.reveal_all()  # Give up, as a player would
+
+    return {
+        "title": title,
+        "won": game.won,
+        "guesses": len(game.guesses),
+        "revealed_words": len(game.revealed),
+        **counts,
+        "engine_cpu_s": round(engine_cpu, 4),
+        "total_cpu_s": round(time.process_time() - cpu_start, 4),
+        "wall_s": round(time.perf_counter() - wall_start, 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("articles", help="Pages cached by `benchmarks.load_players record`")
+    parser.add_argument("--games", type=int, default=0, help="Number of pages (all by default)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-guesses", type=int, default=1000, help="Give up after")
+    parser.add_argument("--typos", type=float, default=0.05, help="Share of misspelled guesses")
+    parser.add_argument("--numbers", type=float, default=0.03, help="Share of number guesses")
+    parser.add_argument("--output", help="Write the results as JSON")
+    args = parser.parse_args()
+
+    args.language, pages = read_cached_pages(args.articles)
+    titles = sorted(pages)[: args.games or None]
+    index = get_hint_index(args.language)
+    if index is None:
+        print("No vocabulary matrix: the bot only guesses frequent words (game.vocab_matrix)")
+
+    games = []
+    for title in titles:
+        result = play(title, args, pages, index)
+        games.append(result)
+        if "error" in result:
+            print(f"{title}: {result['error']}")
+        else:
+            print(
+                f"{title}: {'won' if result['won'] else 'lost'} in {result['guesses']} guesses, "
+                f"{result['engine_cpu_s']:.3f}s engine CPU, {result['total_cpu_s']:.3f}s total"
+            )
+
+    played = [g for g in games if "error" not in g]
+    if not played:
+        raise SystemExit("No game could be played")
+    won = [g for g in played if g["won"]]
+    summary = {
+        "games": len(played),
+        "won": len(won),
+        "median_guesses_to_win": float(np.median([g["guesses"] for g in won])) if won else None,
+        "guesses": sum(g["guesses"] for g in played),
+        "engine_cpu_s": round(sum(g["engine_cpu_s"] for g in played), 4),
+        "engine_cpu_ms_per_guess": round(
+            1000 * sum(g["engine_cpu_s"] for g in played) / sum(g["guesses"] for g in played), 4
+        ),
+        "total_cpu_s": round(sum(g["total_cpu_s"] for g in played), 4),
+    }
+    print(
+        f"{summary['won']}/{summary['games']} won, median {summary['median_guesses_to_win']} "
+        f"guesses to win, {summary['engine_cpu_ms_per_guess']} ms engine CPU per guess"
+    )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "summary": summary, "games": games}, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""Cold start of the Streamlit app: time to the first paint of the language menu, and what
+it imports.
+
+    PYTHONPATH=src python -m benchmarks.startup report [--top 20]
+    PYTHONPATH=src python -m benchmarks.startup check [--budget 800] [--runs 3]
+
+Each run is a fresh process rendering web_viewer.py headless (streamlit.testing), with the
+warmup disabled so that only the menu itself is measured. Importing Streamlit is not
+counted: the server pays it once, before any session. `report` lists the slowest imports of
+the first paint (python -X importtime). `check` exits with status 1 when the median paint
+is over the budget or when the menu imports one of the modules that must stay deferred;
+tests/test_startup.py runs the same check with pytest.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(SRC_DIR, "web_viewer.py")
+PAINT_BUDGET_MS = 800
+# Needed by the game screens only: imported by the menu, they would delay its first paint
+DEFERRED = (
+    "aiohttp",
+    "requests",
+    "numpy",
+    "bs4",
+    "regex",
+    "streamlit_searchbox",
+    "compress_fasttext",
+    "sklearn",
+    "sentence_transformers",
+    "game.game_logic",
+    "game.wiki_api",
+)
+MARKER = "--- first paint"
+
+CHILD = f"""
+import json, sys, time
+import streamlit
+from streamlit.testing.v1 import AppTest
+before = set(sys.modules)
+print({MARKER!r}, file=sys.stderr, flush=True)
+start = time.perf_counter()
+app = AppTest.from_file({APP!r}, default_timeout=60)
+app.run()
+paint_ms = (time.perf_counter() - start) * 1000
+print(json.dumps({{
+    "paint_ms": paint_ms,
+    "imported": sorted(set(sys.modules) - before),
+    "exceptions": [e.value for e in app.exception],
+    "buttons": [b.label for b in app.button],
+}}))
+"""
+
+
+def _run_child(*flags: str) -> Tuple[Dict, str]:
+    env = dict(os.environ, PEDANTIX_WARMUP="0", PYTHONPATH=SRC_DIR)
+    result = subprocess.run(
+        [sys.executable, *flags, "-c", CHILD],
+        capture_output=True,
+        text=True,
+        env=env,
+        cwd=os.path.dirname(SRC_DIR),  # Repository root, as `streamlit run`
+        check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1]), result.stderr
+
+
+def first_paint() -> Dict:
+    """Time and imports of the first paint of the menu, in a fresh process"""
+    return _run_child()[0]
+
+
+def import_times() -> List[Tuple[float, float, str]]:
+    """(cumulative ms, self ms, module) of the top-level imports of the first paint"""
+    _, stderr = _run_child("-X", "importtime")
+    lines = stderr.split(MARKER, 1)[-1].splitlines()
+    times = []
+    for line in lines:
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        own, cumulative, name = line.removeprefix("import time:").split("|")
+        if not name.startswith("  "):  # Nested imports are indented
+            times.append((int(cumulative) / 1000, int(own) / 1000, name.strip()))
+    return times
+
+
+def report(args):
+    times = import_times()
+    print(f"{'cumulative':>12} {'self':>9}  module")
+    for cumulative, own, name in sorted(times, reverse=True)[: args.top]:
+        print(f"{cumulative:10.1f}ms {own:7.1f}ms  {name}")
+    print(f"{sum(t[0] for t in times):10.1f}ms in {len(times)} top-level imports")
+
+
+def problems(runs: List[Dict], budget: float) -> List[str]:
+    """What is wrong with the first paints of runs, if anything"""
+    found = []
+    if runs[0]["exceptions"]:
+        found.append(f"The menu raised: {runs[0]['exceptions']}")
+    deferred = [
+        name
+        for name in runs[0]["imported"]
+        if any(name == d or name.startswith(f"{d}.") for d in DEFERRED)
+    ]
+    roots = sorted({name for name in deferred if name.split(".")[0] == name} or set(deferred))
+    if deferred:
+        found.append(f"The menu imports modules that should be deferred: {', '.join(roots)}")
+    median = statistics.median(run["paint_ms"] for run in runs)
+    if median > budget:
+        found.append(f"Median first paint {median:.0f} ms, over the budget of {budget:.0f} ms")
+    return found
+
+
+def check(args):
+    runs = []
+    for i in range(args.runs):
+        run = first_paint()
+        runs.append(run)
+        print(f"Run {i + 1}: first paint in {run['paint_ms']:.0f} ms")
+
+    found = problems(runs, args.budget)
+    for problem in found:
+        print(problem)
+    if found:
+        sys.exit(1)
+    median = statistics.median(run["paint_ms"] for run in runs)
+    print(f"Median first paint {median:.0f} ms, within the budget of {args.budget:.0f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the cold start of the app")
+    commands = parser.add_subparsers(required=True)
+
+    report_parser = commands.add_parser("report", help="Slowest imports of the first paint")
+    report_parser.add_argument("--top", type=int, default=20)
+    report_parser.set_defaults(func=report)
+
+    check_parser = commands.add_parser("check", help="Check the first paint against a budget")
+    check_parser.add_argument("--budget", type=float, default=PAINT_BUDGET_MS, help="In ms")
+    check_parser.add_argument("--runs", type=int, default=3)
+    check_parser.set_defaults(func=check)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,9 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import TYPE_CHECKING, Any, Dict, List, Optional, Set, cast
+from typing import Iterator, List, Optional, Tuple
 
-import streamlit as st
-
-if TYPE_CHECKING:
-    import numpy as np
+import numpy as np
 
 
 @dataclass
@@ -21,104 +18,108 @@ class WikipediaPage:
     title: str
     text: str  # Initially, text is the HTML of the page, and then the selected
     url: str
+    extracted: bool = False  # Whether text already holds the selected paragraphs
 
 
-@dataclass
-class WordInfo:
-    word: str
-    embedding: np.ndarray
-    normalized: str  # The word without accent and capital letter
-    start: int  # Start/End positon of word to place it
-    end: int
-    best_guess: Optional[str] = None  # The most similar guess found
-    best_similarity: float = 0.0  # Its similarity score
-
-
-class SessionState:
-    _defaults: Dict[str, Any] = {
-        "phase": "language",  # Current screen: language | mode | choose | play
-        "batch_titles": [],  # Random batch titles offered in the pass-and-play chooser
-        "language": None,  # The language we play the game with ('en' or 'fr')
-        "all_words": [],  # List of all words in the language
-        "article": None,  # The fetched article (WikipediaPage type)
-        "titles": [],  # The list of potential titles that could have been chosen
-        "liked_titles": [],  # The titles that the user liked
-        "article_words": [],  # The words of the article (WordInfo type)
-        "title_words": [],  # The words of the title
-        "model": None,  # Fasttext model
-        "game_won": False,  # State of the game
-        "revealed": set(),  # Set of revealed words (normalized)
-        "revealed_end": set(),  # Set of revealed words at the end (normalized)
-        "guesses": [],  # List of guesses made
-        "guess_input": "",  # The user's input
-        "feedback_color": "555",  # Color of the feedback
-        "feedback_content": "💡 Tapez un mot dans la barre !",  # Feedback for the last guess
-    }
-
-    def __init__(self):
-        for key, value in self._defaults.items():
-            st.session_state.setdefault(key, value)
-
-    def _get(self, key: str) -> Any:
-        return st.session_state.get(key, self._defaults[key])
-
-    def _set(self, key: str, value: Any):
-        st.session_state[key] = value
-
-    phase: str = property(
-        lambda self: cast(str, self._get("phase")), lambda self, v: self._set("phase", v)
-    )
-    batch_titles: List[str] = property(
-        lambda self: cast(List[str], self._get("batch_titles")),
-        lambda self, v: self._set("batch_titles", v),
-    )
-    language: Optional[str] = property(
-        lambda self: self._get("language"), lambda self, v: self._set("language", v)
-    )
-    all_words: List[str] = property(
-        lambda self: cast(List[str], self._get("all_words")),
-        lambda self, v: self._set("all_words", v),
-    )
-    article: Optional[WikipediaPage] = property(
-        lambda self: self._get("article"), lambda self, v: self._set("article", v)
-    )
-    titles: List[str] = property(
-        lambda self: self._get("titles"), lambda self, v: self._set("titles", v)
-    )
-    liked_titles: List[str] = property(
-        lambda self: self._get("liked_titles"), lambda self, v: self._set("liked_titles", v)
-    )
-    article_words: List[WordInfo] = property(
-        lambda self: self._get("article_words"), lambda self, v: self._set("article_words", v)
-    )
-    title_words: List[WordInfo] = property(
-        lambda self: self._get("title_words"), lambda self, v: self._set("title_words", v)
-    )
-    model: Optional[Any] = property(
-        lambda self: self._get("model"), lambda self, v: self._set("model", v)
-    )
-    game_won: bool = property(
-        lambda self: self._get("game_won"), lambda self, v: self._set("game_won", v)
-    )
-    revealed: Set[str] = property(
-        lambda self: cast(Set[str], self._get("revealed")), lambda self, v: self._set("revealed", v)
-    )
-    revealed_end: Set[str] = property(
-        lambda self: cast(Set[str], self._get("revealed_end")),
-        lambda self, v: self._set("revealed_end", v),
-    )
-    guesses: List[str] = property(
-        lambda self: cast(List[str], self._get("guesses")), lambda self, v: self._set("guesses", v)
-    )
-    guess_input: str = property(
-        lambda self: cast(str, self._get("guess_input")),
-        lambda self, v: self._set("guess_input", v),
-    )
-    feedback_color: str = property(
-        lambda self: cast(str, self._get("feedback_color")),
-        lambda self, v: self._set("feedback_color", v),
+class TokenView:
+    """Lightweight read-only view on one token of an ArticleIndex"""
+
+    __slots__ = ("article", "index", "type_id")
+
+    def __init__(self, article: ArticleIndex, index: int):
+        self.article = article
+        self.index = index
+        self.type_id = int(article.type_ids[index])
+
+    word = property(lambda self: self.article.words[self.type_id])
+    normalized = property(lambda self: self.article.normalized[self.type_id])
+    start = property(lambda self: int(self.article.starts[self.index]))
+    end = property(lambda self: int(self.article.ends[self.index]))
+    embedding = property(lambda self: self.article.embeddings[self.type_id])
+    best_guess = property(lambda self: self.article.best_guess[self.type_id])
+    best_similarity = property(lambda self: float(self.article.best_similarity[self.type_id]))
+
+
+class ArticleData:
+    """Immutable tokens of a text stored as arrays, shared by every session playing the same page.
+    Tokens with the same spelling share one type, which holds the embedding"""
+
+    __slots__ = (
+        "starts",
+        "ends",
+        "type_ids",
+        "words",
+        "normalized",
+        "embeddings",
+        "type_counts",
+        "__weakref__",  # Lets worker pools drop the shared copy with the page
     )
-    feedback_content: str = property(
-        lambda self: cast(str, self._get("feedback_content")),
-        lambda self, v: self._set("feedback_content", v),
+
+    def __init__(
+        self,
+        starts: np.ndarray,
+        ends: np.ndarray,
+        type_ids: np.ndarray,
+        words: Tuple[str, ...],
+        normalized: Tuple[str, ...],
+        embeddings: np.ndarray,
+    ):
+        self.starts = starts  # int32 start/end position of each token, to place it in the text
+        self.ends = ends
+        self.type_ids = type_ids  # int32 type of each token
+        self.words = words  # Spelling of each type
+        self.normalized = normalized  # Each type without accent and capital letter
+        self.embeddings = embeddings  # float32 matrix, one row per type
+        self.type_counts = np.bincount(type_ids, minlength=len(words)).astype(np.int32)
+        for array in (starts, ends, type_ids, embeddings, self.type_counts):
+            array.flags.writeable = False
+
+    @classmethod
+    def empty(cls, dim: int = 300) -> ArticleData:
+        return cls(
+            np.zeros(0, dtype=np.int32),
+            np.zeros(0, dtype=np.int32),
+            np.zeros(0, dtype=np.int32),
+            (),
+            (),
+            np.zeros((0, dim), dtype=np.float32),
+        )
+
+    @property
+    def nb_types(self) -> int:
+        return len(self.words)
+
+
+class ArticleIndex:
+    """Guess state of one session on shared ArticleData: the best guess of each word type
+    (tokens with the same spelling always get the same similarities)"""
+
+    __slots__ = (
+        "data",
+        "best_guess",
+        "best_similarity",
+        "__weakref__",  # Lets the UI attach its render cache to the game
     )
+
+    def __init__(self, data: ArticleData):
+        self.data = data
+        self.best_guess: List[Optional[str]] = [None] * data.nb_types  # Most similar guess found
+        self.best_similarity = np.zeros(data.nb_types)  # Its similarity score
+
+    starts = property(lambda self: self.data.starts)
+    ends = property(lambda self: self.data.ends)
+    type_ids = property(lambda self: self.data.type_ids)
+    words = property(lambda self: self.data.words)
+    normalized = property(lambda self: self.data.normalized)
+    embeddings = property(lambda self: self.data.embeddings)
+    type_counts = property(lambda self: self.data.type_counts)
+    nb_types = property(lambda self: self.data.nb_types)
+
+    def __len__(self) -> int:
+        return len(self.data.type_ids)
+
+    def __getitem__(self, index: int) -> TokenView:
+        return TokenView(self, index)
+
+    def __iter__(self) -> Iterator[TokenView]:
+        return (TokenView(self, i) for i in range(len(self.data.type_ids)))
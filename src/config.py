@@ -5,6 +5,26 @@ MIN_WORDS = 250  # Minimum number of words in an article
 SIMILARITY_THRESHOLD = 0.4  # Minimum similarity to show clue
 SCORE_THRESHOLD = 0.6  # Minimum probability for the classifier to choose a word
 USE_COMPRESSED_MODEL = True  # If we want to use the compressed fasttext model
+USE_DISTILLED_MODEL = False  # Use the model built by game.distill (takes precedence over the above)
+MODEL_CHECKSUMS = {}  # "sha256:<hex>" or "md5:<hex>" by downloaded model file name (game.download)
+USE_ARTICLE_COMPONENT = True  # Update the article in the browser by diffs instead of full HTML
+NB_HINT_WORDS = 5  # Number of close vocabulary words given by a hint
+ARTICLE_CACHE_SIZE = 64  # Number of prepared pages kept in memory (shared by all sessions)
+GUESS_CACHE_SIZE = 20000  # Number of guess embeddings kept in memory (shared by all sessions)
+OFFLINE_CORPUS = None  # Path of a local Wikipedia corpus to play offline (game.corpus_ingest)
+HTTP_TRANSPORT = "live"  # "live", or "record"/"replay" Wikipedia responses (see game.transport)
+CASSETTE_DIR = "data/cassettes"  # Where recorded responses are stored
+REPLAY_LATENCY_MS = 0  # Latency added to replayed responses
+REPLAY_JITTER_MS = 0  # Random spread of that latency
+REPLAY_RATE_LIMITED = 0.0  # Share of replayed requests answered 429 (rate limited)
+WARMUP = True  # Load modules and the likely model in the background from the menu (game.warmup)
+TRACE_FILE = None  # JSON lines log of timed load and guess stages (see game.tracing)
+PROFILE_MODE = None  # "cprofile" or "sampling": profile reruns, loads and guesses (game.profiling)
+METRICS_PORT = None  # Local port serving Prometheus metrics at /metrics (see game.metrics)
+MODEL_MEMORY_BUDGET_MB = (
+    None  # Memory for loaded models, least recently used evicted (None: no limit)
+)
+SERVER_MAX_GAMES = 10000  # Number of games kept in memory by the game server (least recent dropped)
 
 # Words to exclude at the beginning of wikipedia paragraph
 EXCLUDE_STARTS = [
@@ -0,0 +1,77 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class LRUCache:
+    """Thread-safe bounded mapping evicting the least recently used entries, with usage counters"""
+
+    def __init__(self, maxsize: int, on_evict: Optional[Callable[[Hashable, Any], None]] = None):
+        self.maxsize = maxsize
+        self.on_evict = on_evict  # Called with each evicted entry, outside of the lock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: OrderedDict[Hashable, Any] = OrderedDict()
+        self._lock = threading.Lock()
+        self._pending: Dict[Hashable, threading.Lock] = {}  # Keys being created
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._data.move_to_end(key)
+            return value
+
+    def put(self, key: Hashable, value: Any):
+        evicted = []
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                evicted.append(self._data.popitem(last=False))
+                self.evictions += 1
+        if self.on_evict is not None:
+            for item in evicted:
+                self.on_evict(*item)
+
+    def get_or_create(self, key: Hashable, create: Callable[[], Any]) -> Optional[Any]:
+        """Return the cached value, or create and cache it. Concurrent callers asking for the same
+        missing key wait for a single creation. None results are returned but not cached"""
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        with self._lock:
+            key_lock = self._pending.setdefault(key, threading.Lock())
+        with key_lock:
+            try:
+                with self._lock:
+                    value = self._data.get(key)
+                if value is None:
+                    value = create()
+                    if value is not None:
+                        self.put(key, value)
+            finally:
+                with self._lock:
+                    self._pending.pop(key, None)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
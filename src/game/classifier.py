@@ -1,8 +1,9 @@
 import hashlib
 import json
 import os
+import threading
+import time
 from abc import ABC, abstractmethod
-from functools import lru_cache
 from pathlib import Path
 
 import joblib
@@ -19,6 +20,8 @@ from sklearn.svm import SVC
 from tqdm import tqdm
 
 from config import SCORE_THRESHOLD
+from game.metrics import CLASSIFIER_CHOICES, CLASSIFIER_TRAINING_SECONDS
+from game.model_registry import model_registry
 
 
 class BaseModel(ABC):
@@ -255,8 +258,7 @@ def prepare_data(records, language):
     return X, y, sentence_model
 
 
-@lru_cache(maxsize=2)
-def load_model(language):
+def _read_sentence_model(language):
     if language == "fr":
         return SentenceTransformer("sentence-transformers/distiluse-base-multilingual-cased-v2")
     elif language == "en":
@@ -265,6 +267,11 @@ def load_model(language):
         raise Exception(f"Language {language} is not accepted")
 
 
+def load_model(language):
+    """Sentence encoder of a language, kept in the model registry"""
+    return model_registry.get("sentence", language, lambda: _read_sentence_model(language))
+
+
 def train_models(nb_iter=100, language="fr", use_smote=True):
     """Train models nb_iter times and print average statistics"""
     print("Loading dataset...")
@@ -319,32 +326,80 @@ def _score_titles(clf, sentence_model, titles):
     return titles[scores.argmax()]
 
 
-def choose_title(titles, language, use_smote=True):
-    """Pick the best article title using a trained classifier, retrained only when data changes."""
+_saved_lock = threading.Lock()
+
+
+def _read_records(language):
     with open(Path("data/dataset.json"), "r", encoding="utf-8") as f:
         records = json.load(f)
+    return records.get(language, []) if records else []
 
-    records = records.get(language, []) if records else []
 
+def _enough_data(records) -> bool:
     nb_pos = sum(1 for r in records if r["score"])
     nb_neg = sum(1 for r in records if not r["score"])
-    if nb_pos < 6 or nb_neg < 6:
-        print("Not enough data in dataset: taking best article by views")
-        return titles[0]
+    return nb_pos >= 6 and nb_neg >= 6
 
+
+def _classifier_paths(language):
     models_dir = Path("models")
     models_dir.mkdir(exist_ok=True)
-    clf_path = models_dir / f"classifier_{language}.joblib"
-    hash_path = models_dir / f"classifier_{language}_hash.txt"
+    return (
+        models_dir / f"classifier_{language}.joblib",
+        models_dir / f"classifier_{language}_hash.txt",
+    )
 
-    current_hash = _dataset_hash(records)
-    sentence_model = load_model(language)
 
-    if clf_path.exists() and hash_path.exists() and hash_path.read_text().strip() == current_hash:
+def _saved_classifier(language, current_hash):
+    """The saved classifier of a language if it was trained on this dataset (loaded once)"""
+    clf_path, hash_path = _classifier_paths(language)
+    with _saved_lock:
+        # Kept in the model registry with the hash of the dataset it was trained on
+        cached = model_registry.peek("classifier", language)
+        if cached and cached[0] == current_hash:
+            return cached[1]
+        if not (clf_path.exists() and hash_path.exists()):
+            return None
+        if hash_path.read_text().strip() != current_hash:
+            return None
         print("Loading saved classifier...")
         clf = joblib.load(clf_path)
+        model_registry.put("classifier", language, (current_hash, clf), clf_path.stat().st_size)
+        return clf
+
+
+def preload(language, title):
+    """Load the sentence model and saved classifier of a language and score a title with
+    them, so that the first game doesn't pay for loading them (see game.warmup)"""
+    records = _read_records(language)
+    if not _enough_data(records):
+        return  # Titles are then chosen by views
+    sentence_model = load_model(language)
+    clf = _saved_classifier(language, _dataset_hash(records))
+    if clf is not None:
+        _score_titles(clf, sentence_model, [title])
+    else:
+        sentence_model.encode(title)
+
+
+def choose_title(titles, language, use_smote=True):
+    """Pick the best article title using a trained classifier, retrained only when data changes."""
+    records = _read_records(language)
+    if not _enough_data(records):
+        print("Not enough data in dataset: taking best article by views")
+        CLASSIFIER_CHOICES.inc(model="views")
+        return titles[0]
+
+    clf_path, hash_path = _classifier_paths(language)
+    current_hash = _dataset_hash(records)
+    sentence_model = load_model(language)
+
+    clf = _saved_classifier(language, current_hash)
+    if clf is not None:
+        CLASSIFIER_CHOICES.inc(model="saved")
         return _score_titles(clf, sentence_model, titles)
 
+    training_start = time.perf_counter()
     X, y, _ = prepare_data(records, language)
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2)
 
@@ -374,5 +429,11 @@ def choose_title(titles, language, use_smote=True):
 
     joblib.dump(best_model.model, clf_path)
     hash_path.write_text(current_hash)
+    with _saved_lock:
+        model_registry.put(
+            "classifier", language, (current_hash, best_model.model), clf_path.stat().st_size
+        )
+    CLASSIFIER_TRAINING_SECONDS.observe(time.perf_counter() - training_start)
+    CLASSIFIER_CHOICES.inc(model="retrained")
 
     return _score_titles(best_model.model, sentence_model, titles)
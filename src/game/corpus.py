@@ -0,0 +1,134 @@
+"""Offline corpus: lead paragraphs of Wikipedia pages stored in a local SQLite database, to
+play without network access (built with `python -m game.corpus_ingest`).
+
+When config.OFFLINE_CORPUS is set, game.wiki_api serves random titles, page views, search
+and page contents from it instead of the Wikipedia APIs.
+"""
+
+import os
+import random
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from config import MIN_WORDS, OFFLINE_CORPUS
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    id INTEGER PRIMARY KEY,
+    language TEXT NOT NULL,
+    title TEXT NOT NULL,
+    text TEXT NOT NULL,  -- Lead paragraphs, one per line
+    words INTEGER NOT NULL,
+    views INTEGER NOT NULL DEFAULT 0
+);
+CREATE UNIQUE INDEX IF NOT EXISTS pages_title ON pages (language, title);
+CREATE INDEX IF NOT EXISTS pages_title_nocase ON pages (language, title COLLATE NOCASE);
+CREATE TABLE IF NOT EXISTS pageview_files (  -- Pageview dumps added to pages.views
+    language TEXT NOT NULL,
+    name TEXT NOT NULL,
+    PRIMARY KEY (language, name)
+);
+"""
+
+_corpus: Optional["OfflineCorpus"] = None
+_corpus_lock = threading.Lock()
+
+
+class OfflineCorpus:
+    """Read-only access to a corpus database, with one connection per thread"""
+
+    def __init__(self, path: str):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No offline corpus at {path}")
+        self.path = path
+        self._local = threading.local()
+        self._id_ranges: Dict[str, Tuple[int, int]] = {}
+        self._has_views: Dict[str, bool] = {}
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+            self._local.connection = connection
+        return connection
+
+    def _id_range(self, language: str) -> Tuple[int, int]:
+        if language not in self._id_ranges:
+            row = self.db.execute(
+                "SELECT MIN(id), MAX(id) FROM pages WHERE language = ?", (language,)
+            ).fetchone()
+            self._id_ranges[language] = (row[0] or 0, row[1] or -1)
+        return self._id_ranges[language]
+
+    def has_views(self, language: str) -> bool:
+        """Whether page views were ingested for the language"""
+        if language not in self._has_views:
+            row = self.db.execute(
+                "SELECT 1 FROM pages WHERE language = ? AND views > 0 LIMIT 1", (language,)
+            ).fetchone()
+            self._has_views[language] = row is not None
+        return self._has_views[language]
+
+    def random_titles(self, language: str, count: int, min_words: int = MIN_WORDS) -> List[str]:
+        """Titles of random pages long enough to be played (random ids, no table scan)"""
+        low, high = self._id_range(language)
+        titles: Dict[str, None] = {}
+        for _ in range(count * 4):
+            if len(titles) >= count or high < low:
+                break
+            row = self.db.execute(
+                "SELECT title FROM pages WHERE id >= ? AND language = ? AND words >= ? "
+                "ORDER BY id LIMIT 1",
+                (random.randint(low, high), language, min_words),
+            ).fetchone()
+            if row:
+                titles[row[0]] = None
+        return list(titles)
+
+    def page_views(self, language: str, title: str) -> int:
+        """Ingested page views, or 1 for every page if the corpus has none (neutral ranking)"""
+        if not self.has_views(language):
+            return 1
+        row = self.db.execute(
+            "SELECT views FROM pages WHERE language = ? AND title = ?", (language, title)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def search_titles(self, query: str, language: str, limit: int = 10) -> List[str]:
+        """Titles starting with the query (case-insensitive), most viewed first"""
+        prefix = query.strip().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        if not prefix:
+            return []
+        rows = self.db.execute(
+            "SELECT title FROM pages WHERE language = ? AND title LIKE ? ESCAPE '\\' "
+            "ORDER BY views DESC LIMIT ?",
+            (language, prefix + "%", limit),
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def page(self, language: str, title: str) -> Optional[Tuple[str, str]]:
+        """Stored title and lead paragraphs (one per line) of a page, or None if it is not in
+        the corpus"""
+        row = self.db.execute(
+            "SELECT title, text FROM pages WHERE language = ? AND title = ?", (language, title)
+        ).fetchone()
+        if row is None:  # Titles typed by players may differ in case
+            row = self.db.execute(
+                "SELECT title, text FROM pages WHERE language = ? AND title = ? COLLATE NOCASE",
+                (language, title),
+            ).fetchone()
+        return row
+
+
+def get_corpus() -> Optional[OfflineCorpus]:
+    """Return the corpus configured in config.OFFLINE_CORPUS, or None to use Wikipedia"""
+    global _corpus
+    if OFFLINE_CORPUS is None:
+        return None
+    if _corpus is None:
+        with _corpus_lock:
+            if _corpus is None:
+                _corpus = OfflineCorpus(OFFLINE_CORPUS)
+    return _corpus
@@ -0,0 +1,277 @@
+"""Build an offline corpus (see game.corpus) from a local Wikipedia dump.
+
+    PYTHONPATH=src python -m game.corpus_ingest frwiki-latest-pages-articles.xml.bz2
+        [--language fr] [--corpus data/corpus.sqlite] [--workers 4]
+        [--pageviews pageviews-20250101-user.bz2]
+
+Reads a pages-articles XML dump (.xml or .xml.bz2) or an HTML dump of the Enterprise API
+(.ndjson, or the .tar.gz of .ndjson files), streamed so that the dump is never held in
+memory. Batches of pages are converted in a process pool: wikitext is turned into simple
+HTML, then lead paragraphs are extracted with extract_first_paragraphs, as for pages fetched
+online. Pageview dumps (hourly or daily, possibly compressed) add view totals used to rank
+random pages, each dump file once. Running it again updates existing pages.
+"""
+
+import argparse
+import bz2
+import gzip
+import html
+import json
+import os
+import re
+import sqlite3
+import tarfile
+import time
+import xml.etree.ElementTree as ElementTree
+from collections import deque
+from multiprocessing import Pool
+from typing import Iterator, List, Optional, Tuple
+
+from game.corpus import SCHEMA
+from game.wiki_api import extract_first_paragraphs
+
+BATCH_SIZE = 200  # Pages sent to a worker at once
+
+Page = Tuple[str, str]  # Title, wikitext or HTML
+
+# Link namespaces whose links are not part of the text (images, categories, other languages)
+HIDDEN_LINKS = re.compile(
+    r"\[\[\s*(?:file|fichier|image|category|catégorie|media|média|[a-z]{2,3}(?:-[a-z]+)?)\s*:"
+    r"[^\[\]]*(?:\[\[[^\[\]]*\]\][^\[\]]*)*\]\]",
+    re.IGNORECASE,
+)
+TEMPLATE = re.compile(r"\{\{[^{}]*\}\}")
+TABLE = re.compile(r"\{\|.*?\|\}", re.DOTALL)
+MATH = re.compile(r"<math[^>]*>(.*?)</math>", re.DOTALL | re.IGNORECASE)
+REFERENCE = re.compile(r"<ref[^>/]*/>|<ref[^>]*>.*?</ref>", re.DOTALL | re.IGNORECASE)
+COMMENT = re.compile(r"<!--.*?-->", re.DOTALL)
+LINK = re.compile(r"\[\[(?:[^\[\]|]*\|)?([^\[\]]*)\]\]")
+EXTERNAL_LINK = re.compile(r"\[(?:https?:)?//[^\s\]]+\s*([^\]]*)\]")
+TAG = re.compile(r"</?[a-zA-Z][^>]*>")
+MATH_PLACEHOLDER = re.compile(r"\x00(\d+)\x00")
+
+
+def wikitext_to_html(wikitext: str) -> str:
+    """Paragraphs of a wikitext as HTML: templates, tables, references, files and categories
+    are dropped, links keep their label and formulas are kept as MediaWiki renders them"""
+    formulas: List[str] = []
+
+    def keep_formula(match):
+        formulas.append(match.group(1))
+        return f"\x00{len(formulas) - 1}\x00"
+
+    text = COMMENT.sub("", wikitext)
+    text = MATH.sub(keep_formula, text)
+    text = REFERENCE.sub("", text)
+    previous = None
+    while previous != text:  # Innermost templates first, as they nest
+        previous = text
+        text = TEMPLATE.sub("", text)
+    text = TABLE.sub("", text)
+    text = HIDDEN_LINKS.sub("", text)
+    text = LINK.sub(r"\1", text)
+    text = EXTERNAL_LINK.sub(r"\1", text)
+    text = re.sub(r"'{2,}", "", text)
+    text = TAG.sub("", text)
+    text = html.unescape(text)
+
+    paragraphs, lines = [], []
+    for line in text.split("\n") + [""]:
+        line = line.strip()
+        if line and not line.startswith(("=", "*", "#", ":", ";", "|", "!", "{", "}", "__")):
+            lines.append(line)
+            continue
+        if lines:
+            paragraph = html.escape(" ".join(lines))
+            paragraph = MATH_PLACEHOLDER.sub(
+                lambda m: (
+                    '<span class="mwe-math-element"><annotation>'
+                    f"{html.escape(formulas[int(m.group(1))])}</annotation></span>"
+                ),
+                paragraph,
+            )
+            paragraphs.append(f"<p>{paragraph}</p>")
+            lines = []
+    return "\n".join(paragraphs)
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def read_xml_dump(path: str) -> Iterator[Page]:
+    """Articles of a pages-articles XML dump (main namespace, redirects skipped)"""
+    opener = bz2.open if path.endswith(".bz2") else open
+    with opener(path, "rb") as f:
+        title = namespace = text = None
+        redirect = False
+        for _, element in ElementTree.iterparse(f, events=("end",)):
+            name = _local_name(element.tag)
+            if name == "title":
+                title = element.text
+            elif name == "ns":
+                namespace = element.text
+            elif name == "redirect":
+                redirect = True
+            elif name == "text":
+                text = element.text or ""
+            elif name == "page":
+                if namespace == "0" and not redirect and title and text:
+                    yield title, text
+                title = namespace = text = None
+                redirect = False
+                element.clear()  # Keep memory flat on multi-GB dumps
+
+
+def _ndjson_pages(lines) -> Iterator[Page]:
+    for line in lines:
+        article = json.loads(line)
+        if article.get("namespace", {}).get("identifier", 0) != 0:
+            continue
+        body = article.get("article_body", {}).get("html")
+        if article.get("name") and body:
+            yield article["name"], body
+
+
+def read_html_dump(path: str) -> Iterator[Page]:
+    """Articles of an Enterprise HTML dump (.ndjson, or a .tar.gz of .ndjson files)"""
+    if path.endswith((".tar.gz", ".tgz")):
+        with tarfile.open(path, "r|gz") as archive:
+            for member in archive:
+                f = archive.extractfile(member) if member.isfile() else None
+                if f is not None:
+                    yield from _ndjson_pages(f)
+    else:
+        with open(path, "rb") as f:
+            yield from _ndjson_pages(f)
+
+
+def _batches(pages: Iterator[Page], size: int) -> Iterator[List[Page]]:
+    batch = []
+    for page in pages:
+        batch.append(page)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def process_batch(args: Tuple[List[Page], bool]) -> List[Tuple[str, str, int]]:
+    """Lead paragraphs and word counts of a batch of pages (run in the workers)"""
+    pages, is_wikitext = args
+    rows = []
+    for title, content in pages:
+        text = extract_first_paragraphs(wikitext_to_html(content) if is_wikitext else content)
+        if text:
+            rows.append((title, text, len(text.split())))
+    return rows
+
+
+def _write(db: sqlite3.Connection, language: str, rows: List[Tuple[str, str, int]]):
+    with db:
+        db.executemany(
+            "INSERT INTO pages (language, title, text, words) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (language, title) DO UPDATE SET text = excluded.text, "
+            "words = excluded.words",
+            [(language, title, text, words) for title, text, words in rows],
+        )
+
+
+def ingest_dump(db: sqlite3.Connection, path: str, language: str, workers: int) -> int:
+    is_wikitext = ".xml" in os.path.basename(path)
+    pages = read_xml_dump(path) if is_wikitext else read_html_dump(path)
+    count, start = 0, time.perf_counter()
+    pending = deque()
+    with Pool(workers) as pool:
+        # Bounded number of batches in flight: Pool.imap would read the whole dump ahead
+        for batch in _batches(pages, BATCH_SIZE):
+            pending.append(pool.apply_async(process_batch, ((batch, is_wikitext),)))
+            while pending and (len(pending) > 2 * workers or pending[0].ready()):
+                rows = pending.popleft().get()
+                _write(db, language, rows)
+                count += len(rows)
+                print(f"\r{count} pages ({count / (time.perf_counter() - start):.0f}/s)", end="")
+        while pending:
+            rows = pending.popleft().get()
+            _write(db, language, rows)
+            count += len(rows)
+    print(f"\r{count} pages ({count / (time.perf_counter() - start):.0f}/s)")
+    return count
+
+
+def _open_text(path: str):
+    if path.endswith(".bz2"):
+        return bz2.open(path, "rt", encoding="utf-8", errors="replace")
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", errors="replace")
+    return open(path, encoding="utf-8", errors="replace")
+
+
+def read_pageviews(path: str, language: str) -> dict:
+    """Total views by title of the language's Wikipedia in a pageview dump, either hourly
+    (`fr Titre 12 0`) or daily (`fr.wikipedia Titre 1234 desktop 12 A1B2`)"""
+    projects = {language, f"{language}.wikipedia", f"{language}.m", f"{language}.m.wikipedia"}
+    views: dict = {}
+    with _open_text(path) as f:
+        for line in f:
+            fields = line.split(" ")
+            if len(fields) < 3 or fields[0] not in projects:
+                continue
+            count = fields[4] if len(fields) >= 6 else fields[2]
+            if not count.isdigit():
+                continue
+            title = fields[1].replace("_", " ")
+            views[title] = views.get(title, 0) + int(count)
+    return views
+
+
+def ingest_pageviews(db: sqlite3.Connection, path: str, language: str) -> Optional[int]:
+    """Add the views of a dump to the pages, unless a file of the same name was already added
+    (views are totals over every dump: adding one twice would count it twice). Return the
+    number of pages with views, or None if the file was skipped"""
+    name = os.path.basename(path)
+    if db.execute(
+        "SELECT 1 FROM pageview_files WHERE language = ? AND name = ?", (language, name)
+    ).fetchone():
+        return None
+    views = read_pageviews(path, language)
+    with db:
+        db.execute("INSERT INTO pageview_files (language, name) VALUES (?, ?)", (language, name))
+        db.executemany(
+            "UPDATE pages SET views = views + ? WHERE language = ? AND title = ?",
+            ((count, language, title) for title, count in views.items()),
+        )
+        return db.execute(
+            "SELECT COUNT(*) FROM pages WHERE language = ? AND views > 0", (language,)
+        ).fetchone()[0]
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("dump", nargs="?", help="XML (.xml, .xml.bz2) or HTML (.ndjson) dump")
+    parser.add_argument("--language", default="fr", choices=["fr", "en"])
+    parser.add_argument("--corpus", default="data/corpus.sqlite")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--pageviews", nargs="*", default=[], help="Pageview dump files")
+    args = parser.parse_args(argv)
+    if not args.dump and not args.pageviews:
+        parser.error("Nothing to ingest: give a dump and/or --pageviews")
+
+    os.makedirs(os.path.dirname(args.corpus) or ".", exist_ok=True)
+    db = sqlite3.connect(args.corpus)
+    db.executescript(SCHEMA)
+    if args.dump:
+        count = ingest_dump(db, args.dump, args.language, args.workers)
+        print(f"{count} pages ingested into {args.corpus}")
+    for path in args.pageviews:
+        count = ingest_pageviews(db, path, args.language)
+        if count is None:
+            print(f"Views of {path} already added, skipped")
+        else:
+            print(f"Views of {path} added, {count} pages with views")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
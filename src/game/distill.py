@@ -0,0 +1,272 @@
+"""Distilled fasttext model: a middle ground between the full cc.<lang>.300.bin (~7GB, exact)
+and the compressed zenodo model (20MB, loses precision on technical pages).
+
+Build it once per language from the full binary (needs the fasttext package and the memory
+to load the full model), from the repository root:
+
+    PYTHONPATH=src python -m game.distill fr [--extra-words 200000] [--subvectors 100]
+        [--float16] [--source models/cc.fr.300.bin]
+
+Then set USE_DISTILLED_MODEL = True in config.py. The model keeps:
+- the exact vectors of the vocabulary words (vocab/words_<lang>.txt, as written and
+  normalized) and of the most frequent words of the full model (--extra-words),
+- the subword n-gram buckets, product-quantized (--subvectors codes of one byte per bucket),
+  from which other words are embedded as fasttext does: the mean of their n-gram vectors.
+
+Everything is stored as .npy files in models/fasttext-<lang>-distilled/, memory-mapped when
+loaded: loading reads the word list only. Compare it with the other models using
+benchmarks.distilled.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import time
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from game.embedding_utils import normalize_word
+from game.vocabulary import get_vocabulary
+
+MODELS_DIR = "models"
+FORMAT_VERSION = 1
+CENTROIDS = 256  # Per subvector, so that a code fits in a byte
+CHUNK = 65536  # Bucket rows read and encoded at once
+
+
+def distilled_path(language: str) -> str:
+    return f"{MODELS_DIR}/fasttext-{language}-distilled"
+
+
+def fnv1a(data: bytes) -> int:
+    """32-bit FNV-1a hash of fasttext, which reads bytes as signed chars"""
+    h = 2166136261
+    for byte in data:
+        h ^= byte if byte < 0x80 else byte | 0xFFFFFF00
+        h = (h * 16777619) & 0xFFFFFFFF
+    return h
+
+
+def subword_buckets(word: str, minn: int, maxn: int, bucket: int) -> List[int]:
+    """Buckets of the character n-grams of a word, as fasttext computes them (n-grams of the
+    word between < and >, single characters at the boundaries excluded)"""
+    padded = f"<{word}>"
+    buckets = []
+    for i in range(len(padded)):
+        for n in range(max(minn, 1), maxn + 1):
+            if i + n > len(padded):
+                break
+            if n == 1 and (i == 0 or i + n == len(padded)):
+                continue
+            buckets.append(fnv1a(padded[i : i + n].encode()) % bucket)
+    return buckets
+
+
+class DistilledModel:
+    """fasttext model built by this module: exact vectors of its words, product-quantized
+    subword buckets for the others. Vectors and codes stay memory-mapped"""
+
+    def __init__(self, path: str):
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta["version"] != FORMAT_VERSION:
+            raise ValueError(f"{path}: format {meta['version']}, expected {FORMAT_VERSION}")
+        self.dim = meta["dim"]
+        self.minn, self.maxn, self.bucket = meta["minn"], meta["maxn"], meta["bucket"]
+
+        self.vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r")
+        self.codes = np.load(os.path.join(path, "codes.npy"), mmap_mode="r")
+        self.codebooks = np.load(os.path.join(path, "codebooks.npy"))  # A few hundred kB
+        with open(os.path.join(path, "words.txt"), encoding="utf-8") as f:
+            self.rows = {word: i for i, word in enumerate(f.read().split("\n"))}
+        self._subvectors = np.arange(self.codebooks.shape[0])
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __contains__(self, word: str) -> bool:
+        return word in self.rows
+
+    def __getitem__(self, word: str) -> np.ndarray:
+        row = self.rows.get(word)
+        if row is not None:
+            return np.asarray(self.vectors[row], dtype=np.float32)
+        buckets = subword_buckets(word, self.minn, self.maxn, self.bucket)
+        if not buckets:
+            return np.zeros(self.dim, dtype=np.float32)
+        codes = self.codes[buckets]  # One code per subvector of each n-gram
+        parts = self.codebooks[self._subvectors, codes]  # n-grams x subvectors x sub-dimension
+        return parts.mean(axis=0).reshape(self.dim)
+
+
+# Building
+
+
+def train_codebooks(
+    sample: np.ndarray, subvectors: int, iterations: int = 15, seed: int = 0
+) -> np.ndarray:
+    """k-means centroids of each subvector of the sample rows (subvectors x 256 x sub-dim)"""
+    rng = np.random.default_rng(seed)
+    parts = sample.reshape(len(sample), subvectors, -1)
+    codebooks = np.empty((subvectors, CENTROIDS, parts.shape[2]), dtype=np.float32)
+    for m in range(subvectors):
+        points = np.ascontiguousarray(parts[:, m])
+        centroids = points[rng.choice(len(points), CENTROIDS, replace=False)].copy()
+        for _ in range(iterations):
+            assigned = _nearest(points, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assigned, points)
+            counts = np.bincount(assigned, minlength=CENTROIDS)
+            filled = counts > 0
+            centroids[filled] = sums[filled] / counts[filled, None]
+            # Empty clusters restart on random points
+            centroids[~filled] = points[rng.choice(len(points), int((~filled).sum()))]
+        codebooks[m] = centroids
+    return codebooks
+
+
+def _nearest(points: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    distances = (
+        (points**2).sum(axis=1)[:, None]
+        - 2 * points @ centroids.T
+        + (centroids**2).sum(axis=1)[None, :]
+    )
+    return distances.argmin(axis=1)
+
+
+def encode(rows: np.ndarray, codebooks: np.ndarray) -> np.ndarray:
+    """Code of the nearest centroid of each subvector of each row (rows x subvectors)"""
+    parts = rows.reshape(len(rows), codebooks.shape[0], -1)
+    codes = np.empty((len(rows), codebooks.shape[0]), dtype=np.uint8)
+    for m, centroids in enumerate(codebooks):
+        codes[:, m] = _nearest(parts[:, m], centroids)
+    return codes
+
+
+def _bucket_rows(source, start: int, stop: int) -> np.ndarray:
+    """Rows of the input matrix of the full model, one at a time rather than copying the
+    whole matrix (as large as the model)"""
+    return np.stack([source.get_input_vector(i) for i in range(start, stop)]).astype(np.float32)
+
+
+def kept_words(source, language: str, extra: int) -> List[str]:
+    """Vocabulary words (as written and normalized), then the most frequent words of the
+    full model, without duplicates"""
+    words: Dict[str, None] = {}
+    for word in get_vocabulary(language):
+        words[word] = None
+        words[normalize_word(word)] = None
+    added = 0
+    for word in source.get_words():  # By decreasing frequency
+        if added >= extra:
+            break
+        if word not in words and "\n" not in word:
+            words[word] = None
+            added += 1
+    return list(words)
+
+
+def build(
+    source,
+    language: str,
+    path: str,
+    extra_words: int,
+    subvectors: int,
+    sample_size: int,
+    dtype=np.float32,
+):
+    """Write the distilled model of a loaded full fasttext model"""
+    from tqdm import tqdm  # Building only: loading the model does not need it
+
+    args = source.f.getArgs()
+    dim, nwords = args.dim, len(source.get_words())
+    if dim % subvectors:
+        raise ValueError(f"{subvectors} subvectors do not divide the dimension {dim}")
+
+    temporary = f"{path}.tmp"
+    shutil.rmtree(temporary, ignore_errors=True)
+    os.makedirs(temporary)
+
+    start = time.perf_counter()
+    words = kept_words(source, language, extra_words)
+    vectors = np.lib.format.open_memmap(
+        os.path.join(temporary, "vectors.npy"), "w+", dtype, (len(words), dim)
+    )
+    for i, word in enumerate(words):
+        vectors[i] = source.get_word_vector(word)
+    vectors.flush()
+    with open(os.path.join(temporary, "words.txt"), "w", encoding="utf-8") as f:
+        f.write("\n".join(words))
+    print(f"{len(words)} exact vectors in {time.perf_counter() - start:.0f}s")
+
+    start = time.perf_counter()
+    rng = np.random.default_rng(0)
+    sample = np.sort(rng.choice(args.bucket, min(sample_size, args.bucket), replace=False))
+    sample_rows = np.stack([source.get_input_vector(nwords + int(i)) for i in sample])
+    codebooks = train_codebooks(sample_rows.astype(np.float32), subvectors)
+    np.save(os.path.join(temporary, "codebooks.npy"), codebooks)
+    print(f"Codebooks trained on {len(sample)} buckets in {time.perf_counter() - start:.0f}s")
+
+    start = time.perf_counter()
+    codes = np.lib.format.open_memmap(
+        os.path.join(temporary, "codes.npy"), "w+", np.uint8, (args.bucket, subvectors)
+    )
+    for first in tqdm(range(0, args.bucket, CHUNK), desc="Encoding buckets"):
+        last = min(first + CHUNK, args.bucket)
+        codes[first:last] = encode(_bucket_rows(source, nwords + first, nwords + last), codebooks)
+    codes.flush()
+    print(f"{args.bucket} buckets encoded in {time.perf_counter() - start:.0f}s")
+
+    meta = {
+        "version": FORMAT_VERSION,
+        "language": language,
+        "dim": dim,
+        "minn": args.minn,
+        "maxn": args.maxn,
+        "bucket": args.bucket,
+        "words": len(words),
+        "subvectors": subvectors,
+    }
+    with open(os.path.join(temporary, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    del vectors, codes  # Close the memory maps before moving the files
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(temporary, path)
+    return path
+
+
+def _directory_size(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+def main(argv: Optional[Iterable[str]] = None):
+    parser = argparse.ArgumentParser(description="Distill the full fasttext model of a language")
+    parser.add_argument("language", choices=["fr", "en"])
+    parser.add_argument("--source", help="Full model (default: models/cc.<language>.300.bin)")
+    parser.add_argument("--extra-words", type=int, default=200000)
+    parser.add_argument("--subvectors", type=int, default=100, help="Bytes per n-gram bucket")
+    parser.add_argument("--sample", type=int, default=65536, help="Buckets to train on")
+    parser.add_argument("--float16", action="store_true", help="Halve the exact vectors")
+    args = parser.parse_args(argv)
+
+    import fasttext
+
+    source_path = args.source or f"{MODELS_DIR}/cc.{args.language}.300.bin"
+    print(f"Loading {source_path}...")
+    source = fasttext.load_model(source_path)
+    path = build(
+        source,
+        args.language,
+        distilled_path(args.language),
+        args.extra_words,
+        args.subvectors,
+        args.sample,
+        np.float16 if args.float16 else np.float32,
+    )
+    print(f"{path}: {_directory_size(path) / 1e6:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""Downloads of model files: streamed to a .part file next to the destination, resumed with
+HTTP range requests after an interruption, checked against a checksum, then renamed into
+place, so that a file at its final path is always complete.
+
+A lock per destination (a thread lock, and an OS lock on <path>.lock for other processes,
+removed by its holder when done) makes concurrent sessions wait for a single download
+instead of fetching it twice. Checksums are given as "sha256:<hex>" or "md5:<hex>" (see
+config.MODEL_CHECKSUMS). Without one, a download is only kept if the server announced its
+size and every byte of it was received.
+"""
+
+import gzip
+import hashlib
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+import requests
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+CHUNK_SIZE = 1 << 20
+RETRIES = 5  # Consecutive failures without progress before giving up (each one resumes)
+TIMEOUT = 30  # Seconds without data before a request is abandoned
+
+_path_locks: Dict[str, threading.Lock] = {}
+_path_locks_lock = threading.Lock()
+
+
+class DownloadError(Exception):
+    pass
+
+
+def _hasher(checksum: Optional[str]):
+    if checksum is None:
+        return None
+    algorithm, _, expected = checksum.partition(":")
+    if algorithm not in ("sha256", "md5") or not expected:
+        raise ValueError(f'Checksum "{checksum}" is not "sha256:<hex>" or "md5:<hex>"')
+    return hashlib.new(algorithm)
+
+
+def _lock_file(lock_file):
+    if fcntl is not None:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+    elif os.name == "nt":
+        import msvcrt
+
+        while True:
+            try:
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                break
+            except OSError:  # LK_LOCK gives up after 10 seconds
+                pass
+
+
+def _is_current(lock_file, lock_path: str) -> bool:
+    """Whether the locked file is still the one at lock_path (not removed by its last holder)"""
+    try:
+        return os.fstat(lock_file.fileno()).st_ino == os.stat(lock_path).st_ino
+    except FileNotFoundError:
+        return False
+
+
+@contextmanager
+def path_lock(path: str) -> Iterator[None]:
+    """Hold the download of path, for the threads of this process and for other processes.
+    The lock file is removed on release: waiters then lock a new one (see _is_current)"""
+    with _path_locks_lock:
+        lock = _path_locks.setdefault(os.path.abspath(path), threading.Lock())
+    lock_path = f"{path}.lock"
+    with lock:
+        while True:
+            lock_file = open(lock_path, "a+b")
+            _lock_file(lock_file)
+            if _is_current(lock_file, lock_path):
+                break
+            lock_file.close()  # Removed while we waited: lock the new one
+        try:
+            yield
+        finally:
+            try:
+                os.remove(lock_path)
+            except OSError:  # Still open by a waiting process on Windows
+                pass
+            lock_file.close()  # Releases the OS lock
+
+
+def _download_part(url: str, part: str, hasher, session: requests.Session) -> Optional[int]:
+    """Append the rest of url to part (from its current size), feeding hasher with every byte
+    of the file. Return the total size announced by the server, if any"""
+    offset = _size(part)
+    headers = {"Range": f"bytes={offset}-"} if offset else {}
+    with session.get(url, headers=headers, stream=True, timeout=TIMEOUT) as response:
+        if response.status_code == 416:  # Nothing left after offset: the part is complete
+            total = response.headers.get("Content-Range", "").rpartition("/")[2]
+            if total.isdigit() and int(total) == offset:
+                _hash_file(part, hasher)
+                return offset
+            os.remove(part)  # The part is longer than the file: start again
+            return _download_part(url, part, hasher, session)
+        response.raise_for_status()
+        if response.status_code != 206:
+            offset = 0  # No range support: the whole file is sent again
+        length = response.headers.get("Content-Length")
+        total = offset + int(length) if length is not None else None
+
+        mode = "ab" if offset else "wb"
+        if offset:
+            _hash_file(part, hasher)
+        with open(part, mode) as f:
+            for chunk in response.iter_content(CHUNK_SIZE):
+                f.write(chunk)
+                if hasher is not None:
+                    hasher.update(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+    return total
+
+
+def _size(path: str) -> int:
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+
+def _hash_file(path: str, hasher):
+    if hasher is None:
+        return
+    with open(path, "rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            hasher.update(chunk)
+
+
+def download(
+    url: str,
+    path: str,
+    checksum: Optional[str] = None,
+    session: Optional[requests.Session] = None,
+    retries: int = RETRIES,
+) -> str:
+    """Download url to path unless it is already there, and return path"""
+    if os.path.exists(path):
+        return path
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with path_lock(path):
+        if os.path.exists(path):  # Downloaded by another session while we waited
+            return path
+        session = session or requests.Session()
+        part = f"{path}.part"
+        failures = 0
+        start = time.perf_counter()
+        while True:
+            hasher = _hasher(checksum)
+            before = _size(part)
+            try:
+                total = _download_part(url, part, hasher, session)
+            except (
+                requests.ConnectionError,
+                requests.Timeout,
+                requests.exceptions.ChunkedEncodingError,
+            ) as e:
+                failures = 1 if _size(part) > before else failures + 1
+                if failures > retries:
+                    raise DownloadError(f"{url}: {e} ({failures} attempts)") from e
+                print(f"Download of {url} interrupted ({e}), resuming")
+                time.sleep(min(2**failures, 30))
+                continue
+            size = os.path.getsize(part)
+            if total is not None and size < total:  # Connection closed early
+                failures = 1 if size > before else failures + 1
+                if failures > retries:
+                    raise DownloadError(f"{url}: {size} of {total} bytes ({failures} attempts)")
+                print(f"Download of {url} stopped at {size}/{total} bytes, resuming")
+                continue
+            break
+
+        if hasher is not None and hasher.hexdigest() != checksum.partition(":")[2].lower():
+            os.remove(part)
+            raise DownloadError(f"{url}: {hasher.name} is {hasher.hexdigest()}, not {checksum}")
+        if hasher is None and size != total:
+            # Without a checksum, a connection closed early cannot be told from the end of
+            # the file unless the server announced its size
+            os.remove(part)
+            raise DownloadError(
+                f"{url}: {size} bytes received, {total} announced, and no checksum to verify them"
+            )
+        os.replace(part, path)
+        print(f"Downloaded {path} ({size / 1e6:.0f} MB in {time.perf_counter() - start:.0f}s)")
+    return path
+
+
+def download_gzipped(
+    url: str, path: str, checksum: Optional[str] = None, keep_archive: bool = False
+) -> str:
+    """Download a .gz file (checksum of the archive) and decompress it to path"""
+    if os.path.exists(path):
+        return path
+    archive = download(url, f"{path}.gz", checksum)
+    with path_lock(path):
+        if not os.path.exists(path):
+            part = f"{path}.part"
+            with gzip.open(archive, "rb") as source, open(part, "wb") as target:
+                shutil.copyfileobj(source, target, CHUNK_SIZE)
+                target.flush()
+                os.fsync(target.fileno())
+            os.replace(part, path)
+        if not keep_archive and os.path.exists(archive):
+            os.remove(archive)
+    return path
@@ -1,11 +1,17 @@
+from __future__ import annotations
+
 import unicodedata
-from typing import List, Optional, Tuple
+from typing import TYPE_CHECKING, Dict, List, Optional, Set
 
 import numpy as np
 import regex
 
-from classes import SimilarityResult, WordInfo
+from classes import ArticleData, ArticleIndex, SimilarityResult
 from config import SIMILARITY_THRESHOLD
+from game.tracing import span
+
+if TYPE_CHECKING:
+    from game.vocab_matrix import VocabMatrix
 
 
 def normalize_word(word: str) -> str:
@@ -20,30 +26,45 @@ def get_vector(model, word):
     return model[word]  # compressed
 
 
-def tokenize_text(text: str, model) -> List["WordInfo"]:
-    """Transform words to WordInfo objects, computing embeddings in batch, keeping accented Latin letters"""
+def tokenize_text(text: str, model) -> ArticleData:
+    """Transform words to ArticleData, computing one embedding per distinct word, keeping accented Latin letters"""
     pattern = r"\b[\p{Latin}0-9]+\b"
-    matches = [m for m in regex.finditer(pattern, text)]
-
-    words = []
-    filtered_words = []
-    filtered_indices: List[Tuple[int, int]] = []
-
-    for m in matches:
-        word = m.group().replace("œ", "oe").replace("Œ", "Oe")
-        if "_" not in word:
-            filtered_words.append(word)
-            filtered_indices.append((m.start(), m.end()))
-
-    if not filtered_words:
-        return []
-    embeddings = np.array([get_vector(model, word) for word in filtered_words])
-
-    for i, word in enumerate(filtered_words):
-        start, end = filtered_indices[i]
-        words.append(WordInfo(word, embeddings[i], normalize_word(word), start, end))
 
-    return words
+    starts: List[int] = []
+    ends: List[int] = []
+    type_ids: List[int] = []
+    types: Dict[str, int] = {}
+
+    with span("tokenize", chars=len(text)) as trace:
+        for m in regex.finditer(pattern, text):
+            word = m.group().replace("œ", "oe").replace("Œ", "Oe")
+            if "_" not in word:
+                starts.append(m.start())
+                ends.append(m.end())
+                type_ids.append(types.setdefault(word, len(types)))
+        trace["tokens"] = len(type_ids)
+        trace["types"] = len(types)
+
+    if not types:
+        return ArticleData.empty()
+
+    words = tuple(types)
+    with span("embed", types=len(words)):
+        embeddings = np.array([get_vector(model, word) for word in words], dtype=np.float32)
+    return ArticleData(
+        np.array(starts, dtype=np.int32),
+        np.array(ends, dtype=np.int32),
+        np.array(type_ids, dtype=np.int32),
+        words,
+        tuple(normalize_word(word) for word in words),
+        embeddings,
+    )
+
+
+def text_gaps(words: ArticleIndex, source_text: str) -> List[str]:
+    """The text before, between and after the tokens (one more item than tokens)"""
+    bounds = [0, *(x for pair in zip(words.starts, words.ends) for x in pair), None]
+    return [source_text[bounds[i] : bounds[i + 1]] for i in range(0, len(bounds), 2)]
 
 
 def words_match(guess: Optional[str], target: Optional[str]) -> bool:
@@ -51,7 +72,11 @@ def words_match(guess: Optional[str], target: Optional[str]) -> bool:
     if guess is None or target is None:
         return False
 
-    guess_norm, target_norm = normalize_word(guess), normalize_word(target)
+    return normalized_words_match(normalize_word(guess), normalize_word(target))
+
+
+def normalized_words_match(guess_norm: str, target_norm: str) -> bool:
+    """Check if two already normalized words match"""
     if guess_norm == target_norm:
         return True
     for suffix in ["s", "es", "x"]:
@@ -62,47 +87,59 @@ def words_match(guess: Optional[str], target: Optional[str]) -> bool:
     return False
 
 
-def embed_word(text: str, model) -> np.ndarray:
-    """Transform a word into an embedding"""
+def embed_word(text: str, model, vocab_matrix: Optional[VocabMatrix] = None) -> np.ndarray:
+    """Transform a word into an embedding, reading vocabulary words from the precomputed matrix"""
     words = text.split()
     vectors = []
     for word in words:
-        vectors.append(model[word])
+        if vocab_matrix is None:
+            vectors.append(model[word])
+            continue
+
+        # Matrix rows are normalized, so out-of-vocabulary vectors are too (cosine is unchanged)
+        vector = vocab_matrix.lookup(word)
+        if vector is None:
+            vector = np.asarray(model[word], dtype=np.float32)
+            norm = np.linalg.norm(vector)
+            if norm > 0:
+                vector = vector / norm
+        vectors.append(vector)
     if vectors:
         return np.mean(vectors, axis=0)
     else:
         return np.zeros(300)
 
 
+def matching_types(guess: str, words: ArticleIndex) -> List[int]:
+    """Word types of an article matching a guess (normalized once, not once per word)"""
+    guess_norm = normalize_word(guess)
+    return [
+        t for t, target in enumerate(words.normalized) if normalized_words_match(guess_norm, target)
+    ]
+
+
 def compute_similarity(
-    guess_vec: np.ndarray, words: List[WordInfo], revealed: List[str]
+    guess_vec: np.ndarray, words: ArticleIndex, revealed: Set[str]
 ) -> List[SimilarityResult]:
-    """Compute similarity between the guess vector and the words from the text"""
-    similarities: List[SimilarityResult] = []
-
+    """Compute similarity between the guess vector and the words from the text (one result per
+    distinct word, whose index is the word type)"""
     guess_norm = np.linalg.norm(guess_vec)
-    if guess_norm == 0:
+    if guess_norm == 0 or words.nb_types == 0:
         return []
 
-    for idx, word_info in enumerate(words):
-        if word_info.normalized in revealed:
-            continue
-
-        if word_info.word.isdigit():
-            similarity = 0.0
-        else:
-            word_vec = word_info.embedding
-            word_norm = np.linalg.norm(word_vec)
-
-            if word_norm == 0:
-                similarity = 0.0
-            else:
-                similarity = np.dot(guess_vec, word_vec) / (guess_norm * word_norm)
-
-        similarities.append(
-            SimilarityResult(word=word_info.word, similarity=float(similarity), index=idx)
-        )
-
-    similarities.sort(key=lambda x: x.similarity, reverse=True)
-
-    return [s for s in similarities if s.similarity > SIMILARITY_THRESHOLD]
+    embeddings = np.asarray(words.embeddings, dtype=np.float32)  # Puzzle packs store float16
+    word_norms = np.linalg.norm(embeddings, axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        similarities = (embeddings @ guess_vec) / (word_norms * guess_norm)
+    similarities[word_norms == 0] = 0.0
+
+    results = [
+        SimilarityResult(word=word, similarity=float(similarities[idx]), index=idx)
+        for idx, word in enumerate(words.words)
+        if similarities[idx] > SIMILARITY_THRESHOLD
+        and words.normalized[idx] not in revealed
+        and not word.isdigit()
+    ]
+    results.sort(key=lambda x: x.similarity, reverse=True)
+
+    return results
@@ -0,0 +1,248 @@
+"""Headless game engine: the rules of a game, without any UI string or Streamlit dependency.
+
+Front-ends (the Streamlit app, the game server, benchmarks) drive a Game and turn its
+outcomes into feedback.
+"""
+
+from __future__ import annotations
+
+import difflib
+import math
+import re
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from classes import ArticleIndex, SimilarityResult, WikipediaPage
+from config import GUESS_CACHE_SIZE
+from game.cache import LRUCache
+from game.embedding_utils import compute_similarity, embed_word, matching_types, normalize_word
+from game.hints import get_hint_index
+from game.metrics import register_cache
+from game.tracing import span
+from game.vocab_matrix import get_vocab_matrix
+from game.vocabulary import get_vocabulary
+
+HINT_MIN_LENGTH = 4  # Shorter hidden words (mostly stopwords) are hinted last
+
+# Normalized guess vectors by (language, normalized guess), shared by every game
+guess_vectors = LRUCache(GUESS_CACHE_SIZE)
+# Typo corrections by (language, guess) ("" when no vocabulary word is close enough)
+corrections = LRUCache(GUESS_CACHE_SIZE)
+register_cache("guess_vectors", guess_vectors)
+register_cache("corrections", corrections)
+
+
+@dataclass
+class GuessOutcome:
+    guess: str  # The guess, stripped and lowercased
+    found: int = 0  # Number of words revealed
+    updated: int = 0  # Number of hidden words for which it is now the closest guess
+    repeated: bool = False  # The guess was already made (nothing was evaluated)
+    numeric: bool = False  # The guess is a number
+    corrected: Optional[str] = None  # Vocabulary word the guess was corrected to (typo)
+    won: bool = False  # The game is won after this guess
+
+
+def numeric_similarity(a: float, b: float, sigma: float = 5.0) -> float:
+    """Compute a smooth similarity between two numbers"""
+    return math.exp(-((a - b) ** 2) / (2 * sigma**2))
+
+
+def count_found(words: ArticleIndex, guess: str) -> int:
+    """Number of tokens revealed by the guess"""
+    return sum(int(words.type_counts[t]) for t in matching_types(guess, words))
+
+
+def count_updated(words: ArticleIndex, guess: str) -> int:
+    """Number of tokens whose closest guess is this guess"""
+    return sum(
+        int(words.type_counts[t]) for t, best in enumerate(words.best_guess) if best == guess
+    )
+
+
+def get_guess_vector(guess: str, language: str, model) -> np.ndarray:
+    """Normalized embedding of a guess, computed once per process for each (language, guess)"""
+    key = (language, normalize_word(guess))
+    guess_vec = guess_vectors.get(key)
+    if guess_vec is None:
+        guess_vec = embed_word(key[1], model, get_vocab_matrix(language)).astype(np.float32)
+        norm = np.linalg.norm(guess_vec)
+        if norm > 0:
+            guess_vec /= norm
+        guess_vec.flags.writeable = False  # Shared between games
+        guess_vectors.put(key, guess_vec)
+    return guess_vec
+
+
+def correct_guess(guess: str, language: str) -> Optional[str]:
+    """Closest vocabulary word of a guess that is not in the vocabulary, if any"""
+    vocabulary = get_vocabulary(language)
+    if guess in vocabulary:
+        return None  # Its closest word is itself: no need to scan the vocabulary
+
+    def _closest():
+        close_matches = difflib.get_close_matches(guess, vocabulary.words, n=1, cutoff=0.7)
+        return close_matches[0] if close_matches else ""
+
+    return corrections.get_or_create((language, guess), _closest) or None
+
+
+class Game:
+    """One game on a page: the guesses made and what they revealed"""
+
+    def __init__(
+        self,
+        language: str,
+        article: WikipediaPage,
+        article_words: ArticleIndex,
+        title_words: ArticleIndex,
+        model,
+    ):
+        self.language = language
+        self.article = article
+        self.article_words = article_words
+        self.title_words = title_words
+        self.model = model
+        self.guesses: List[str] = []  # Normalized guesses, repeated ones included
+        self.revealed: set = set()  # Normalized words found by the player
+        self.revealed_end: set = set()  # Normalized words shown when giving up
+        self.won = False
+
+    def guess(self, word: str) -> Optional[GuessOutcome]:
+        """Play a guess, correcting it to a close vocabulary word if it matches nothing"""
+        with span("guess") as trace:
+            outcome = self._guess(word)
+            if outcome is not None:
+                trace["found"] = outcome.found
+                trace["updated"] = outcome.updated
+                if outcome.repeated:
+                    trace["repeated"] = True
+                if outcome.corrected:
+                    trace["corrected"] = True
+            return outcome
+
+    def _guess(self, word: str) -> Optional[GuessOutcome]:
+        with span("normalize"):
+            guess = word.strip().lower()
+            normalized = normalize_word(guess)
+        if not guess:
+            return None
+
+        if normalized in self.guesses:
+            # Replaying the guess cannot change the board: only count the attempt
+            self.guesses.append(normalized)
+            return GuessOutcome(guess, repeated=True, won=self.won)
+
+        self._apply(guess)
+
+        outcome = GuessOutcome(
+            guess,
+            found=count_found(self.article_words, guess),
+            updated=count_updated(self.article_words, guess),
+            numeric=re.fullmatch(r"\d+", guess) is not None,
+        )
+
+        if outcome.found == 0 and outcome.updated == 0 and not outcome.numeric:
+            with span("correct"):
+                close_word = correct_guess(guess, self.language)
+            if close_word:
+                self._apply(close_word)
+                outcome.corrected = close_word
+                outcome.found = count_found(self.article_words, close_word)
+                outcome.updated = count_updated(self.article_words, close_word)
+
+        outcome.won = self.won
+        return outcome
+
+    def _apply(self, guess: str):
+        """Reveal the words matching the guess and update the closest guess of the others"""
+        self.guesses.append(normalize_word(guess))
+        article_words = self.article_words
+
+        with span("match"):
+            for words in (article_words, self.title_words):
+                for t in matching_types(guess, words):
+                    words.best_similarity[t] = 1
+                    self.revealed.add(words.normalized[t])
+
+        if guess.isdigit():
+            guess_num = float(guess)
+            for t, word in enumerate(article_words.words):
+                if word.isdigit():
+                    similarity = numeric_similarity(guess_num, float(word), sigma=5.0)
+                    if similarity > article_words.best_similarity[t]:
+                        article_words.best_guess[t] = guess
+                        article_words.best_similarity[t] = similarity
+        else:
+            with span("embed"):
+                guess_vec = get_guess_vector(guess, self.language, self.model)
+
+            with span("similarity", types=article_words.nb_types) as trace:
+                similar_results: List[SimilarityResult] = compute_similarity(
+                    guess_vec, article_words, self.revealed
+                )
+                trace["similar"] = len(similar_results)
+
+            for result in similar_results:
+                if result.similarity > article_words.best_similarity[result.index]:
+                    article_words.best_guess[result.index] = guess
+                    article_words.best_similarity[result.index] = result.similarity
+
+        if all(w in self.revealed for w in self.title_words.normalized):
+            self.won = True
+
+    def hidden_types(self) -> List[int]:
+        """Word types of the article still to find (numbers excluded)"""
+        words = self.article_words
+        return [
+            t
+            for t, word in enumerate(words.words)
+            if words.normalized[t] not in self.revealed and not word.isdigit()
+        ]
+
+    def hint(self, k: int) -> Optional[List[str]]:
+        """Closest vocabulary words of the hidden word the player is the closest to, or None if
+        hints are unavailable (vocabulary matrix not built)"""
+        hint_index = get_hint_index(self.language)
+        if hint_index is None:
+            return None
+
+        hidden = self.hidden_types()
+        if not hidden:
+            return []
+
+        words = self.article_words
+        # Closest to a guess first; among ties (every word before the first guess), the
+        # longest, as short words are mostly stopwords
+        candidates = [t for t in hidden if len(words.words[t]) >= HINT_MIN_LENGTH] or hidden
+        target = max(candidates, key=lambda t: (words.best_similarity[t], len(words.words[t])))
+        neighbours = hint_index.nearest_words(
+            words.words[target], words.embeddings[target], k, exclude=self.guesses
+        )
+        return [word for word, _ in neighbours]
+
+    def reveal_all(self):
+        """Show every word not found yet (end of game)"""
+        self.revealed_end.update(n for n in self.article_words.normalized if n not in self.revealed)
+
+    def state_snapshot(self) -> Dict[str, Any]:
+        """JSON-serializable state of the game (guess state of each word type included)"""
+        return {
+            "language": self.language,
+            "article": asdict(self.article),
+            "guesses": list(self.guesses),
+            "revealed": sorted(self.revealed),
+            "revealed_end": sorted(self.revealed_end),
+            "won": self.won,
+            "title_words": _words_snapshot(self.title_words),
+            "article_words": _words_snapshot(self.article_words),
+        }
+
+
+def _words_snapshot(words: ArticleIndex) -> Dict[str, Any]:
+    return {
+        "best_guess": list(words.best_guess),
+        "best_similarity": words.best_similarity.tolist(),
+    }
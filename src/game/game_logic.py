@@ -1,29 +1,26 @@
 from __future__ import annotations
 
 import asyncio
-import difflib
-import math
-import os
-import re
-import shutil
-import threading
+import dataclasses
 import time
 import traceback
-from typing import TYPE_CHECKING, List
+from typing import TYPE_CHECKING
 
 import aiohttp
-import numpy as np
-import requests
-import streamlit as st
-
-from config import NB_ARTICLES, NB_ARTICLES_CLASSIFIER, USE_COMPRESSED_MODEL
-from game.embedding_utils import (
-    compute_similarity,
-    embed_word,
-    normalize_word,
-    tokenize_text,
-    words_match,
-)
+
+from classes import ArticleIndex
+from config import ARTICLE_CACHE_SIZE, NB_ARTICLES, NB_ARTICLES_CLASSIFIER, NB_HINT_WORDS
+from game.cache import LRUCache
+from game.embedding_utils import tokenize_text
+from game.engine import Game, GuessOutcome
+from game.metrics import GAME_LOADS, register_cache, track_game
+from game.models import load_fasttext_model
+from game.packs import read_pack
+from game.profiling import profile
+from game.tracing import span
+from game.transport import client_session
+from game.vocabulary import get_vocabulary
+from game.warmup import wait_for
 from game.wiki_api import (
     extract_first_paragraphs,
     fetch_page_views,
@@ -32,64 +29,13 @@ from game.wiki_api import (
 )
 
 if TYPE_CHECKING:
-    from classes import SessionState, WikipediaPage
-    from game.embedding_utils import SimilarityResult
-
-
-_warmup_started = False
-_warmup_lock = threading.Lock()
-
-
-def warmup_imports():
-    """Preload the heavy ML imports (sentence-transformers, xgboost,
-    compress_fasttext — ~7s) in a background thread while the user is on the
-    language menu, so the first game load doesn't pay that cost.
+    from classes import WikipediaPage
+    from ui.session_state import SessionState
 
-    Runs at most once per process. Only warms imports, not the language-specific
-    models, and never touches Streamlit APIs (no ScriptRunContext in the thread).
-    """
-    global _warmup_started
-    with _warmup_lock:
-        if _warmup_started:
-            return
-        _warmup_started = True
-
-    def _run():
-        try:
-            import compress_fasttext.models  # noqa: F401
-
-            import game.classifier  # noqa: F401  (pulls in sentence_transformers, xgboost, ...)
-        except Exception as e:
-            print(f"Warmup import failed: {e}")
 
-    threading.Thread(target=_run, daemon=True).start()
-
-
-@st.cache_resource
-def _load_fasttext_model(language: str):
-    # Heavy imports are deferred to keep app startup fast (see load_game).
-    from compress_fasttext.models import CompressedFastTextKeyedVectors
-
-    models_dir = "models"
-    os.makedirs(models_dir, exist_ok=True)
-
-    if USE_COMPRESSED_MODEL:
-        model_path = f"{models_dir}/fasttext-{language}-mini"
-        if not os.path.exists(model_path):
-            url = f"https://zenodo.org/records/4905385/files/fasttext-{language}-mini?download=1"
-            r = requests.get(url)
-            with open(model_path, "wb") as f:
-                f.write(r.content)
-        return CompressedFastTextKeyedVectors.load(model_path)
-    else:
-        import fasttext
-        import fasttext.util
-
-        local_path = f"{models_dir}/cc.{language}.300.bin"
-        if not os.path.exists(local_path):
-            fasttext.util.download_model(language, if_exists="ignore")
-            shutil.move(f"cc.{language}.300.bin", local_path)
-        return fasttext.load_model(local_path)
+# Prepared pages by (language, title), shared by every session playing them
+shared_articles = LRUCache(ARTICLE_CACHE_SIZE)
+register_cache("articles", shared_articles)
 
 
 async def fetch_views_for_title(
@@ -115,29 +61,36 @@ async def fetch_ranked_candidates(language, update_spinner_func=None):
         update_spinner_func("Récupération d'articles aléatoires...")
         time.sleep(0.2)
 
-    async with aiohttp.ClientSession() as session:
-        titles = await fetch_random_titles(session, language, NB_ARTICLES)
-        semaphore = asyncio.Semaphore(10)
-        tasks = [fetch_views_for_title(session, language, t, semaphore) for t in titles]
-        results = await asyncio.gather(*tasks)
-        candidates = [r for r in results if r is not None]
+    async with client_session() as session:
+        with span("random_titles", count=NB_ARTICLES) as trace:
+            titles = await fetch_random_titles(session, language, NB_ARTICLES)
+            trace["titles"] = len(titles)
+        with span("pageviews", titles=len(titles)) as trace:
+            semaphore = asyncio.Semaphore(10)
+            tasks = [fetch_views_for_title(session, language, t, semaphore) for t in titles]
+            results = await asyncio.gather(*tasks)
+            candidates = [r for r in results if r is not None]
+            trace["candidates"] = len(candidates)
 
     candidates.sort(key=lambda x: x[1], reverse=True)
     return candidates
 
 
-def build_game_from_title(title, language, update_spinner_func=None):
-    """Fetch and prepare a playable game for a specific Wikipedia title.
-
-    Returns the game dict, or None if the page has no usable text. Used by both
-    the solo (classifier-picked) and pass-and-play (human-picked) flows.
-    """
+def _prepare_article(title, language, update_spinner_func=None, fetch_page=None):
+    """Fetch, extract and tokenize a page: the immutable part of a game, shared by all sessions"""
     if update_spinner_func:
         update_spinner_func("Récupération de l'article...")
         time.sleep(0.2)
 
-    article: WikipediaPage = fetch_wikipedia_content(title, language)
-    article.text = extract_first_paragraphs(article.text)
+    page: WikipediaPage = (fetch_page or fetch_wikipedia_content)(title, language)
+    # A new page: the fetched one may be the caller's (e.g. pages cached by a benchmark),
+    # which would otherwise hold extracted text when it is prepared again after eviction.
+    # Pages of the offline corpus are stored extracted
+    article = (
+        page
+        if page.extracted
+        else dataclasses.replace(page, text=extract_first_paragraphs(page.text), extracted=True)
+    )
 
     if not article.text:
         return None
@@ -146,161 +99,173 @@ def build_game_from_title(title, language, update_spinner_func=None):
         update_spinner_func("Préparation de l'IA tueuse...")
         time.sleep(0.2)
 
-    model = _load_fasttext_model(language)
-    article_words = tokenize_text(article.text, model)
-    title_words = tokenize_text(article.title, model)
+    with span("load_model", language=language):
+        model = _language_model(language)
+        get_vocabulary(language)  # Read once per process, then shared by every session
 
     return {
         "article": article,
-        "article_words": article_words,
-        "title_words": title_words,
-        "model": model,
+        "article_data": tokenize_text(article.text, model),
+        "title_data": tokenize_text(article.title, model),
     }
 
 
-async def load_game(language, update_spinner_func):
-    """Solo mode: pick the best article from a random batch via the classifier."""
-    try:
-        candidates = await fetch_ranked_candidates(language, update_spinner_func)
-
-        if not candidates:
-            print("No candidates were successfully fetched.")
-            return []
-
-        print(f"\nTop {NB_ARTICLES_CLASSIFIER} articles by views:")
-        for title, views in candidates[:NB_ARTICLES_CLASSIFIER]:
-            print(f"  {title}: {views} views")
-
-        update_spinner_func("Sélection du meilleur titre...")
-        time.sleep(0.2)
+def build_game_from_title(title, language, update_spinner_func=None, fetch_page=None):
+    """Fetch and prepare a playable game for a specific Wikipedia title.
 
-        # Imported lazily: pulls in sentence-transformers/xgboost (~7s), only
-        # needed once a game is actually loaded, not on the startup menu.
-        from game.classifier import choose_title
+    Returns the Game, or None if the page has no usable text. Used by both
+    the solo (classifier-picked) and pass-and-play (human-picked) flows. Sessions
+    playing the same page share its text and embeddings and only own their guess state.
+    fetch_page(title, language) replaces the Wikipedia API (e.g. pages cached offline).
+    """
+    with (
+        span("build_game", title=title, language=language),
+        profile("build_game", language=language, title=title),
+    ):
+        prepared = shared_articles.get_or_create(
+            (language, title),
+            lambda: _prepare_article(title, language, update_spinner_func, fetch_page),
+        )
+        if not prepared:
+            GAME_LOADS.inc(result="no_text")
+            return None
+        return _new_game(language, prepared)
+
+
+def build_game_from_pack(path):
+    """Start a game on a puzzle pack (see game.packs), whose arrays stay memory-mapped"""
+    with span("build_game", pack=path):
+        prepared = shared_articles.get_or_create(("pack", path), lambda: read_pack(path))
+        get_vocabulary(prepared["language"])
+        return _new_game(prepared["language"], prepared)
+
+
+def _language_model(language, hold=None):
+    """fasttext model of a language, once its vocabulary is read too. Waits for their
+    warmup if it is in flight (started when the language was picked) rather than loading
+    them a second time. The model is not evicted while hold is alive"""
+    wait_for(f"model:{language}")
+    wait_for(f"vocabulary:{language}")
+    return load_fasttext_model(language, hold=hold)
+
+
+def _new_game(language, prepared):
+    game = Game(
+        language,
+        prepared["article"],
+        ArticleIndex(prepared["article_data"]),
+        ArticleIndex(prepared["title_data"]),
+        None,
+    )
+    # Fetched and held at once: an eviction between the two would leave the game with an
+    # unaccounted model
+    game.model = _language_model(language, hold=game)
+    GAME_LOADS.inc(result="ok")
+    track_game(game)
+    return game
 
-        titles = [t for t, _ in candidates[:NB_ARTICLES_CLASSIFIER]]
-        best_title = choose_title(titles, language)
 
-        print(f"\n~~~~ {best_title} ~~~~")
+async def load_game(language, update_spinner_func):
+    """Solo mode: pick the best article from a random batch via the classifier.
 
-        game = build_game_from_title(best_title, language, update_spinner_func)
-        if not game:
-            return False
+    Returns (game, candidate titles), or None on failure."""
+    with (
+        span("load_game", language=language) as trace,
+        profile("load_game", language=language) as profiled,
+    ):
+        try:
+            candidates = await fetch_ranked_candidates(language, update_spinner_func)
 
-        game["wikipedia_choices"] = titles
+            if not candidates:
+                print("No candidates were successfully fetched.")
+                GAME_LOADS.inc(result="no_candidates")
+                return None
 
-        update_spinner_func("Finito !")
-        time.sleep(0.2)
-        return game
+            print(f"\nTop {NB_ARTICLES_CLASSIFIER} articles by views:")
+            for title, views in candidates[:NB_ARTICLES_CLASSIFIER]:
+                print(f"  {title}: {views} views")
 
-    except Exception as e:
-        print(f"Error in load_game: {e}")
-        traceback.print_exc()
-        return False
+            update_spinner_func("Sélection du meilleur titre...")
+            time.sleep(0.2)
 
+            titles = [t for t, _ in candidates[:NB_ARTICLES_CLASSIFIER]]
+            with span("classifier", candidates=len(titles)):
+                # Imported lazily: pulls in sentence-transformers/xgboost (~7s), only
+                # needed once a game is actually loaded, not on the startup menu.
+                from game.classifier import choose_title
 
-def numeric_similarity(a: float, b: float, sigma: float = 5.0) -> float:
-    """Compute a smooth similarity between two numbers"""
-    return math.exp(-((a - b) ** 2) / (2 * sigma**2))
+                wait_for(f"classifier:{language}")  # Models preloaded since the click
+                best_title = choose_title(titles, language)
+            trace["title"] = profiled["title"] = best_title
 
+            print(f"\n~~~~ {best_title} ~~~~")
 
-def process_guess(guess: str, session_state: SessionState):
-    """Logic to handle a guess including feedback and suggestions"""
-    guess = guess.strip().lower()
-    if not guess:
-        return
+            game = build_game_from_title(best_title, language, update_spinner_func)
+            if not game:
+                return None
 
-    if normalize_word(guess) in session_state.guesses:
-        repeated = f"'<b>{guess}</b>' a déjà été proposé", "orange"
-    else:
-        repeated = None
+            update_spinner_func("Finito !")
+            time.sleep(0.2)
+            return game, titles
 
-    handle_guess(guess, session_state)
+        except Exception as e:
+            print(f"Error in load_game: {e}")
+            GAME_LOADS.inc(result="error")
+            traceback.print_exc()
+            return None
 
-    if repeated:
-        return repeated
 
-    found_count = sum(1 for w in session_state.article_words if words_match(guess, w.word))
-    updated_count = sum(1 for w in session_state.article_words if w.best_guess == guess)
+def feedback_for(outcome: GuessOutcome):
+    """Feedback text and color shown for the outcome of a guess"""
+    guess = outcome.guess
+    if outcome.repeated:
+        return f"'<b>{guess}</b>' a déjà été proposé", "orange"
 
-    if found_count == 0 and updated_count == 0:
-        if re.fullmatch(r"\d+", guess.strip()):
-            return f"'<b>{guess}</b>': 🟥", "red"
+    if outcome.corrected:
+        if outcome.found > 0:
+            feedback = f"{'🟩' * outcome.found}{'🟧' * outcome.updated}"
+            color = "green"
+        elif outcome.updated > 0:
+            feedback = f"{'🟧' * outcome.updated}"
+            color = "orange"
+        else:
+            feedback = "🟥"
+            color = "red"
+        return f"'<b>{guess}</b>' corrigé en '<b>{outcome.corrected}</b>' : {feedback}", color
 
-        close_matches = difflib.get_close_matches(guess, session_state.all_words, n=1, cutoff=0.7)
-        close_word = close_matches[0] if close_matches else None
+    if outcome.found > 0:
+        return f"'<b>{guess}</b>': {'🟩' * outcome.found}{'🟧' * outcome.updated}", "green"
+    if outcome.updated > 0:
+        return f"'<b>{guess}</b>': {'🟧' * outcome.updated}", "orange"
+    if outcome.numeric:
+        return f"'<b>{guess}</b>': 🟥", "red"
+    return f"'<b>{guess}</b>' : 🟥", "red"
 
-        if close_word and close_word != guess:
-            handle_guess(close_word, session_state)
 
-            found_close = sum(
-                1 for w in session_state.article_words if words_match(close_word, w.word)
-            )
-            updated_close = sum(
-                1 for w in session_state.article_words if w.best_guess == close_word
-            )
+def process_guess(guess: str, session_state: SessionState):
+    """Play a guess in the session's game and return its feedback (text, color)"""
+    game = session_state.game
+    with profile("guess", language=game.language, title=game.article.title):
+        outcome = game.guess(guess)
+    if outcome is None:
+        return
 
-            if found_close > 0:
-                feedback = f"{'🟩' * found_close}{'🟧' * updated_close}"
-                color = "green"
-            elif updated_close > 0:
-                feedback = f"{'🟧' * updated_close}"
-                color = "orange"
-            else:
-                feedback = "🟥"
-                color = "red"
+    if outcome.corrected:
+        session_state.guess_input = ""
+    return feedback_for(outcome)
 
-            session_state.guess_input = ""
-            return f"'<b>{guess}</b>' corrigé en '<b>{close_word}</b>' : {feedback}", color
 
-        else:
-            return f"'<b>{guess}</b>' : 🟥", "red"
-
-    if found_count > 0:
-        return f"'<b>{guess}</b>': {'🟩' * found_count}{'🟧' * updated_count}", "green"
-    else:
-        return f"'<b>{guess}</b>': {'🟧' * updated_count}", "orange"
-
-
-def handle_guess(guess: str, session_state: SessionState):
-    session_state.guesses.append(normalize_word(guess))
-
-    for word_info in session_state.article_words:
-        if words_match(guess, word_info.word):
-            word_info.best_similarity = 1
-            session_state.revealed.add(word_info.normalized)
-
-    for word_info in session_state.title_words:
-        if words_match(guess, word_info.word):
-            word_info.best_similarity = 1
-            session_state.revealed.add(word_info.normalized)
-
-    if guess.isdigit():
-        guess_num = float(guess)
-        max_similarity = 0.0
-        for word_info in session_state.article_words:
-            if word_info.word.isdigit():
-                word_num = float(word_info.word)
-                similarity = numeric_similarity(guess_num, word_num, sigma=5.0)
-                if similarity > word_info.best_similarity:
-                    word_info.best_guess = guess
-                    word_info.best_similarity = similarity
-                max_similarity = max(max_similarity, similarity)
-    else:
-        guess_vec = embed_word(normalize_word(guess), session_state.model)
-        if np.all(guess_vec == 0):
-            # print(f"Warning: Zero word vector for guess: {guess}")
-            pass
-
-        similar_results: List[SimilarityResult] = compute_similarity(
-            guess_vec, session_state.article_words, session_state.revealed
-        )
+def give_hint(session_state: SessionState):
+    """Give the closest vocabulary words of the hidden word the player is the closest to"""
+    game = session_state.game
+    if not game.hidden_types():
+        return "Plus aucun mot à deviner !", "green"
 
-        for result in similar_results:
-            word_info = session_state.article_words[result.index]
-            if result.similarity > word_info.best_similarity:
-                word_info.best_guess = guess
-                word_info.best_similarity = result.similarity
+    neighbours = game.hint(NB_HINT_WORDS)
+    if neighbours is None:
+        return "Indices indisponibles : matrice du vocabulaire non calculée", "red"
+    if not neighbours:
+        return "Aucun indice pour ce mot", "orange"
 
-    if all(w in session_state.revealed for w in [w.normalized for w in session_state.title_words]):
-        session_state.game_won = True
+    hint = ", ".join(f"<b>{word}</b>" for word in neighbours)
+    return f"💡 Un mot caché est proche de : {hint}", "#3498db"
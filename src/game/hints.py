@@ -0,0 +1,101 @@
+"""Nearest vocabulary words of a hidden word, used to give hints to stuck players.
+
+Search is an exact blocked matrix product over the memory-mapped vocabulary matrix
+(see game.vocab_matrix), with the results of each hidden word cached. The index of a language
+is kept in the model registry with its matrix, and dropped when the matrix is evicted.
+"""
+
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from game.cache import LRUCache
+from game.embedding_utils import normalize_word, words_match
+from game.model_registry import estimate_size, model_registry
+from game.vocab_matrix import VocabMatrix, get_vocab_matrix
+
+BLOCK_SIZE = 8192  # Rows scored at once: bounds the float32 temporaries on float16 matrices
+CACHE_SIZE = 1024  # Number of hidden words whose neighbours are kept per language
+MIN_CANDIDATES = 32  # Neighbours searched at least, cached for the next hints
+VARIANT_MARGIN = 8  # Extra rows for the answer and its variants, which are skipped
+
+
+class HintIndex:
+    """Exact top-k cosine search over the vocabulary matrix of one language"""
+
+    def __init__(self, matrix: VocabMatrix, block_size: int = BLOCK_SIZE):
+        self.matrix = matrix
+        self.block_size = block_size
+        self.cache = LRUCache(CACHE_SIZE)
+
+    def search(self, vector: np.ndarray, k: int) -> List[Tuple[int, float]]:
+        """Return the k (row, similarity) pairs closest to the vector, best first"""
+        norm = np.linalg.norm(vector)
+        if norm == 0:
+            return []
+        query = (vector / norm).astype(np.float32)
+
+        vectors = self.matrix.vectors
+        best_rows = np.empty(0, dtype=np.int64)
+        best_scores = np.empty(0, dtype=np.float32)
+        for start in range(0, vectors.shape[0], self.block_size):
+            block = np.asarray(vectors[start : start + self.block_size], dtype=np.float32)
+            scores = block @ query
+            if len(scores) > k:
+                top = np.argpartition(scores, -k)[-k:]
+            else:
+                top = np.arange(len(scores))
+            best_rows = np.concatenate([best_rows, top + start])
+            best_scores = np.concatenate([best_scores, scores[top]])
+
+        order = np.argsort(-best_scores)[:k]
+        return [(int(best_rows[i]), float(best_scores[i])) for i in order]
+
+    def nearest_words(
+        self, word: str, vector: np.ndarray, k: int, exclude: Iterable[str] = ()
+    ) -> List[Tuple[str, float]]:
+        """Closest vocabulary words of a hidden word, without the word itself, its plural
+        variants and the excluded words (e.g. the guesses already made)"""
+        excluded = {normalize_word(w) for w in exclude}
+        # Guesses are often close to the answer: every excluded word may be among the
+        # closest rows, as may the answer and its variants
+        needed = k + len(excluded) + VARIANT_MARGIN
+        key = normalize_word(word)
+        cached = self.cache.get(key)
+        if cached is None or cached[0] < needed:
+            # Doubled, so that the search is not repeated after each new guess
+            fetched = max(needed, MIN_CANDIDATES, 2 * cached[0] if cached else 0)
+            neighbours = [
+                (self.matrix.words[row], similarity)
+                for row, similarity in self.search(vector, fetched)
+                if not words_match(self.matrix.words[row], word)
+            ]
+            cached = (fetched, neighbours)
+            self.cache.put(key, cached)
+
+        return [(w, s) for w, s in cached[1] if w not in excluded][:k]
+
+
+def get_hint_index(language: str) -> Optional[HintIndex]:
+    """Return the hint index of the current vocabulary matrix of a language, or None if the
+    matrix was not built"""
+    matrix = get_vocab_matrix(language)
+    if matrix is None:
+        return None
+    index = model_registry.get(
+        "hint_index",
+        language,
+        lambda: HintIndex(matrix),
+        size=lambda index: estimate_size(index.cache),  # The matrix is counted on its own
+        parent=("vocab_matrix", language),
+    )
+    if index.matrix is not matrix:  # Matrix replaced between the two calls
+        index = HintIndex(matrix)
+        model_registry.put(
+            "hint_index",
+            language,
+            index,
+            estimate_size(index.cache),
+            parent=("vocab_matrix", language),
+        )
+    return index
@@ -0,0 +1,299 @@
+"""Live metrics in the Prometheus text format, served on a local port next to the app.
+
+Enabled by config.METRICS_PORT or the PEDANTIX_METRICS_PORT environment variable:
+
+    PEDANTIX_METRICS_PORT=9100 uv run streamlit run src/web_viewer.py
+    curl localhost:9100/metrics
+
+The game server always serves them on GET /metrics. Load and guess stages are measured by the
+spans of game.tracing; counters are updated where Wikipedia is called and the classifier
+trained. Counters, gauges and histograms are implemented here (thread-safe, with labels), so
+that exporting needs no extra dependency.
+"""
+
+import os
+import threading
+import weakref
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from config import METRICS_PORT
+from game import tracing
+from game.cache import LRUCache
+from game.model_registry import model_registry
+
+# Seconds: from a cached guess (sub-millisecond) to a cold game load (tens of seconds)
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60
+)  # fmt: skip
+LOAD_ROOTS = ("load_game", "build_game")
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        function: Optional[Callable[[], Dict[LabelValues, float]]] = None,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.function = function  # Values read at scrape time instead of being recorded
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if len(labels) != len(self.labels):
+            raise ValueError(f"{self.name} takes the labels {self.labels}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def samples(self) -> List[str]:
+        values = self.function() if self.function else dict(self._values)
+        return [
+            f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}"
+            for key, value in sorted(values.items())
+        ]
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        return "\n".join(lines + self.samples())
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._counts: Dict[LabelValues, List[int]] = {}
+        self._sums: Dict[LabelValues, float] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            counts = self._counts.get(key)
+            if counts is None:
+                counts = self._counts[key] = [0] * len(self.buckets)
+                self._sums[key] = 0.0
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._sums[key] += value
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            series = [(key, list(counts), self._sums[key]) for key, counts in self._counts.items()]
+        lines = []
+        for key, counts, total in sorted(series):
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}"
+                )
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {total!r}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {cumulative}")
+        return lines
+
+
+REGISTRY: List[Metric] = []
+
+GUESS_SECONDS = Histogram("pedantix_guess_seconds", "Time to evaluate a guess")
+GUESS_STAGE_SECONDS = Histogram(
+    "pedantix_guess_stage_seconds", "Time spent in each stage of a guess", ["stage"]
+)
+LOAD_STAGE_SECONDS = Histogram(
+    "pedantix_game_load_seconds",
+    "Time spent in each stage of a game load (load_game and build_game are the totals)",
+    ["stage"],
+)
+RENDER_SECONDS = Histogram("pedantix_render_seconds", "Time to render the article")
+WIKIPEDIA_REQUESTS = Counter(
+    "pedantix_wikipedia_requests_total",
+    "Requests to the Wikipedia APIs by endpoint and HTTP status (error: no response)",
+    ["endpoint", "status"],
+)
+GAME_LOADS = Counter("pedantix_game_loads_total", "Games loaded, by result", ["result"])
+CLASSIFIER_CHOICES = Counter(
+    "pedantix_classifier_choices_total",
+    "Titles chosen by the classifier, by model (saved, retrained, or views without enough data)",
+    ["model"],
+)
+CLASSIFIER_TRAINING_SECONDS = Histogram(
+    "pedantix_classifier_training_seconds", "Time to retrain the title classifier"
+)
+
+_games: "weakref.WeakSet" = weakref.WeakSet()
+_caches: Dict[str, LRUCache] = {}
+
+Gauge(
+    "pedantix_active_games",
+    "Games in memory (sessions still playing or holding a finished game)",
+    function=lambda: {(): len(_games)},
+)
+
+
+def _cache_values(stat: str) -> Callable[[], Dict[LabelValues, float]]:
+    return lambda: {(name,): cache.stats()[stat] for name, cache in list(_caches.items())}
+
+
+def _hit_ratios() -> Dict[LabelValues, float]:
+    ratios = {}
+    for name, cache in list(_caches.items()):
+        stats = cache.stats()
+        lookups = stats["hits"] + stats["misses"]
+        ratios[(name,)] = stats["hits"] / lookups if lookups else 0.0
+    return ratios
+
+
+Gauge("pedantix_cache_entries", "Entries in each cache", ["cache"], _cache_values("size"))
+Counter("pedantix_cache_hits_total", "Cache hits", ["cache"], _cache_values("hits"))
+Counter("pedantix_cache_misses_total", "Cache misses", ["cache"], _cache_values("misses"))
+Gauge("pedantix_cache_hit_ratio", "Hits over lookups of each cache", ["cache"], _hit_ratios)
+
+
+def _model_values(field: str) -> Callable[[], Dict[LabelValues, float]]:
+    return lambda: {(m["kind"], m["language"]): m[field] for m in model_registry.report()}
+
+
+Gauge(
+    "pedantix_model_megabytes",
+    "Approximate resident size of each loaded model",
+    ["kind", "language"],
+    _model_values("mb"),
+)
+Gauge(
+    "pedantix_model_references",
+    "Games holding each loaded model (not evicted while held)",
+    ["kind", "language"],
+    _model_values("references"),
+)
+Counter(
+    "pedantix_model_evictions_total",
+    "Models evicted to stay within the memory budget",
+    function=lambda: {(): model_registry.evictions},
+)
+
+
+def register_cache(name: str, cache: LRUCache):
+    _caches[name] = cache
+
+
+def track_game(game):
+    """Count a game as active until it is garbage collected"""
+    _games.add(game)
+
+
+def _observe_span(span: tracing.Span, ms: float):
+    seconds = ms / 1000
+    if span.root == "guess":
+        if span.parent is None:
+            GUESS_SECONDS.observe(seconds)
+        else:
+            GUESS_STAGE_SECONDS.observe(seconds, stage=span.name)
+    elif span.root in LOAD_ROOTS:
+        LOAD_STAGE_SECONDS.observe(seconds, stage=span.name)
+    elif span.name == "render":
+        RENDER_SECONDS.observe(seconds)
+
+
+def render() -> str:
+    """Every metric in the Prometheus text exposition format"""
+    return "\n".join(metric.render() for metric in REGISTRY) + "\n"
+
+
+_enabled = False
+_server: Optional[ThreadingHTTPServer] = None
+_server_lock = threading.Lock()
+
+
+def enable():
+    """Measure load and guess stages from now on (their spans are then always timed)"""
+    global _enabled
+    with _server_lock:
+        if not _enabled:
+            tracing.add_listener(_observe_span)
+            _enabled = True
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # One line per scrape would flood the app logs
+
+
+def start_metrics_server(port: Optional[int] = None, host: str = "127.0.0.1") -> Optional[int]:
+    """Serve /metrics from a background thread, once per process. Returns the port, or None if
+    metrics are disabled"""
+    global _server
+    port = port or int(os.environ.get("PEDANTIX_METRICS_PORT") or METRICS_PORT or 0) or None
+    if port is None:
+        return None
+    enable()
+    with _server_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, name="metrics", daemon=True).start()
+            print(f"Metrics served on http://{host}:{_server.server_port}/metrics")
+    return _server.server_port
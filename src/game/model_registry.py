@@ -0,0 +1,255 @@
+"""Models loaded in the process (fasttext models, sentence encoders, title classifiers,
+vocabulary matrices), with their approximate resident size, under a memory budget.
+
+Models are loaded once per process through get(). When their total size exceeds
+config.MODEL_MEMORY_BUDGET_MB (or PEDANTIX_MODEL_BUDGET_MB), the least recently used ones
+are dropped, except those in use: a game holds its fasttext model (get(..., hold=game))
+until it is garbage collected. A dropped model is loaded again on its next use, and so are
+the models derived from it (e.g. the hint index of a vocabulary matrix, see parent). report()
+lists what is resident; it is exported by game.metrics and the game server's /stats.
+"""
+
+import os
+import sys
+import threading
+import time
+import weakref
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config import MODEL_MEMORY_BUDGET_MB
+
+Key = Tuple[str, str]  # Kind of model, language
+
+
+def estimate_size(obj: Any, max_depth: int = 6) -> int:
+    """Approximate bytes held by a model: its numpy arrays (memory-mapped ones included, as
+    they become resident once read), torch parameters, strings and containers, found through
+    attributes. Native objects (xgboost, classic fasttext) are not seen: give their file size"""
+    seen = set()
+    total = 0
+    stack = [(obj, 0)]
+    while stack:
+        item, depth = stack.pop()
+        if id(item) in seen or item is None:
+            continue
+        seen.add(id(item))
+        # Arrays are duck-typed: numpy is not imported here, as the language menu reads the
+        # registry (through game.metrics) before numpy is loaded
+        if hasattr(item, "nbytes") and hasattr(item, "dtype"):
+            total += item.nbytes
+        elif isinstance(item, (str, bytes, int, float)):
+            total += sys.getsizeof(item)
+        elif callable(getattr(item, "parameters", None)) and hasattr(item, "buffers"):
+            tensors = list(item.parameters()) + list(item.buffers())  # torch module
+            total += sum(t.numel() * t.element_size() for t in tensors)
+        elif depth < max_depth:
+            if isinstance(item, dict):
+                total += sys.getsizeof(item)
+                children = list(item.keys()) + list(item.values())
+            elif isinstance(item, (list, tuple, set, frozenset)):
+                total += sys.getsizeof(item)
+                children = list(item)
+            else:
+                children = list(getattr(item, "__dict__", {}).values())
+                for cls in type(item).__mro__:
+                    for name in getattr(cls, "__slots__", ()):
+                        children.append(getattr(item, name, None))
+            stack.extend((child, depth + 1) for child in children)
+    return total
+
+
+class _Entry:
+    __slots__ = (
+        "value",
+        "size",
+        "refs",
+        "pinned",
+        "parent",
+        "successor",
+        "last_used",
+        "load_seconds",
+    )
+
+    def __init__(
+        self,
+        value: Any,
+        size: int,
+        pinned: bool = False,
+        load_seconds: float = 0.0,
+        parent: Optional[Key] = None,
+    ):
+        self.value = value
+        self.size = size
+        self.refs = 0
+        self.pinned = pinned
+        self.parent = parent  # Dropped with this model, as it references it
+        self.successor: Optional[_Entry] = None  # Entry that replaced it, with its references
+        self.last_used = time.monotonic()
+        self.load_seconds = load_seconds
+
+
+class ModelRegistry:
+    """Thread-safe mapping of (kind, language) to loaded models, evicting the least recently
+    used unreferenced ones beyond a memory budget (in bytes, None for no limit)"""
+
+    def __init__(self, budget: Optional[int]):
+        self.budget = budget
+        self.evictions = 0
+        self._entries: Dict[Key, _Entry] = {}
+        self._lock = threading.Lock()
+        self._loading: Dict[Key, threading.Lock] = {}  # Concurrent callers wait for one load
+
+    def get(
+        self,
+        kind: str,
+        language: str,
+        load: Callable[[], Any],
+        size: Callable[[Any], int] = estimate_size,
+        hold: Any = None,
+        parent: Optional[Key] = None,
+    ) -> Any:
+        """The model, loaded by load() on first use (or after its eviction). With hold, the
+        model is kept from eviction as long as that object (e.g. a game) is alive. A model
+        with a parent (kind, language) is dropped when its parent is evicted or replaced"""
+        key = (kind, language)
+        entry = self._held_entry(key, hold)
+        if entry is None:
+            with self._lock:
+                lock = self._loading.setdefault(key, threading.Lock())
+            with lock:
+                entry = self._held_entry(key, hold)
+                if entry is None:
+                    start = time.perf_counter()
+                    value = load()
+                    seconds = time.perf_counter() - start
+                    size_bytes = size(value) if value is not None else 0
+                    entry = _Entry(value, size_bytes, False, seconds, parent)
+                    if hold is not None:
+                        entry.refs = 1  # Before it is stored, so that it cannot be evicted
+                    self._store(key, entry)
+        if hold is not None:
+            weakref.finalize(hold, self._release_entry, entry)
+        entry.last_used = time.monotonic()
+        return entry.value
+
+    def _held_entry(self, key: Key, hold: Any) -> Optional[_Entry]:
+        """The stored entry, referenced once more under the lock if hold is given (an entry
+        looked up then acquired could be evicted in between)"""
+        if hold is None:
+            return self._entries.get(key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.refs += 1
+            return entry
+
+    def peek(self, kind: str, language: str) -> Any:
+        """The model if it is loaded, else None"""
+        entry = self._entries.get((kind, language))
+        if entry is None:
+            return None
+        entry.last_used = time.monotonic()
+        return entry.value
+
+    def put(
+        self,
+        kind: str,
+        language: str,
+        value: Any,
+        size: Optional[int] = None,
+        pinned: bool = False,
+        parent: Optional[Key] = None,
+    ):
+        """Replace a model (e.g. a retrained classifier). Pinned models are never evicted"""
+        size = estimate_size(value) if size is None else size
+        self._store((kind, language), _Entry(value, size, pinned, parent=parent))
+
+    def _store(self, key: Key, entry: _Entry):
+        with self._lock:
+            previous = self._entries.get(key)
+            if previous is not None:
+                # Holders of the previous model release the new one: it takes their references
+                entry.refs += previous.refs
+                previous.refs = 0
+                previous.successor = entry
+                self._drop_children(key)
+            self._entries[key] = entry
+            self._evict(keep=key)
+
+    def _drop_children(self, key: Key):
+        for child, entry in list(self._entries.items()):
+            if entry.parent == key and child in self._entries:
+                del self._entries[child]
+                self._drop_children(child)
+
+    def _evict(self, keep: Key):
+        total = sum(entry.size for entry in self._entries.values())
+        if self.budget is None or total <= self.budget:
+            return
+        by_age = sorted(self._entries.items(), key=lambda item: item[1].last_used)
+        for key, entry in by_age:
+            if key == keep or entry.refs > 0 or entry.pinned:
+                continue
+            if key not in self._entries:  # Dropped with its parent
+                continue
+            del self._entries[key]
+            self._drop_children(key)
+            self.evictions += 1
+            total = sum(other.size for other in self._entries.values())
+            print(f"Evicting the {key[0]} model of {key[1]} ({entry.size / 1e6:.0f} MB)")
+            if total <= self.budget:
+                return
+        print(
+            f"Models use {total / 1e6:.0f} MB, over the budget of {self.budget / 1e6:.0f} MB, "
+            "but every other model is in use"
+        )
+
+    def acquire(self, kind: str, language: str):
+        """Keep a loaded model from being evicted until release()"""
+        with self._lock:
+            entry = self._entries.get((kind, language))
+            if entry is not None:
+                entry.refs += 1
+
+    def release(self, kind: str, language: str):
+        with self._lock:
+            entry = self._entries.get((kind, language))
+            if entry is not None and entry.refs > 0:
+                entry.refs -= 1
+
+    def _release_entry(self, entry: _Entry):
+        """Release the reference of a holder, on the entry that replaced the held one if any"""
+        with self._lock:
+            while entry.successor is not None:
+                entry = entry.successor
+            if entry.refs > 0:
+                entry.refs -= 1
+
+    def total_size(self) -> int:
+        return sum(entry.size for entry in list(self._entries.values()))
+
+    def report(self) -> List[Dict]:
+        """Resident models, most recently used first"""
+        now = time.monotonic()
+        with self._lock:
+            items = sorted(self._entries.items(), key=lambda item: -item[1].last_used)
+            return [
+                {
+                    "kind": kind,
+                    "language": language,
+                    "mb": round(entry.size / 1e6, 1),
+                    "references": entry.refs,
+                    "pinned": entry.pinned,
+                    "idle_seconds": round(now - entry.last_used, 1),
+                    "load_seconds": round(entry.load_seconds, 2),
+                }
+                for (kind, language), entry in items
+            ]
+
+
+def _budget() -> Optional[int]:
+    megabytes = os.environ.get("PEDANTIX_MODEL_BUDGET_MB") or MODEL_MEMORY_BUDGET_MB
+    return int(float(megabytes) * 1e6) if megabytes else None
+
+
+model_registry = ModelRegistry(_budget())
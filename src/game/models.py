@@ -0,0 +1,81 @@
+import os
+from typing import Optional
+
+import requests
+
+from config import MODEL_CHECKSUMS
+from game.download import download, download_gzipped
+from game.model_registry import estimate_size, model_registry
+from game.vocab_matrix import model_variant
+
+MODELS_DIR = "models"
+ZENODO_RECORD = "4905385"  # Compressed models by Bernhard Liebl
+ZENODO_URL = f"https://zenodo.org/records/{ZENODO_RECORD}/files/{{name}}?download=1"
+CC_URL = "https://dl.fbaipublicfiles.com/fasttext/vectors-crawl/{name}.gz"
+
+
+def _zenodo_checksum(name: str) -> Optional[str]:
+    """md5 of a file of the Zenodo record, as published with it ("md5:<hex>")"""
+    try:
+        response = requests.get(f"https://zenodo.org/api/records/{ZENODO_RECORD}", timeout=30)
+        response.raise_for_status()
+        for file in response.json().get("files", []):
+            if file.get("key") == name:
+                return file.get("checksum")
+    except (requests.RequestException, ValueError) as e:
+        print(f"No checksum for {name}: {e}")
+    return None
+
+
+def read_fasttext_model(language: str, variant: str):
+    """Load a fasttext model ("mini", "cc" or "distilled", see model_variant()), downloading
+    it first if needed"""
+    # Heavy imports are deferred to keep app startup fast (see load_game).
+    os.makedirs(MODELS_DIR, exist_ok=True)
+
+    if variant == "distilled":
+        from game.distill import DistilledModel, distilled_path
+
+        model_path = distilled_path(language)
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(
+                f"{model_path} is missing: build it with python -m game.distill {language}"
+            )
+        return DistilledModel(model_path)
+    elif variant == "mini":
+        from compress_fasttext.models import CompressedFastTextKeyedVectors
+
+        name = f"fasttext-{language}-mini"
+        model_path = f"{MODELS_DIR}/{name}"
+        if not os.path.exists(model_path):
+            checksum = MODEL_CHECKSUMS.get(name) or _zenodo_checksum(name)
+            download(ZENODO_URL.format(name=name), model_path, checksum)
+        return CompressedFastTextKeyedVectors.load(model_path)
+    else:
+        import fasttext
+
+        name = f"cc.{language}.300.bin"
+        local_path = f"{MODELS_DIR}/{name}"
+        # The checksum, if any, is the one of the .gz archive
+        download_gzipped(CC_URL.format(name=name), local_path, MODEL_CHECKSUMS.get(f"{name}.gz"))
+        return fasttext.load_model(local_path)
+
+
+def _model_size(language: str):
+    if model_variant() != "cc":
+        return estimate_size
+    # The classic model lives in native memory, about the size of its file
+    return lambda model: os.path.getsize(f"{MODELS_DIR}/cc.{language}.300.bin")
+
+
+def load_fasttext_model(language: str, hold=None):
+    """Return the fasttext model of a language, loaded once per process (concurrent callers
+    wait for the same load) and kept in the model registry, not evicted while hold (e.g. a
+    game) is alive"""
+    return model_registry.get(
+        "fasttext",
+        language,
+        lambda: read_fasttext_model(language, model_variant()),
+        _model_size(language),
+        hold=hold,
+    )
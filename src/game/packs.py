@@ -0,0 +1,197 @@
+"""Puzzle packs: games prepared offline (page fetched, extracted, tokenized and embedded), so
+that starting one only maps a file.
+
+A pack set is a directory packs/<language>/<set name>/ with one .npz file per page. Build one
+from a list of titles (from the repository root, pages fetched in parallel):
+
+    PYTHONPATH=src python -m game.packs build fr daily-2026-10 titles.txt [--workers 4]
+
+Packs are uncompressed, so that their arrays are memory-mapped where they lie in the archive
+instead of being read: loading a pack takes milliseconds, whatever its size.
+"""
+
+import argparse
+import json
+import os
+import struct
+import time
+import zipfile
+from multiprocessing import Pool
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from classes import ArticleData, WikipediaPage
+from game.vocab_matrix import model_variant
+
+PACKS_DIR = "packs"
+FORMAT_VERSION = 1
+_SECTIONS = ("article", "title")
+# Zip local file header: signature, then the lengths of the name and extra fields
+_LOCAL_HEADER = struct.Struct("<4s22xHH")
+
+
+def pack_sets(language: str) -> List[str]:
+    """Names of the pack sets of a language that hold at least one pack"""
+    directory = os.path.join(PACKS_DIR, language)
+    if not os.path.isdir(directory):
+        return []
+    return sorted(name for name in os.listdir(directory) if pack_paths(language, name))
+
+
+def pack_paths(language: str, name: str) -> List[str]:
+    directory = os.path.join(PACKS_DIR, language, name)
+    if not os.path.isdir(directory):
+        return []
+    return sorted(os.path.join(directory, f) for f in os.listdir(directory) if f.endswith(".npz"))
+
+
+def write_pack(path: str, language: str, prepared: Dict) -> str:
+    """Write a prepared page (see game_logic._prepare_article) as a pack, embeddings in float16"""
+    article: WikipediaPage = prepared["article"]
+    meta = {
+        "version": FORMAT_VERSION,
+        "language": language,
+        "model": model_variant(),
+        "title": article.title,
+        "url": article.url,
+        "text": article.text,
+    }
+    arrays = {"meta": np.frombuffer(json.dumps(meta, ensure_ascii=False).encode(), np.uint8)}
+    for section in _SECTIONS:
+        data: ArticleData = prepared[f"{section}_data"]
+        arrays[f"{section}_starts"] = data.starts
+        arrays[f"{section}_ends"] = data.ends
+        arrays[f"{section}_type_ids"] = data.type_ids
+        arrays[f"{section}_words"] = np.array(data.words, dtype=str)
+        arrays[f"{section}_normalized"] = np.array(data.normalized, dtype=str)
+        arrays[f"{section}_embeddings"] = data.embeddings.astype(np.float16)
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as f:
+        np.savez(f, **arrays)  # Uncompressed, so that members can be memory-mapped
+    os.replace(temporary, path)
+    return path
+
+
+def _map_members(path: str) -> Dict[str, np.ndarray]:
+    """Memory-map every array of an uncompressed .npz where it lies in the archive"""
+    arrays = {}
+    with zipfile.ZipFile(path) as archive, open(path, "rb") as f:
+        for info in archive.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError(f"{path}: compressed member {info.filename}")
+            f.seek(info.header_offset)
+            signature, name_length, extra_length = _LOCAL_HEADER.unpack(f.read(_LOCAL_HEADER.size))
+            if signature != b"PK\x03\x04":
+                raise ValueError(f"{path}: bad zip header for {info.filename}")
+            f.seek(info.header_offset + _LOCAL_HEADER.size + name_length + extra_length)
+
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            name = info.filename.removesuffix(".npy")
+            if dtype.hasobject:
+                raise ValueError(f"{path}: object array {name}")
+            if int(np.prod(shape)) == 0:
+                arrays[name] = np.empty(shape, dtype)  # Empty ranges cannot be mapped
+            else:
+                arrays[name] = np.memmap(
+                    path,
+                    dtype,
+                    mode="r",
+                    offset=f.tell(),
+                    shape=shape,
+                    order="F" if fortran_order else "C",
+                )
+    return arrays
+
+
+def read_pack(path: str) -> Dict:
+    """Prepared page of a pack (as game_logic._prepare_article returns it) and its language.
+    Token arrays and embeddings stay memory-mapped"""
+    arrays = _map_members(path)
+    meta = json.loads(arrays["meta"].tobytes())
+    if meta["version"] != FORMAT_VERSION:
+        raise ValueError(f"{path}: pack format {meta['version']}, expected {FORMAT_VERSION}")
+    if meta["model"] != model_variant():
+        raise ValueError(f"{path}: built with the {meta['model']} model, not {model_variant()}")
+
+    prepared = {
+        "language": meta["language"],
+        "article": WikipediaPage(meta["title"], meta["text"], meta["url"], extracted=True),
+    }
+    for section in _SECTIONS:
+        prepared[f"{section}_data"] = ArticleData(
+            arrays[f"{section}_starts"],
+            arrays[f"{section}_ends"],
+            arrays[f"{section}_type_ids"],
+            tuple(arrays[f"{section}_words"].tolist()),
+            tuple(arrays[f"{section}_normalized"].tolist()),
+            arrays[f"{section}_embeddings"],
+        )
+    return prepared
+
+
+def _file_name(index: int, title: str) -> str:
+    slug = "".join(c if c.isalnum() else "_" for c in title)[:80]
+    return f"{index:04d}-{slug}.npz"
+
+
+def _build(task: Tuple[int, str, str, str]) -> Tuple[str, Optional[str], str]:
+    """Prepare one page and write its pack (run in the workers)"""
+    from game.game_logic import _prepare_article
+
+    index, title, language, directory = task
+    try:
+        prepared = _prepare_article(title, language)
+        if not prepared:
+            return title, None, "no usable text"
+        path = write_pack(os.path.join(directory, _file_name(index, title)), language, prepared)
+        return title, path, ""
+    except Exception as e:
+        return title, None, str(e)
+
+
+def build(args):
+    titles = list(args.titles)
+    if args.file:
+        with open(args.file, encoding="utf-8") as f:
+            titles += [line.strip() for line in f if line.strip()]
+    if not titles:
+        raise SystemExit("No title to build")
+
+    directory = os.path.join(PACKS_DIR, args.language, args.name)
+    start, built = time.perf_counter(), 0
+    tasks = [(i, title, args.language, directory) for i, title in enumerate(titles)]
+    with Pool(min(args.workers, len(tasks))) as pool:
+        for title, path, error in pool.imap_unordered(_build, tasks):
+            if path:
+                built += 1
+                print(f"{title} -> {path} ({os.path.getsize(path) / 1e3:.0f} kB)")
+            else:
+                print(f"Skipping {title}: {error}")
+    print(f"{built}/{len(titles)} packs built in {time.perf_counter() - start:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build puzzle packs")
+    commands = parser.add_subparsers(required=True)
+
+    build_parser = commands.add_parser("build", help="Prepare pages as packs of a set")
+    build_parser.add_argument("language", choices=["fr", "en"])
+    build_parser.add_argument("name", help="Name of the set (e.g. daily-2026-10)")
+    build_parser.add_argument("file", nargs="?", help="File with one title per line")
+    build_parser.add_argument("--title", dest="titles", action="append", default=[])
+    build_parser.add_argument("--workers", type=int, default=os.cpu_count())
+    build_parser.set_defaults(func=build)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
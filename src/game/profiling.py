@@ -0,0 +1,227 @@
+"""On-demand profiles of Streamlit reruns, game loads and guesses, to find out why an article
+is slow to load or a guess lags without editing code.
+
+Enabled by config.PROFILE_MODE or the PEDANTIX_PROFILE environment variable, or for a single
+browser session with the hidden query parameter ?profile=cprofile (or ?profile=sampling):
+
+    PEDANTIX_PROFILE=sampling uv run streamlit run src/web_viewer.py
+
+Each profiled invocation writes a file to profiles/, named after its time, stage, language
+and article title (e.g. 20261018-142501-123-load_game-fr-Tour_Eiffel.collapsed):
+- cprofile: deterministic profile (.prof), read with pstats or snakeviz. A stage run inside
+  another one (a game load during a rerun) is part of the outer profile.
+- sampling: the stack of the profiled thread is sampled every few milliseconds and written as
+  collapsed stacks (one "frame;frame;frame count" line per stack) for flamegraph.pl or
+  speedscope. Wall-clock time, so waits on Wikipedia show up. Lower overhead than cprofile,
+  and every nested stage gets its own file.
+"""
+
+import cProfile
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import PROFILE_MODE
+
+PROFILES_DIR = "profiles"
+MODES = ("cprofile", "sampling")
+SAMPLE_INTERVAL = 0.005  # Seconds between two samples
+
+Stack = Tuple[str, ...]
+
+_requested: ContextVar[Optional[str]] = ContextVar("profile_mode", default=None)
+_active: ContextVar[Optional["Profile"]] = ContextVar("profile", default=None)
+
+
+def _parse_mode(value: Optional[str]) -> Optional[str]:
+    if not value or value.lower() in ("0", "false", "off"):
+        return None
+    if value.lower() in ("1", "true", "on"):
+        return "cprofile"
+    if value not in MODES:
+        print(f"Unknown profile mode {value}, expected one of {MODES}")
+        return None
+    return value
+
+
+_default_mode = _parse_mode(os.environ.get("PEDANTIX_PROFILE", PROFILE_MODE))
+
+
+@contextmanager
+def profile_mode(value: Optional[str]):
+    """Profile the stages run in this context with this mode (e.g. from a query parameter),
+    on top of the one of the configuration"""
+    token = _requested.set(_parse_mode(value))
+    try:
+        yield
+    finally:
+        _requested.reset(token)
+
+
+def _slug(value: Any) -> str:
+    return "".join(c if c.isalnum() else "_" for c in str(value))[:60]
+
+
+class _Sampler:
+    """Background thread adding the stack of each profiled thread to its active profiles"""
+
+    def __init__(self):
+        self._targets: Dict[int, List["Profile"]] = {}
+        self._labels: Dict[Any, str] = {}  # Frame labels by code object
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def attach(self, profile: "Profile"):
+        with self._lock:
+            self._targets.setdefault(profile.thread_id, []).append(profile)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="sampler", daemon=True)
+                self._thread.start()
+
+    def detach(self, profile: "Profile"):
+        with self._lock:
+            profiles = self._targets[profile.thread_id]
+            profiles.remove(profile)
+            if not profiles:
+                del self._targets[profile.thread_id]
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            path = "/".join(code.co_filename.replace("\\", "/").split("/")[-2:])
+            label = self._labels[code] = f"{code.co_qualname} ({path}:{code.co_firstlineno})"
+        return label
+
+    def _stack(self, frame) -> Stack:
+        labels = []
+        while frame is not None:
+            labels.append(self._label(frame.f_code))
+            frame = frame.f_back
+        return tuple(reversed(labels))
+
+    def _run(self):
+        while True:
+            time.sleep(SAMPLE_INTERVAL)
+            frames = sys._current_frames()
+            with self._lock:  # Held while counting, so that a detached profile is final
+                if not self._targets:
+                    self._thread = None
+                    return
+                for thread_id, profiles in self._targets.items():
+                    frame = frames.get(thread_id)
+                    if frame is None:
+                        continue
+                    stack = self._stack(frame)
+                    for profile in profiles:
+                        # Frames below the one that started the profile are not part of it
+                        profile.samples[stack[profile.depth :] or stack[-1:]] += 1
+
+
+_sampler = _Sampler()
+
+
+class Profile:
+    """A profiled stage, with tags naming its file (set while it runs: profile["title"] = t)"""
+
+    def __init__(self, stage: str, mode: str, tags: Dict[str, Any]):
+        self.stage = stage
+        self.mode = mode
+        self.tags = tags
+        self.samples: Counter = Counter()
+
+    def __setitem__(self, key: str, value: Any):
+        self.tags[key] = value
+
+    def __enter__(self) -> "Profile":
+        self._token = _active.set(self)
+        self._profiler = None
+        if self.mode == "cprofile":
+            self._profiler = cProfile.Profile()
+            try:
+                self._profiler.enable()
+            except ValueError:  # Another thread is already being profiled (one at a time)
+                print(f"Not profiling {self.stage}: a profile is already running")
+                self._profiler = None
+        else:
+            frame, self.depth = sys._getframe(1), -1  # Keep the frame of the `with`
+            while frame is not None:
+                frame, self.depth = frame.f_back, self.depth + 1
+            self.thread_id = threading.get_ident()
+            _sampler.attach(self)
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> bool:
+        ms = (time.perf_counter() - self._start) * 1000
+        if self.mode == "cprofile":
+            if self._profiler is not None:
+                self._profiler.disable()
+        else:
+            _sampler.detach(self)
+        _active.reset(self._token)
+        try:
+            path = self.write()
+        except OSError as e:
+            print(f"Could not write the profile of {self.stage}: {e}")
+        else:
+            if path:
+                print(f"Profile of {self.stage} ({ms:.0f} ms) written to {path}")
+        return False
+
+    def path(self, extension: str) -> str:
+        parts = [f"{datetime.now():%Y%m%d-%H%M%S-%f}"[:-3], self.stage]
+        parts += [_slug(value) for value in self.tags.values() if value is not None]
+        return os.path.join(PROFILES_DIR, "-".join(parts) + extension)
+
+    def write(self) -> Optional[str]:
+        os.makedirs(PROFILES_DIR, exist_ok=True)
+        if self.mode == "cprofile":
+            if self._profiler is None:
+                return None
+            path = self.path(".prof")
+            self._profiler.dump_stats(path)
+            return path
+
+        if not self.samples:
+            return None  # Shorter than the sampling interval
+        path = self.path(".collapsed")
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{';'.join(stack)} {count}\n")
+        return path
+
+
+class _NoProfile:
+    """Stand-in for Profile when profiling is disabled"""
+
+    __slots__ = ()
+
+    def __setitem__(self, key: str, value: Any):
+        pass
+
+    def __enter__(self) -> "_NoProfile":
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> bool:
+        return False
+
+
+_NO_PROFILE = _NoProfile()
+
+
+def profile(stage: str, **tags):
+    """Context manager profiling a stage (a no-op unless profiling is enabled). Tags, such as
+    the language and the article title, name the file of the profile"""
+    mode = _requested.get() or _default_mode
+    if mode is None:
+        return _NO_PROFILE
+    outer = _active.get()
+    if mode == "cprofile" and outer is not None and outer.mode == "cprofile":
+        return _NO_PROFILE  # Part of the outer profile: cProfile cannot nest
+    return Profile(stage, mode, tags)
@@ -0,0 +1,148 @@
+"""Timing spans of game loads and guesses, written as JSON lines to see where the time goes.
+
+Enabled by config.TRACE_FILE or the PEDANTIX_TRACE environment variable (path of the log):
+
+    PEDANTIX_TRACE=traces.jsonl uv run streamlit run src/web_viewer.py
+
+Each line is a finished span, e.g.
+{"ts": 1760000000.12, "span": "fetch", "ms": 412.3, "trace": 7, "id": 9, "parent": 7, "pid": 4242,
+"title": "Tour Eiffel", "bytes": 183422}. Spans opened inside another one (in the same thread
+or asyncio task) share the trace of the outermost one (a game load, a guess). When tracing is
+disabled (and no listener such as game.metrics is registered), span() returns a shared object
+that does nothing.
+"""
+
+import contextvars
+import itertools
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from config import TRACE_FILE
+
+_current: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("span", default=None)
+_ids = itertools.count(1)
+
+
+class TraceWriter:
+    """Appends spans to a JSON lines file, one line per span"""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8", buffering=1)
+        self._lock = threading.Lock()
+
+    def write(self, record: Dict[str, Any]):
+        line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            if not self._file.closed:  # Spans may end after tracing was disabled
+                self._file.write(line)
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class Span:
+    """A timed stage, with attributes (sizes, counts) set while it runs: span["tokens"] = n"""
+
+    __slots__ = ("name", "attrs", "id", "parent", "trace", "root", "ts", "_start", "_token")
+
+    def __init__(self, name: str, attrs: Dict[str, Any]):
+        self.name = name
+        self.attrs = attrs
+
+    def __setitem__(self, key: str, value: Any):
+        self.attrs[key] = value
+
+    def __enter__(self) -> "Span":
+        parent = _current.get()
+        self.id = next(_ids)
+        self.parent = parent.id if parent else None
+        self.trace = parent.trace if parent else self.id
+        self.root = parent.root if parent else self.name  # Name of the outermost span
+        self._token = _current.set(self)
+        self.ts = time.time()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> bool:
+        ms = (time.perf_counter() - self._start) * 1000
+        _current.reset(self._token)
+        for listener in _listeners:
+            listener(self, ms)
+        writer = _writer
+        if writer is None:
+            return False
+        record = {
+            "ts": round(self.ts, 6),
+            "span": self.name,
+            "ms": round(ms, 3),
+            "trace": self.trace,
+            "id": self.id,
+            "parent": self.parent,
+            "pid": os.getpid(),
+            **self.attrs,
+        }
+        if exc_type is not None:
+            record["error"] = exc_type.__name__
+        writer.write(record)
+        return False
+
+
+class _NoSpan:
+    """Stand-in for Span when tracing is disabled"""
+
+    __slots__ = ()
+
+    def __setitem__(self, key: str, value: Any):
+        pass
+
+    def __enter__(self) -> "_NoSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> bool:
+        return False
+
+
+_NO_SPAN = _NoSpan()
+_writer: Optional[TraceWriter] = None
+_listeners: List[Callable[[Span, float], None]] = []  # Called with each finished span
+
+
+def span(name: str, **attrs):
+    """Context manager timing a stage (a no-op when tracing is disabled)"""
+    if _writer is None and not _listeners:
+        return _NO_SPAN
+    return Span(name, attrs)
+
+
+def add_listener(listener: Callable[[Span, float], None]):
+    """Call listener(span, milliseconds) whenever a span ends, even if no trace is written"""
+    _listeners.append(listener)
+
+
+def enabled() -> bool:
+    return _writer is not None
+
+
+def enable(path: str):
+    """Write spans to this file from now on"""
+    global _writer
+    previous, _writer = _writer, TraceWriter(path)
+    if previous is not None:
+        previous.close()
+
+
+def disable():
+    global _writer
+    previous, _writer = _writer, None
+    if previous is not None:
+        previous.close()
+
+
+if os.environ.get("PEDANTIX_TRACE", TRACE_FILE):
+    enable(os.environ.get("PEDANTIX_TRACE", TRACE_FILE))
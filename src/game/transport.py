@@ -0,0 +1,342 @@
+"""HTTP transport of the Wikipedia layer: live, recording responses to cassettes, or replaying
+them without network (e.g. on CI, or to benchmark game loads reproducibly).
+
+The mode is config.HTTP_TRANSPORT, overridden by the PEDANTIX_TRANSPORT environment variable
+("live", "record" or "replay"), and cassettes are stored in CASSETTE_DIR (PEDANTIX_CASSETTES):
+
+    PEDANTIX_TRANSPORT=record PYTHONPATH=src python -m benchmarks.load_players record fr ...
+    PEDANTIX_TRANSPORT=replay uv run streamlit run src/web_viewer.py
+
+Requests are matched on their method, URL and parameters, with the dates of pageview
+queries ignored. Each cassette keeps every response recorded for its request, replayed in
+turn (random titles differ from one call to the next). Replay can add latency, jitter and
+rate limiting (429) to reproduce network conditions, see ReplayConditions.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, unquote, urlencode, urlsplit
+
+import aiohttp
+import requests
+from multidict import CIMultiDict, CIMultiDictProxy
+from requests.adapters import BaseAdapter, HTTPAdapter
+from yarl import URL
+
+from config import (
+    CASSETTE_DIR,
+    HTTP_TRANSPORT,
+    REPLAY_JITTER_MS,
+    REPLAY_LATENCY_MS,
+    REPLAY_RATE_LIMITED,
+)
+
+MODES = ("live", "record", "replay")
+KEPT_HEADERS = ("Content-Type", "Retry-After")
+PAGEVIEW_DATES = re.compile(r"(/metrics/pageviews/.*)/\d{8}/\d{8}$")
+
+
+@dataclass
+class ReplayConditions:
+    latency_ms: float = REPLAY_LATENCY_MS  # Added to every replayed response
+    jitter_ms: float = REPLAY_JITTER_MS  # Uniform spread around the latency
+    rate_limited: float = REPLAY_RATE_LIMITED  # Share of requests answered 429
+    retry_after: Optional[str] = "1"  # Retry-After header of the 429 responses
+    seed: Optional[int] = None
+
+    def __post_init__(self):
+        self.rng = random.Random(self.seed)
+
+    def delay(self) -> float:
+        jitter = self.rng.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0
+        return max(self.latency_ms + jitter, 0) / 1000
+
+    def is_rate_limited(self) -> bool:
+        return self.rate_limited > 0 and self.rng.random() < self.rate_limited
+
+
+def request_key(method: str, url: str, params: Optional[Dict] = None) -> str:
+    """Canonical form of a request: parameters sorted, path unquoted, pageview dates dropped"""
+    parts = urlsplit(url)
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    query += [(str(k), str(v)) for k, v in (params or {}).items()]
+    path = PAGEVIEW_DATES.sub(r"\1/{start}/{end}", unquote(parts.path))
+    return f"{method.upper()} {parts.netloc}{path}?{urlencode(sorted(query))}"
+
+
+class CassetteStore:
+    """Recorded responses by request, one JSON file per request"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._cassettes: Dict[str, List[Dict]] = {}
+        self._played: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def path(self, key: str) -> str:
+        host = key.split(" ", 1)[1].split("/", 1)[0].replace(":", "_")
+        digest = hashlib.sha1(key.encode()).hexdigest()[:20]
+        return os.path.join(self.directory, host, f"{digest}.json")
+
+    def _load(self, key: str) -> List[Dict]:
+        if key not in self._cassettes:
+            try:
+                with open(self.path(key), encoding="utf-8") as f:
+                    self._cassettes[key] = json.load(f)["responses"]
+            except FileNotFoundError:
+                self._cassettes[key] = []
+        return self._cassettes[key]
+
+    def record(self, key: str, status: int, headers, body: str):
+        response = {
+            "status": status,
+            "headers": {h: headers[h] for h in KEPT_HEADERS if h in headers},
+            "body": body,
+        }
+        with self._lock:
+            responses = self._load(key)
+            responses.append(response)
+            path = self.path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+                json.dump({"request": key, "responses": responses}, f, ensure_ascii=False)
+            os.replace(f"{path}.tmp", path)
+
+    def play(self, key: str) -> Optional[Dict]:
+        """Next recorded response of a request (in turn), or None if it was never recorded"""
+        with self._lock:
+            responses = self._load(key)
+            if not responses:
+                return None
+            played = self._played.get(key, 0)
+            self._played[key] = played + 1
+            return responses[played % len(responses)]
+
+
+def _rate_limited_response(conditions: ReplayConditions) -> Dict:
+    headers = {"Content-Type": "text/plain"}
+    if conditions.retry_after is not None:
+        headers["Retry-After"] = conditions.retry_after
+    return {"status": 429, "headers": headers, "body": "Too many requests (replayed)"}
+
+
+# requests
+
+
+class RecordingAdapter(HTTPAdapter):
+    """Sends requests to the network and records their responses"""
+
+    def __init__(self, store: CassetteStore):
+        super().__init__()
+        self.store = store
+
+    def send(self, request, **kwargs):
+        response = super().send(request, **kwargs)
+        key = request_key(request.method, request.url)
+        self.store.record(key, response.status_code, response.headers, response.text)
+        return response
+
+
+class ReplayAdapter(BaseAdapter):
+    """Answers requests from the cassettes, without network"""
+
+    def __init__(self, store: CassetteStore, conditions: ReplayConditions):
+        super().__init__()
+        self.store = store
+        self.conditions = conditions
+
+    def send(self, request, **kwargs):
+        time.sleep(self.conditions.delay())
+        key = request_key(request.method, request.url)
+        if self.conditions.is_rate_limited():
+            recorded = _rate_limited_response(self.conditions)
+        else:
+            recorded = self.store.play(key)
+        if recorded is None:
+            raise requests.ConnectionError(f"No recorded response for {key}", request=request)
+
+        response = requests.Response()
+        response.status_code = recorded["status"]
+        response.headers = requests.structures.CaseInsensitiveDict(recorded["headers"])
+        response._content = recorded["body"].encode()
+        response.encoding = "utf-8"
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+# aiohttp
+
+
+class ReplayResponse:
+    """The part of aiohttp.ClientResponse used by wiki_api, on a recorded response"""
+
+    def __init__(self, method: str, url: str, recorded: Dict):
+        self.method = method
+        self.url = URL(url)
+        self.status = recorded["status"]
+        self.headers = CIMultiDictProxy(CIMultiDict(recorded["headers"]))
+        self._body = recorded["body"]
+
+    async def text(self) -> str:
+        return self._body
+
+    async def json(self):
+        return json.loads(self._body)
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            raise aiohttp.ClientResponseError(
+                aiohttp.RequestInfo(self.url, self.method, self.headers, self.url),
+                (),
+                status=self.status,
+                message=self._body[:100],
+                headers=self.headers,
+            )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class _Request:
+    """Awaitable and async context manager, as aiohttp's session.get()"""
+
+    def __init__(self, coroutine):
+        self._coroutine = coroutine
+
+    def __await__(self):
+        return self._coroutine.__await__()
+
+    async def __aenter__(self):
+        self._response = await self._coroutine
+        return self._response
+
+    async def __aexit__(self, *exc):
+        release = getattr(self._response, "release", None)
+        if release is not None:
+            release()
+        return False
+
+
+class RecordingSession:
+    """aiohttp session recording the responses of its GET requests"""
+
+    def __init__(self, store: CassetteStore, **kwargs):
+        self.store = store
+        self._session = aiohttp.ClientSession(**kwargs)
+
+    def get(self, url: str, *, params=None, **kwargs) -> _Request:
+        return _Request(self._get(url, params, **kwargs))
+
+    async def _get(self, url, params, **kwargs):
+        response = await self._session.get(url, params=params, **kwargs)
+        body = await response.text()  # Read now, so that it stays readable after recording
+        self.store.record(request_key("GET", url, params), response.status, response.headers, body)
+        return response
+
+    async def close(self):
+        await self._session.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+
+class ReplaySession:
+    """Stand-in for aiohttp.ClientSession answering GET requests from the cassettes"""
+
+    def __init__(self, store: CassetteStore, conditions: ReplayConditions, **kwargs):
+        self.store = store
+        self.conditions = conditions
+
+    def get(self, url: str, *, params=None, **kwargs) -> _Request:
+        return _Request(self._get(url, params))
+
+    async def _get(self, url, params):
+        await asyncio.sleep(self.conditions.delay())
+        key = request_key("GET", url, params)
+        if self.conditions.is_rate_limited():
+            recorded = _rate_limited_response(self.conditions)
+        else:
+            recorded = self.store.play(key)
+        if recorded is None:
+            raise aiohttp.ClientConnectionError(f"No recorded response for {key}")
+        return ReplayResponse("GET", url, recorded)
+
+    async def close(self):
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+# Configuration
+
+_mode = os.environ.get("PEDANTIX_TRANSPORT", HTTP_TRANSPORT)
+_store = CassetteStore(os.environ.get("PEDANTIX_CASSETTES", CASSETTE_DIR))
+_conditions = ReplayConditions()
+_sessions = threading.local()  # One requests session per thread, as sessions are not thread-safe
+
+
+def configure(
+    mode: Optional[str] = None,
+    directory: Optional[str] = None,
+    conditions: Optional[ReplayConditions] = None,
+):
+    """Change the transport at runtime (e.g. from a benchmark)"""
+    global _mode, _store, _conditions
+    if mode is not None:
+        if mode not in MODES:
+            raise ValueError(f"Unknown transport {mode}, expected one of {MODES}")
+        _mode = mode
+    if directory is not None:
+        _store = CassetteStore(directory)
+    if conditions is not None:
+        _conditions = conditions
+
+
+def current() -> Tuple[str, str]:
+    return _mode, _store.directory
+
+
+def http() -> requests.Session:
+    """requests session of the current thread, using the configured transport"""
+    session = getattr(_sessions, "session", None)
+    if session is None or _sessions.config != (_mode, _store, _conditions):
+        session = requests.Session()
+        if _mode == "record":
+            session.mount("https://", RecordingAdapter(_store))
+            session.mount("http://", RecordingAdapter(_store))
+        elif _mode == "replay":
+            session.mount("https://", ReplayAdapter(_store, _conditions))
+            session.mount("http://", ReplayAdapter(_store, _conditions))
+        _sessions.session, _sessions.config = session, (_mode, _store, _conditions)
+    return session
+
+
+def client_session(**kwargs):
+    """aiohttp session (or stand-in) using the configured transport"""
+    if _mode == "record":
+        return RecordingSession(_store, **kwargs)
+    if _mode == "replay":
+        return ReplaySession(_store, _conditions, **kwargs)
+    return aiohttp.ClientSession(**kwargs)
@@ -0,0 +1,117 @@
+"""What clients of the game server are sent: the layout of the masked article once, then the
+views of the word types each guess changed. Hidden words are never sent."""
+
+from dataclasses import asdict
+from typing import Any, Dict, List
+
+import numpy as np
+
+from game.embedding_utils import text_gaps
+from game.engine import Game
+from game.game_logic import feedback_for
+
+UNKNOWN_GAME = "Unknown game"
+
+
+class GameView:
+    """A game played by a remote client, and the word states the client was last sent"""
+
+    def __init__(self, game_id: str, game: Game):
+        self.id = game_id
+        self.game = game
+        self.sections = {"t": game.title_words, "a": game.article_words}
+        self.sent = {
+            prefix: words.best_similarity.copy() for prefix, words in self.sections.items()
+        }
+
+    def word_view(self, prefix: str, t: int) -> List:
+        """[type id, kind, shown text, similarity]: hidden words are never sent"""
+        words = self.sections[prefix]
+        normalized = words.normalized[t]
+        if normalized in self.game.revealed:
+            return [t, "found", words.words[t]]
+        if normalized in self.game.revealed_end:
+            return [t, "end", words.words[t]]
+        if words.best_guess[t]:
+            return [t, "guess", words.best_guess[t], round(float(words.best_similarity[t]), 3)]
+        return [t, "hidden"]
+
+    def changes(self) -> Dict[str, List]:
+        """Views of the word types whose state changed since the last call"""
+        changes = {}
+        for prefix, words in self.sections.items():
+            changed = np.flatnonzero(words.best_similarity != self.sent[prefix])
+            self.sent[prefix][:] = words.best_similarity
+            changes[prefix] = [self.word_view(prefix, int(t)) for t in changed]
+        return changes
+
+    def over(self) -> bool:
+        return self.game.won or bool(self.game.revealed_end)
+
+    def article(self) -> Dict[str, str]:
+        return {"title": self.game.article.title, "url": self.game.article.url}
+
+    def snapshot(self) -> Dict[str, Any]:
+        game = self.game
+        snapshot = {
+            "id": self.id,
+            "language": game.language,
+            "layout": {
+                prefix: {
+                    "gaps": text_gaps(words, text),
+                    "types": words.type_ids.tolist(),
+                    "lengths": [len(word) for word in words.words],
+                }
+                for (prefix, words), text in zip(
+                    self.sections.items(), (game.article.title, game.article.text)
+                )
+            },
+            "words": {
+                prefix: [self.word_view(prefix, t) for t in range(words.nb_types)]
+                for prefix, words in self.sections.items()
+            },
+            "guesses": len(game.guesses),
+            "won": game.won,
+        }
+        if self.over():
+            snapshot["article"] = self.article()
+        return snapshot
+
+    def play(self, word: str) -> Dict[str, Any]:
+        if self.over():
+            return {"error": "Game over"}
+        outcome = self.game.guess(word)
+        if outcome is None:
+            return {"error": "Empty guess"}
+
+        feedback, color = feedback_for(outcome)
+        reply = {
+            "outcome": asdict(outcome),
+            "feedback": feedback,
+            "color": color,
+            "changes": self.changes(),
+            "won": outcome.won,
+        }
+        if outcome.won:
+            reply["article"] = self.article()
+        return reply
+
+    def reveal(self) -> Dict[str, Any]:
+        self.game.reveal_all()
+        changes = {
+            prefix: [
+                self.word_view(prefix, t)
+                for t, normalized in enumerate(words.normalized)
+                if normalized in self.game.revealed_end
+            ]
+            for prefix, words in self.sections.items()
+        }
+        return {"changes": changes, "won": self.game.won, "article": self.article()}
+
+
+def call_view(views, game_id: str, method: str, *args) -> Dict[str, Any]:
+    """Call a method of the view of a game, looked up by id in a views mapping"""
+    view = views.get(game_id)
+    if view is None:
+        return {"error": UNKNOWN_GAME}
+    return getattr(view, method)(*args)
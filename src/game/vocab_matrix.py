@@ -0,0 +1,121 @@
+"""Precomputed embeddings of the vocabulary words, stored as a memory-mapped .npy matrix.
+
+Build once per language (from the repository root):
+
+    PYTHONPATH=src python -m game.vocab_matrix fr [--float16]
+"""
+
+import argparse
+import os
+import time
+from typing import List, Optional
+
+import numpy as np
+
+from config import USE_COMPRESSED_MODEL, USE_DISTILLED_MODEL
+from game.embedding_utils import normalize_word
+from game.model_registry import model_registry
+from game.vocabulary import get_vocabulary
+
+MODELS_DIR = "models"
+
+
+def model_variant() -> str:
+    """Name of the fasttext model in use, so that a matrix is never read with another model"""
+    if USE_DISTILLED_MODEL:
+        return "distilled"
+    return "mini" if USE_COMPRESSED_MODEL else "cc"
+
+
+def matrix_paths(language: str):
+    base = f"{MODELS_DIR}/vocab-{language}-{model_variant()}"
+    return f"{base}.npy", f"{base}.words.txt"
+
+
+class VocabMatrix:
+    """Normalized vectors of the vocabulary words (one row per normalized word)"""
+
+    __slots__ = ("vectors", "words", "rows")
+
+    def __init__(self, vectors: np.ndarray, words: List[str]):
+        self.vectors = vectors  # Read-only memmap shared with other processes via the page cache
+        self.words = words
+        self.rows = {word: i for i, word in enumerate(words)}
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def lookup(self, word: str) -> Optional[np.ndarray]:
+        """Return the normalized vector of a normalized word, or None if it is not in the vocabulary"""
+        row = self.rows.get(word)
+        if row is None:
+            return None
+        return np.asarray(self.vectors[row], dtype=np.float32)
+
+
+def build_vocab_matrix(language: str, model, dtype=np.float32) -> VocabMatrix:
+    """Embed every vocabulary word with the model and write the matrix and its word index"""
+    words = list(dict.fromkeys(normalize_word(w) for w in get_vocabulary(language)))
+
+    vectors = np.array([model[word] for word in words], dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors = np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+    matrix_path, words_path = matrix_paths(language)
+    os.makedirs(MODELS_DIR, exist_ok=True)
+    np.save(matrix_path, vectors.astype(dtype))
+    with open(words_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(words))
+
+    return VocabMatrix(vectors.astype(dtype), words)
+
+
+def _open_vocab_matrix(language: str) -> Optional[VocabMatrix]:
+    matrix_path, words_path = matrix_paths(language)
+    if not (os.path.exists(matrix_path) and os.path.exists(words_path)):
+        return None
+
+    vectors = np.load(matrix_path, mmap_mode="r")
+    with open(words_path, encoding="utf-8") as f:
+        words = f.read().split("\n")
+
+    if len(words) != vectors.shape[0]:
+        print(f"Ignoring {matrix_path}: {vectors.shape[0]} rows for {len(words)} words")
+        return None
+    return VocabMatrix(vectors, words)
+
+
+def get_vocab_matrix(language: str) -> Optional[VocabMatrix]:
+    """Return the memory-mapped vocabulary matrix of a language, or None if it was not built"""
+    return model_registry.get("vocab_matrix", language, lambda: _open_vocab_matrix(language))
+
+
+def set_vocab_matrix(language: str, matrix: Optional[VocabMatrix]):
+    """Use this matrix for a language instead of the file (None disables lookups), e.g. to
+    benchmark with a fixed model"""
+    model_registry.put("vocab_matrix", language, matrix, pinned=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute the vocabulary embedding matrix")
+    parser.add_argument("languages", nargs="+", choices=["fr", "en"])
+    parser.add_argument("--float16", action="store_true", help="Halve the size of the matrix")
+    args = parser.parse_args()
+
+    from game.models import load_fasttext_model
+
+    for language in args.languages:
+        start = time.perf_counter()
+        matrix = build_vocab_matrix(
+            language,
+            load_fasttext_model(language),
+            dtype=np.float16 if args.float16 else np.float32,
+        )
+        print(
+            f"{language}: {len(matrix)} words, {matrix.vectors.nbytes / 1e6:.1f} MB "
+            f"in {time.perf_counter() - start:.1f}s -> {matrix_paths(language)[0]}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+import threading
+from typing import Dict, Iterator, Tuple
+
+VOCAB_PATH = "vocab/words_{language}.txt"
+
+_vocabularies: Dict[str, "Vocabulary"] = {}
+_vocab_lock = threading.Lock()
+
+
+class Vocabulary:
+    """Immutable word list of a language, loaded once per process and shared by all sessions."""
+
+    __slots__ = ("language", "words", "word_set")
+
+    def __init__(self, language: str, words: Tuple[str, ...]):
+        self.language = language
+        self.words = words  # Tuple keeps the table immutable and avoids list over-allocation
+        self.word_set = frozenset(words)
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.words)
+
+    def __contains__(self, word: str) -> bool:
+        return word in self.word_set
+
+
+def _read_vocabulary(language: str) -> Vocabulary:
+    with open(VOCAB_PATH.format(language=language), encoding="utf-8") as f:
+        words = tuple(word for word in (line.strip() for line in f) if word)
+    return Vocabulary(language, words)
+
+
+def get_vocabulary(language: str) -> Vocabulary:
+    """Return the shared vocabulary of a language, reading the word file on first use only"""
+    vocabulary = _vocabularies.get(language)
+    if vocabulary is None:
+        with _vocab_lock:
+            vocabulary = _vocabularies.get(language)
+            if vocabulary is None:
+                vocabulary = _read_vocabulary(language)
+                _vocabularies[language] = vocabulary
+    return vocabulary
@@ -0,0 +1,175 @@
+"""Background warmup of what the first game needs, while the player is on the menus.
+
+The language menu only imports Streamlit and the UI helpers; everything else (game logic,
+HTTP clients, numpy, models, the classifier) is loaded here, in a single background thread,
+most urgent first:
+
+    0. the modules of the game screens (game logic, Wikipedia API, packs)
+    1. once a language is clicked: its fasttext model, vocabulary and classifier
+    2. the fasttext model and vocabulary of the likely language (browser locale)
+    3. the classifier's ML libraries (sentence-transformers, xgboost, ~7s)
+
+Models are primed by a small inference, so that the first game doesn't pay for the lazy
+allocations either. A task scheduled again with a more urgent priority (the language the
+player clicked) moves up the queue, and the game loader calls wait_for() before using a
+model: it waits for a load in flight, or runs a load still queued itself, instead of
+loading the model a second time. The thread runs niced where the OS allows it, so that it
+yields the CPU to the rendering sessions. Disabled by config.WARMUP or PEDANTIX_WARMUP=0.
+"""
+
+import heapq
+import itertools
+import os
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional, Tuple
+
+from config import WARMUP
+from game.tracing import span
+
+MODULES, LANGUAGE, LIKELY_LANGUAGE, CLASSIFIER = range(4)  # Priorities, most urgent first
+LANGUAGES = ("fr", "en")
+PRIMING_TEXT = {"fr": "Paris est la capitale de la France.", "en": "London is a city."}
+WARMUP_NICENESS = 10
+
+_enabled = os.environ.get("PEDANTIX_WARMUP", "1" if WARMUP else "0") != "0"
+
+
+def _import_game_modules():
+    # Not the Streamlit components (ui.article_component, streamlit_searchbox): they register
+    # with the runtime when imported, which only works from a script thread
+    import game.game_logic  # noqa: F401  (aiohttp, requests, numpy, bs4, regex)
+    import game.packs  # noqa: F401
+    import ui.display_article  # noqa: F401
+
+
+def _load_model(language: str):
+    from game.embedding_utils import tokenize_text
+    from game.models import load_fasttext_model
+
+    tokenize_text(PRIMING_TEXT[language], load_fasttext_model(language))
+
+
+def _load_vocabulary(language: str):
+    from game.vocab_matrix import get_vocab_matrix
+    from game.vocabulary import get_vocabulary
+
+    get_vocabulary(language)
+    get_vocab_matrix(language)
+
+
+def _load_classifier(language: str):
+    from game.classifier import preload
+
+    preload(language, PRIMING_TEXT[language])
+
+
+def _import_classifier():
+    import game.classifier  # noqa: F401  (sentence_transformers, xgboost, sklearn, ...)
+
+
+class WarmupQueue:
+    """Tasks run once each by a background thread, by priority then order of scheduling, with
+    a future per task"""
+
+    def __init__(self):
+        self._heap: List[Tuple[int, int, str]] = []
+        self._tasks: Dict[str, Callable[[], None]] = {}  # Pending tasks
+        self._priorities: Dict[str, int] = {}  # Best priority of each pending task
+        self._futures: Dict[str, Future] = {}  # Every task scheduled
+        self._order = itertools.count()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def schedule(self, name: str, task: Callable[[], None], priority: int) -> Future:
+        """Run task once in the background; scheduling it again can only make it more urgent"""
+        with self._lock:
+            future = self._futures.setdefault(name, Future())
+            if future.done() or future.running():
+                return future
+            if self._priorities.get(name, priority + 1) <= priority:
+                return future
+            self._tasks[name] = task
+            self._priorities[name] = priority
+            heapq.heappush(self._heap, (priority, next(self._order), name))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="warmup", daemon=True)
+                self._thread.start()
+            return future
+
+    def _take(self, name: str) -> Optional[Callable[[], None]]:
+        """Remove a pending task from the queue to run it (its heap entries are then skipped)"""
+        del self._priorities[name]
+        self._futures[name].set_running_or_notify_cancel()
+        return self._tasks.pop(name)
+
+    def _next(self) -> Optional[Tuple[str, Callable[[], None]]]:
+        with self._lock:
+            while self._heap:
+                priority, _, name = heapq.heappop(self._heap)
+                if self._priorities.get(name) != priority:
+                    continue  # Already run, or rescheduled with a better priority
+                return name, self._take(name)
+            self._thread = None
+            return None
+
+    def _execute(self, name: str, task: Callable[[], None]):
+        future = self._futures[name]
+        try:
+            with span("warmup", task=name):
+                task()
+        except Exception as e:
+            print(f"Warmup of {name} failed: {e}")
+            future.set_exception(e)
+        else:
+            future.set_result(None)
+
+    def _run(self):
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), WARMUP_NICENESS)
+        except (AttributeError, OSError):
+            pass  # Not Linux (the niceness of a thread is per process elsewhere)
+        while (item := self._next()) is not None:
+            self._execute(*item)
+
+    def wait_for(self, name: str):
+        """Wait for a task in flight, or run it in this thread if still queued. Returns at
+        once if it was never scheduled; failures are left to the caller's own load"""
+        with self._lock:
+            future = self._futures.get(name)
+            task = self._take(name) if name in self._priorities else None
+        if task is not None:
+            self._execute(name, task)
+        if future is not None:
+            future.exception()  # Waits, without raising
+
+
+_queue = WarmupQueue()
+
+
+def warmup(language: Optional[str] = None, picked: bool = False):
+    """Schedule the warmup of the game, and of a language if given: the one the player is
+    likely to pick, or the one they just picked (then its classifier too, before anything
+    else still pending). Never touches Streamlit APIs, as the thread has no ScriptRunContext"""
+    if not _enabled:
+        return
+    _queue.schedule("modules", _import_game_modules, MODULES)
+    if language in LANGUAGES:
+        priority = LANGUAGE if picked else LIKELY_LANGUAGE
+        _queue.schedule(f"model:{language}", lambda: _load_model(language), priority)
+        _queue.schedule(f"vocabulary:{language}", lambda: _load_vocabulary(language), priority)
+        if picked:
+            _queue.schedule(f"classifier:{language}", lambda: _load_classifier(language), priority)
+    _queue.schedule("classifier", _import_classifier, CLASSIFIER)
+
+
+def wait_for(name: str):
+    """Wait for the warmup of "model:<language>", "vocabulary:<language>" or
+    "classifier:<language>" if it is in flight (see WarmupQueue.wait_for)"""
+    _queue.wait_for(name)
+
+
+def language_from_locale(locale: Optional[str]) -> Optional[str]:
+    """Language of the game matching a browser locale (e.g. "fr-FR"), if any"""
+    language = (locale or "").split("-")[0].split("_")[0].lower()
+    return language if language in LANGUAGES else None
@@ -1,3 +1,4 @@
+import asyncio
 import re
 import time
 from datetime import datetime, timedelta
@@ -9,6 +10,10 @@ from bs4 import BeautifulSoup
 
 from classes import WikipediaPage
 from config import EXCLUDE_STARTS, MIN_WORDS, NB_DAYS
+from game.corpus import get_corpus
+from game.metrics import WIKIPEDIA_REQUESTS
+from game.tracing import span
+from game.transport import http
 
 # Wikimedia's User-Agent policy rate-limits generic agents more aggressively,
 # so we identify the app with a contact URL as recommended.
@@ -23,6 +28,10 @@ async def fetch_random_titles(
     session: aiohttp.ClientSession, language: str, count: int
 ) -> list[str]:
     """Fetch multiple random Wikipedia page titles in a single API call (max 500)."""
+    corpus = get_corpus()
+    if corpus is not None:
+        return corpus.random_titles(language, count)
+
     url = f"https://{language}.wikipedia.org/w/api.php"
     params = {
         "action": "query",
@@ -32,6 +41,7 @@ async def fetch_random_titles(
         "format": "json",
     }
     async with session.get(url, params=params, headers=headers) as response:
+        WIKIPEDIA_REQUESTS.inc(endpoint="random", status=str(response.status))
         response.raise_for_status()
         data = await response.json()
         return [page["title"] for page in data["query"]["random"]]
@@ -42,6 +52,9 @@ def search_wikipedia_titles(query: str, language: str, limit: int = 10) -> list[
     query = query.strip()
     if not query:
         return []
+    corpus = get_corpus()
+    if corpus is not None:
+        return corpus.search_titles(query, language, limit)
     url = f"https://{language}.wikipedia.org/w/api.php"
     params = {
         "action": "opensearch",
@@ -51,16 +64,24 @@ def search_wikipedia_titles(query: str, language: str, limit: int = 10) -> list[
         "format": "json",
     }
     try:
-        response = requests.get(url, params=params, headers=headers)
+        response = http().get(url, params=params, headers=headers)
+        WIKIPEDIA_REQUESTS.inc(endpoint="opensearch", status=str(response.status_code))
         response.raise_for_status()
         # opensearch returns [query, [titles], [descriptions], [urls]]
         return response.json()[1]
+    except (requests.ConnectionError, requests.Timeout):
+        WIKIPEDIA_REQUESTS.inc(endpoint="opensearch", status="error")
+        return []
     except Exception:
         return []
 
 
 async def fetch_page_views(session: aiohttp.ClientSession, language: str, title: str) -> int:
     """Get total page views in the last NB_DAYS days for a Wikipedia page asynchronously."""
+    corpus = get_corpus()
+    if corpus is not None:
+        return corpus.page_views(language, title)
+
     try:
         encoded_title = quote(title, safe="")
         end_date = datetime.now()
@@ -73,43 +94,74 @@ async def fetch_page_views(session: aiohttp.ClientSession, language: str, title:
         )
 
         async with session.get(url, headers=headers) as response:
+            WIKIPEDIA_REQUESTS.inc(endpoint="pageviews", status=str(response.status))
             if response.status == 200:
                 data = await response.json()
                 return sum(item.get("views", 0) for item in data.get("items", []))
             return 0
+    except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+        WIKIPEDIA_REQUESTS.inc(endpoint="pageviews", status="error")
+        return 0
     except Exception:
         return 0
 
 
 def fetch_wikipedia_content(title, language, max_retries=4):
     """Fetch the HTML content of a Wikipedia page, retrying on rate limits (429)."""
-    url = f"https://{language}.wikipedia.org/w/api.php"
-    params = {"action": "parse", "format": "json", "page": title, "prop": "text", "redirects": 1}
-
-    for attempt in range(max_retries):
-        response = requests.get(url, params=params, headers=headers)
-        if response.status_code == 429 and attempt < max_retries - 1:
-            # Respect Retry-After if provided, else exponential backoff.
-            retry_after = response.headers.get("Retry-After")
-            wait = float(retry_after) if retry_after else 2**attempt
-            print(f"Rate limited (429) on '{title}', retrying in {wait:.1f}s...")
-            time.sleep(wait)
-            continue
-        break
-
-    response.raise_for_status()
-    data = response.json()
-
-    if "error" in data:
-        raise Exception(f"Page not found: {data['error']['info']}")
-    parse_obj = data["parse"]
-    title = parse_obj["title"]
+    with span("fetch", title=title) as trace:
+        corpus = get_corpus()
+        if corpus is not None:
+            page = corpus.page(language, title)
+            if page is None:
+                raise Exception(f"Page not found in the offline corpus: {title}")
+            trace["source"] = "corpus"
+            # Stored as extracted at ingestion: extracting it again would alter it
+            return _page(page[0], page[1], language, extracted=True)
+
+        url = f"https://{language}.wikipedia.org/w/api.php"
+        params = {
+            "action": "parse",
+            "format": "json",
+            "page": title,
+            "prop": "text",
+            "redirects": 1,
+        }
+
+        for attempt in range(max_retries):
+            try:
+                response = http().get(url, params=params, headers=headers)
+            except (requests.ConnectionError, requests.Timeout):
+                WIKIPEDIA_REQUESTS.inc(endpoint="parse", status="error")
+                raise
+            WIKIPEDIA_REQUESTS.inc(endpoint="parse", status=str(response.status_code))
+            if response.status_code == 429 and attempt < max_retries - 1:
+                # Respect Retry-After if provided, else exponential backoff.
+                retry_after = response.headers.get("Retry-After")
+                wait = float(retry_after) if retry_after else 2**attempt
+                print(f"Rate limited (429) on '{title}', retrying in {wait:.1f}s...")
+                time.sleep(wait)
+                continue
+            break
+
+        trace["attempts"] = attempt + 1
+        trace["bytes"] = len(response.content)
+        response.raise_for_status()
+        data = response.json()
+
+        if "error" in data:
+            raise Exception(f"Page not found: {data['error']['info']}")
+        parse_obj = data["parse"]
+        return _page(parse_obj["title"], parse_obj["text"]["*"], language)
+
+
+def _page(title, html_content, language, extracted=False):
     clean_title = re.sub(r"\s*\(.*?\)", "", title)
 
     return WikipediaPage(
         title=clean_title,
-        text=parse_obj["text"]["*"],
-        url=f"https://{language}.wikipedia.org/wiki/{quote(parse_obj['title'])}",
+        text=html_content,
+        url=f"https://{language}.wikipedia.org/wiki/{quote(title)}",
+        extracted=extracted,
     )
 
 
@@ -290,44 +342,45 @@ def latex_to_plain(text):
 
 def extract_first_paragraphs(html_content, min_words=MIN_WORDS):
     """Extract text from the first paragraphs of HTML content until reaching MIN_WORDS"""
-    soup = BeautifulSoup(html_content, "html.parser")
+    with span("extract", bytes=len(html_content)) as trace:
+        soup = BeautifulSoup(html_content, "html.parser")
 
-    for tag in soup.find_all(["style", "script", "sup"]):
-        tag.decompose()
-    for tag in soup.find_all("a"):
-        if tag.get("href", "").startswith("#cite"):
+        for tag in soup.find_all(["style", "script", "sup"]):
             tag.decompose()
-
-    # Handle math formulas in spans with class 'mwe-math-element'
-    for math_span in soup.find_all("span", class_="mwe-math-element"):
-        latex_text = ""
-        img = math_span.find("img")
-        if img and img.get("alt"):
-            latex_text = img.get("alt")
-        elif math_span.find("annotation"):
-            latex_text = math_span.find("annotation").get_text()
-
-        if latex_text:
-            plain_math = latex_to_plain(latex_text)
-            math_span.replace_with(plain_math)
-
-    paragraphs = []
-    total_words = 0
-    for p in soup.find_all("p"):
-        if is_good_paragraph(p):
-            text = p.get_text()
-            text = re.sub(r"\[\d+\]|\[citation needed\]", "", text, flags=re.IGNORECASE)
-            # catch any LaTeX that wasn't inside a math span
-            text = latex_to_plain(text)
-            text = re.sub(r"\s+", " ", text).strip()
-
-            word_count = len(text.split())
-            paragraphs.append(text)
-            total_words += word_count
-
-            if total_words >= min_words:
-                break
-
-    text = "\n".join(paragraphs)
-    print(f"{text}")
-    return text
+        for tag in soup.find_all("a"):
+            if tag.get("href", "").startswith("#cite"):
+                tag.decompose()
+
+        # Handle math formulas in spans with class 'mwe-math-element'
+        for math_span in soup.find_all("span", class_="mwe-math-element"):
+            latex_text = ""
+            img = math_span.find("img")
+            if img and img.get("alt"):
+                latex_text = img.get("alt")
+            elif math_span.find("annotation"):
+                latex_text = math_span.find("annotation").get_text()
+
+            if latex_text:
+                plain_math = latex_to_plain(latex_text)
+                math_span.replace_with(plain_math)
+
+        paragraphs = []
+        total_words = 0
+        for p in soup.find_all("p"):
+            if is_good_paragraph(p):
+                text = p.get_text()
+                text = re.sub(r"\[\d+\]|\[citation needed\]", "", text, flags=re.IGNORECASE)
+                # catch any LaTeX that wasn't inside a math span
+                text = latex_to_plain(text)
+                text = re.sub(r"\s+", " ", text).strip()
+
+                word_count = len(text.split())
+                paragraphs.append(text)
+                total_words += word_count
+
+                if total_words >= min_words:
+                    break
+
+        trace["paragraphs"] = len(paragraphs)
+        trace["words"] = total_words
+        return "\n".join(paragraphs)
@@ -0,0 +1,217 @@
+"""Guess evaluation in worker processes, so that concurrent games are not limited by the GIL.
+
+Each game lives in one worker, chosen from its id: a guess only sends the game id and the
+word. The token arrays and embeddings of a page are written once to shared memory files
+that every worker maps without copying them, and the vocabulary matrix is memory-mapped the
+same way (one copy in the page cache for all processes). Guesses missing from the matrix are
+embedded by the server process, which holds the only fasttext model (see EmbeddingService).
+"""
+
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+import weakref
+import zlib
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from classes import ArticleData, ArticleIndex, WikipediaPage
+from config import ARTICLE_CACHE_SIZE
+from game.cache import LRUCache
+from game.engine import Game
+from game.models import load_fasttext_model
+from game.views import GameView, call_view
+from game.vocab_matrix import get_vocab_matrix
+from game.vocabulary import get_vocabulary
+
+SHARED_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+_ARRAYS = ("starts", "ends", "type_ids", "embeddings")
+
+
+@dataclass(frozen=True)
+class SharedArticleData:
+    """Picklable handle on ArticleData whose arrays were written to shared memory files"""
+
+    prefix: str
+    words: Tuple[str, ...]
+    normalized: Tuple[str, ...]
+
+    def paths(self) -> List[str]:
+        return [f"{self.prefix}.{name}.npy" for name in _ARRAYS]
+
+    def attach(self) -> ArticleData:
+        """Map the arrays read-only, without copying them"""
+        starts, ends, type_ids, embeddings = (np.load(p, mmap_mode="r") for p in self.paths())
+        return ArticleData(starts, ends, type_ids, self.words, self.normalized, embeddings)
+
+
+class EmbeddingService:
+    """Embeds words with the fasttext models of the server process for the workers, so that
+    each worker does not load its own copy of a model"""
+
+    def __init__(self):
+        self.authkey = os.urandom(16)
+        self.listener = Listener(authkey=self.authkey)
+        self.address = self.listener.address
+        threading.Thread(target=self._accept, name="embeddings", daemon=True).start()
+
+    def _accept(self):
+        while True:
+            try:
+                connection = self.listener.accept()
+            except OSError:  # Closed
+                return
+            threading.Thread(target=self._serve, args=(connection,), daemon=True).start()
+
+    def _serve(self, connection: Connection):
+        with connection:
+            while True:
+                try:
+                    language, word = connection.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    vector = np.asarray(load_fasttext_model(language)[word], dtype=np.float32)
+                    connection.send((vector, None))
+                except Exception as e:
+                    connection.send((None, f"{type(e).__name__}: {e}"))
+
+    def close(self):
+        self.listener.close()
+
+
+class RemoteModel:
+    """Fasttext model of the server process, seen from a worker: guesses missing from the
+    vocabulary matrix are embedded there"""
+
+    __slots__ = ("language",)
+
+    def __init__(self, language: str):
+        self.language = language
+
+    def __getitem__(self, word: str) -> np.ndarray:
+        _embeddings.send((self.language, word))
+        vector, error = _embeddings.recv()
+        if error is not None:
+            raise RuntimeError(f"Embedding {word!r} in the server process: {error}")
+        return vector
+
+
+def _remove_files(paths: List[str]):
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+# In each worker: the games routed to it, and the pages it mapped
+_views: Dict[str, GameView] = {}  # Removed with their game from GameServer.games
+_attached = LRUCache(ARTICLE_CACHE_SIZE)
+_embeddings: Optional[Connection] = None  # To the EmbeddingService of the server process
+
+
+def _init_worker(languages: Tuple[str, ...], address, authkey: bytes):
+    global _embeddings
+    _embeddings = Client(address, authkey=authkey)  # One task at a time: never shared
+    for language in languages:
+        get_vocabulary(language)
+        get_vocab_matrix(language)
+
+
+def _attach(shared: SharedArticleData) -> ArticleData:
+    return _attached.get_or_create(shared.prefix, shared.attach)
+
+
+def _add_game(
+    game_id: str,
+    language: str,
+    article: WikipediaPage,
+    article_data: SharedArticleData,
+    title_data: SharedArticleData,
+):
+    game = Game(
+        language,
+        article,
+        ArticleIndex(_attach(article_data)),
+        ArticleIndex(_attach(title_data)),
+        RemoteModel(language),
+    )
+    view = GameView(game_id, game)
+    _views[game_id] = view
+    return view.snapshot()
+
+
+def _call(game_id: str, method: str, *args):
+    return call_view(_views, game_id, method, *args)
+
+
+def _remove(game_id: str):
+    _views.pop(game_id, None)
+
+
+class GuessWorkerPool:
+    """Single-process executors, each owning the games routed to it"""
+
+    def __init__(self, workers: int, languages: Tuple[str, ...] = ()):
+        self.directory = tempfile.mkdtemp(prefix="pedantix-", dir=SHARED_DIR)
+        # The server process runs threads: workers are spawned, never forked from it
+        context = multiprocessing.get_context("spawn")
+        self.embeddings = EmbeddingService()
+        initargs = (tuple(languages), self.embeddings.address, self.embeddings.authkey)
+        self.executors = [
+            ProcessPoolExecutor(1, mp_context=context, initializer=_init_worker, initargs=initargs)
+            for _ in range(workers)
+        ]
+        self.pids = [executor.submit(os.getpid).result() for executor in self.executors]
+        self._published: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def _executor(self, game_id: str) -> ProcessPoolExecutor:
+        return self.executors[zlib.crc32(game_id.encode()) % len(self.executors)]
+
+    def publish(self, data: ArticleData) -> SharedArticleData:
+        """Write the arrays of a page to shared memory once, removed when the page is dropped"""
+        with self._lock:
+            shared = self._published.get(data)
+            if shared is None:
+                shared = SharedArticleData(
+                    os.path.join(self.directory, uuid.uuid4().hex), data.words, data.normalized
+                )
+                for name, path in zip(_ARRAYS, shared.paths()):
+                    np.save(path, getattr(data, name))
+                weakref.finalize(data, _remove_files, shared.paths())
+                self._published[data] = shared
+        return shared
+
+    def add(self, game_id: str, game: Game) -> Future:
+        """Hand a new game to its worker, returning its snapshot"""
+        return self._executor(game_id).submit(
+            _add_game,
+            game_id,
+            game.language,
+            game.article,
+            self.publish(game.article_words.data),
+            self.publish(game.title_words.data),
+        )
+
+    def call(self, game_id: str, method: str, *args) -> Future:
+        """Call a GameView method of a game in its worker"""
+        return self._executor(game_id).submit(_call, game_id, method, *args)
+
+    def remove(self, game_id: str):
+        """Drop a game from its worker"""
+        self._executor(game_id).submit(_remove, game_id)
+
+    def shutdown(self):
+        for executor in self.executors:
+            executor.shutdown(wait=False, cancel_futures=True)
+        self.embeddings.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
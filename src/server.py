@@ -0,0 +1,290 @@
+"""Game server: HTTP and WebSocket API over the game engine, for many concurrent players.
+
+    python src/server.py [--port 8080] [--threads 8 | --workers 8] [--preload fr en]
+
+Endpoints (JSON bodies and responses):
+    POST /games                 {"language": "fr", "title": "..."} (random article without title)
+    GET  /games/{id}            layout of the masked article and state of every word
+    POST /games/{id}/guess      {"guess": "..."}
+    POST /games/{id}/reveal     give up: every word is shown
+    GET  /games/{id}/ws         WebSocket sending {"guess": "..."} or {"reveal": true} messages
+    GET  /stats                 games and caches
+    GET  /metrics               Prometheus metrics (see game.metrics; guess stages are only
+                                measured in the server process, i.e. without --workers)
+
+Models, vocabularies and prepared pages are loaded once per process and shared by every
+game. Guesses are evaluated one at a time per game, in a thread pool or, with --workers, in
+worker processes sharing the pages and the vocabulary matrix (see game.workers).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+import aiohttp
+from aiohttp import web
+
+from config import SERVER_MAX_GAMES
+from game.cache import LRUCache
+from game.engine import Game, guess_vectors
+from game.game_logic import build_game_from_title, load_game, shared_articles
+from game.metrics import enable as enable_metrics
+from game.metrics import render as render_metrics
+from game.model_registry import model_registry
+from game.models import load_fasttext_model
+from game.views import UNKNOWN_GAME, GameView, call_view
+from game.vocab_matrix import matrix_paths
+from game.vocabulary import get_vocabulary
+from game.workers import GuessWorkerPool
+
+LANGUAGES = ("fr", "en")
+MAX_GUESS_LENGTH = 100
+
+
+def _error(http_error, message: str):
+    """HTTP error with a JSON body"""
+    return http_error(text=json.dumps({"error": message}), content_type="application/json")
+
+
+def _reply(reply: Dict[str, Any], status: int = 200) -> web.Response:
+    """JSON reply of a game, 404 if it was dropped while the request waited"""
+    if reply.get("error") == UNKNOWN_GAME:
+        status = 404
+    return web.json_response(reply, status=status)
+
+
+def _load_game(language: str, title: Optional[str]) -> Optional[Game]:
+    if title:
+        return build_game_from_title(title, language)
+    loaded = asyncio.run(load_game(language, print))
+    return loaded[0] if loaded else None
+
+
+class GameSession:
+    """A game played through the server (its state lives in the pool evaluating it)"""
+
+    def __init__(self, language: str):
+        self.id = uuid.uuid4().hex
+        self.language = language
+        self.lock = asyncio.Lock()  # Guesses of a game are evaluated one at a time
+
+
+class ThreadGames:
+    """Games evaluated by a thread pool of the server process"""
+
+    def __init__(self, threads: int):
+        self.views: Dict[str, GameView] = {}  # Removed with their game from GameServer.games
+        self.executor = ThreadPoolExecutor(threads, thread_name_prefix="guess")
+
+    def add(self, game_id: str, game: Game) -> Future:
+        view = GameView(game_id, game)
+        self.views[game_id] = view
+        return self.executor.submit(view.snapshot)
+
+    def call(self, game_id: str, method: str, *args) -> Future:
+        return self.executor.submit(call_view, self.views, game_id, method, *args)
+
+    def remove(self, game_id: str):
+        self.views.pop(game_id, None)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class GameServer:
+    """Games in play and the pools evaluating them"""
+
+    def __init__(self, threads: int, workers: int = 0, languages: Tuple[str, ...] = ()):
+        self.pool = GuessWorkerPool(workers, languages) if workers else ThreadGames(threads)
+        # Evicted games are dropped from their pool too, so that the two never disagree
+        self.games = LRUCache(
+            SERVER_MAX_GAMES, on_evict=lambda game_id, _: self.pool.remove(game_id)
+        )
+        # Loading a page waits on Wikipedia: kept apart so that it never delays guesses
+        self.loader = ThreadPoolExecutor(4, thread_name_prefix="load")
+
+    async def create(self, language: str, title: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Start a game and return its snapshot, or None if no article could be loaded"""
+        loop = asyncio.get_running_loop()
+        game = await loop.run_in_executor(self.loader, _load_game, language, title)
+        if game is None:
+            return None
+        session = GameSession(language)
+        snapshot = await asyncio.wrap_future(self.pool.add(session.id, game))
+        self.games.put(session.id, session)
+        return snapshot
+
+    def session(self, request: web.Request) -> GameSession:
+        session = self.games.get(request.match_info["id"])
+        if session is None:
+            raise _error(web.HTTPNotFound, UNKNOWN_GAME)
+        return session
+
+    async def call(self, session: GameSession, method: str, *args) -> Dict[str, Any]:
+        async with session.lock:
+            return await asyncio.wrap_future(self.pool.call(session.id, method, *args))
+
+    async def guess(self, session: GameSession, word) -> Dict[str, Any]:
+        if not isinstance(word, str) or len(word) > MAX_GUESS_LENGTH:
+            return {"error": "Invalid guess"}
+        return await self.call(session, "play", word)
+
+    def shutdown(self):
+        self.pool.shutdown()
+        self.loader.shutdown(wait=False, cancel_futures=True)
+
+
+SERVER = web.AppKey("server", GameServer)
+
+
+async def _json_body(request: web.Request) -> Dict[str, Any]:
+    if not request.can_read_body:
+        return {}
+    try:
+        body = await request.json()
+    except ValueError:
+        raise _error(web.HTTPBadRequest, "Invalid JSON body")
+    if not isinstance(body, dict):
+        raise _error(web.HTTPBadRequest, "Expected a JSON object")
+    return body
+
+
+async def create_game(request: web.Request) -> web.Response:
+    body = await _json_body(request)
+    language = body.get("language", "fr")
+    if language not in LANGUAGES:
+        raise _error(web.HTTPBadRequest, f"Language must be one of {', '.join(LANGUAGES)}")
+
+    title = body.get("title")
+    if title is not None and not isinstance(title, str):
+        raise _error(web.HTTPBadRequest, "Title must be a string")
+
+    snapshot = await request.app[SERVER].create(language, title)
+    if snapshot is None:
+        raise _error(web.HTTPBadGateway, "Could not load an article")
+    return web.json_response(snapshot, status=201)
+
+
+async def get_game(request: web.Request) -> web.Response:
+    server = request.app[SERVER]
+    return _reply(await server.call(server.session(request), "snapshot"))
+
+
+async def guess(request: web.Request) -> web.Response:
+    server = request.app[SERVER]
+    session = server.session(request)
+    body = await _json_body(request)
+    reply = await server.guess(session, body.get("guess"))
+    return _reply(reply, status=400 if "error" in reply else 200)
+
+
+async def reveal(request: web.Request) -> web.Response:
+    server = request.app[SERVER]
+    return _reply(await server.call(server.session(request), "reveal"))
+
+
+async def game_socket(request: web.Request) -> web.WebSocketResponse:
+    server = request.app[SERVER]
+    session = server.session(request)
+
+    ws = web.WebSocketResponse(heartbeat=30)
+    await ws.prepare(request)
+    await ws.send_json(await server.call(session, "snapshot"))
+
+    async for msg in ws:
+        if msg.type != aiohttp.WSMsgType.TEXT:
+            continue
+        try:
+            data = json.loads(msg.data)
+        except ValueError:
+            await ws.send_json({"error": "Invalid JSON message"})
+            continue
+
+        if not isinstance(data, dict):
+            reply = {"error": "Expected a JSON object"}
+        elif "guess" in data:
+            reply = await server.guess(session, data["guess"])
+        elif data.get("reveal"):
+            reply = await server.call(session, "reveal")
+        else:
+            reply = {"error": "Expected a guess or reveal message"}
+
+        if isinstance(data, dict) and "request" in data:
+            reply["request"] = data["request"]  # Lets clients match replies to messages
+        await ws.send_json(reply)
+    return ws
+
+
+async def stats(request: web.Request) -> web.Response:
+    return web.json_response(
+        {
+            "games": request.app[SERVER].games.stats(),
+            "articles": shared_articles.stats(),
+            "guess_vectors": guess_vectors.stats(),
+            "models": model_registry.report(),
+        }
+    )
+
+
+async def metrics(request: web.Request) -> web.Response:
+    return web.Response(text=render_metrics(), content_type="text/plain", charset="utf-8")
+
+
+def create_app(threads: int, workers: int = 0, languages=()) -> web.Application:
+    enable_metrics()
+    app = web.Application()
+    app[SERVER] = GameServer(threads, workers, tuple(languages))
+    app.router.add_post("/games", create_game)
+    app.router.add_get("/games/{id}", get_game)
+    app.router.add_post("/games/{id}/guess", guess)
+    app.router.add_post("/games/{id}/reveal", reveal)
+    app.router.add_get("/games/{id}/ws", game_socket)
+    app.router.add_get("/stats", stats)
+    app.router.add_get("/metrics", metrics)
+
+    async def _shutdown(app: web.Application):
+        app[SERVER].shutdown()
+
+    app.on_cleanup.append(_shutdown)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pedantix game server")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--threads", type=int, default=os.cpu_count(), help="Guess evaluation")
+    parser.add_argument(
+        "--workers", type=int, default=0, help="Evaluate guesses in processes instead of threads"
+    )
+    parser.add_argument(
+        "--preload", nargs="*", choices=LANGUAGES, default=[], help="Load models at startup"
+    )
+    args = parser.parse_args()
+
+    if args.workers:
+        languages = args.preload or LANGUAGES
+        missing = [lang for lang in languages if not os.path.exists(matrix_paths(lang)[0])]
+        if missing:
+            print(
+                f"WARNING: no vocabulary matrix for {', '.join(missing)}: with --workers, every "
+                "guess of these languages is embedded by the server process, one at a time. "
+                f"Build it with: PYTHONPATH=src python -m game.vocab_matrix {' '.join(missing)}"
+            )
+
+    for language in args.preload:
+        load_fasttext_model(language)
+        get_vocabulary(language)
+        print(f"Preloaded {language}")
+
+    web.run_app(
+        create_app(args.threads, args.workers, args.preload), host=args.host, port=args.port
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""Masked article as a custom Streamlit component updated by diffs.
+
+The browser receives the layout of the game once (text between words, word types and
+lengths, never the hidden words), then for each guess only the word types whose display
+changed. If the component lost track (reload, missed diff), it asks for a full resync
+through its value.
+"""
+
+from __future__ import annotations
+
+import os
+import uuid
+import weakref
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+import streamlit as st
+import streamlit.components.v1 as components
+
+import ui.ui_components as ui
+from game.embedding_utils import normalize_word, text_gaps
+from ui.display_article import similarity_color, word_state
+
+if TYPE_CHECKING:
+    from classes import ArticleIndex
+    from game.engine import Game
+
+_FRONTEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "frontend", "article")
+_component = components.declare_component("pedantix_article", path=_FRONTEND_DIR)
+COMPONENT_KEY = "article_component"
+
+# Feed of each displayed game, dropped with the game
+_feeds: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+
+def _change(words: ArticleIndex, word_id: str, t: int, state: tuple) -> List:
+    """[word id, kind, shown text, color]: hidden words are only sent as their length"""
+    kind = state[0]
+    if kind == "guess":
+        _, best_guess, best_similarity, is_last_guess = state
+        return [word_id, kind, best_guess, similarity_color(best_similarity, is_last_guess)]
+    if kind == "hidden":
+        return [word_id, kind, "", ""]
+    return [word_id, kind, words.words[t], "#D67DDF" if kind == "end" else ""]
+
+
+def _sections(game: Game) -> List[tuple]:
+    """(prefix, ArticleIndex, source text) of each displayed text of a game"""
+    return [
+        ("t", game.title_words, game.article.title),
+        ("a", game.article_words, game.article.text),
+    ]
+
+
+class ArticleFeed:
+    """Server side of the component: tracks what the browser shows and builds the diffs.
+    Sections are passed to each call: keeping them would keep the ArticleIndex that is the
+    weak key of the feed in _feeds"""
+
+    def __init__(self):
+        self.game = uuid.uuid4().hex
+        self.states: Dict[str, tuple] = {}
+        self.version = 0
+        self.message: Optional[Dict[str, Any]] = None  # Last message sent to the browser
+        self.handled_request = None  # Last resync request of the browser we answered
+
+    def layout(self, sections: List[tuple]) -> Dict[str, Any]:
+        return {
+            "style": ui.get_article_style(),
+            "sections": [
+                {
+                    "prefix": prefix,
+                    "gaps": text_gaps(words, text),
+                    "types": words.type_ids.tolist(),
+                    "lengths": [len(word) for word in words.words],
+                }
+                for prefix, words, text in sections
+            ],
+        }
+
+    def update(self, sections, revealed, revealed_end, last_guess, value) -> Dict[str, Any]:
+        last_norm = normalize_word(last_guess) if last_guess else None
+
+        changes = []
+        for prefix, words, _ in sections:
+            for t in range(words.nb_types):
+                word_id = f"{prefix}{t}"
+                state = word_state(words, t, revealed, revealed_end, last_norm)
+                if state != self.states.get(word_id):
+                    self.states[word_id] = state
+                    changes.append(_change(words, word_id, t, state))
+
+        if changes:
+            self.version += 1
+
+        resync = value is not None and value.get("request") != self.handled_request
+        if resync or self.message is None:
+            if resync:
+                self.handled_request = value.get("request")
+            self.message = {
+                "game": self.game,
+                "version": self.version,
+                "layout": self.layout(sections),
+                "changes": [
+                    _change(words, f"{prefix}{t}", t, self.states[f"{prefix}{t}"])
+                    for prefix, words, _ in sections
+                    for t in range(words.nb_types)
+                ],
+            }
+        elif changes:
+            self.message = {
+                "game": self.game,
+                "base": self.version - 1,
+                "version": self.version,
+                "changes": changes,
+            }
+        return self.message
+
+
+def article_component(game: Game):
+    feed = _feeds.get(game.article_words)
+    if feed is None:
+        feed = ArticleFeed()
+        _feeds[game.article_words] = feed
+
+    last_guess = game.guesses[-1] if game.guesses else None
+    value = st.session_state.get(COMPONENT_KEY)  # Resync request sent by the browser, if any
+    message = feed.update(_sections(game), game.revealed, game.revealed_end, last_guess, value)
+    _component(message=message, key=COMPONENT_KEY, default=None)
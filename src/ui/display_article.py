@@ -1,141 +1,165 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, List
+import html
+import weakref
+from typing import TYPE_CHECKING, List, Optional, Set, Tuple
 
 import streamlit as st
 
+import ui.ui_components as ui
 from config import SIMILARITY_THRESHOLD
-from game.embedding_utils import words_match
+from game.embedding_utils import normalize_word, normalized_words_match, text_gaps
 
 if TYPE_CHECKING:
-    from classes import SessionState, WordInfo
+    from classes import ArticleIndex
+    from game.engine import Game
+
+# Renderer of each displayed ArticleIndex, dropped with the game
+_renderers: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+
+def similarity_color(best_similarity: float, is_last_guess: bool) -> str:
+    """Color of a guess shown in a hidden word: gradient for the last guess, grayscale otherwise"""
+    norm_similarity = (best_similarity - SIMILARITY_THRESHOLD) / (1 - SIMILARITY_THRESHOLD)
+    norm_similarity = max(0, min(norm_similarity, 1))
+
+    if is_last_guess:
+        # Most recent guess: gradient for similar, green for exact
+        if norm_similarity >= 1:  # exact match
+            return "#27AE60"
+        if norm_similarity < 0.5:
+            ratio = norm_similarity / 0.5
+            red_tone = 210
+            red = int(red_tone + (254 - red_tone) * ratio)
+            green = int(255 * ratio)
+        else:
+            ratio = (norm_similarity - 0.5) / 0.5
+            red = int(255 * (1 - ratio))
+            green = 255
+        return f"rgb({red},{green},0)"
+
+    # Previous guesses: grayscale
+    gray = int(90 + 210 * norm_similarity)
+    return f"rgb({gray},{gray},{gray})"
+
+
+def word_state(
+    words: ArticleIndex,
+    t: int,
+    revealed: Set[str],
+    revealed_end: Set[str],
+    last_norm: Optional[str],
+) -> Tuple:
+    """Everything the display of a word type depends on"""
+    normalized = words.normalized[t]
+    if normalized in revealed:
+        # Words just revealed by the last guess get a strong green box
+        just_revealed = last_norm is not None and normalized_words_match(last_norm, normalized)
+        return ("new",) if just_revealed else ("found",)
+    if normalized in revealed_end:
+        return ("end",)
+    best_guess = words.best_guess[t]
+    if best_guess:
+        is_last_guess = last_norm is not None and normalized_words_match(
+            normalize_word(best_guess), last_norm
+        )
+        return ("guess", best_guess, float(words.best_similarity[t]), is_last_guess)
+    return ("hidden",)
 
 
-def build_display_parts(
-    session_state: SessionState,
-    word_list: List[WordInfo],
-    source_text: str,
-    last_guess: str,
-):
-    """Build HTML parts for displaying text with revealed/similar words (used for title or text)"""
-    parts = []
-    current_pos = 0
+class ArticleRenderer:
+    """HTML of a text with revealed/similar words, keeping the fragment of each word type and
+    rebuilding only the types whose display state changed since the previous render. It does
+    not keep the ArticleIndex, which is its key in _renderers"""
 
-    for word_info in word_list:
-        parts.append(source_text[current_pos : word_info.start])
+    def __init__(self, words: ArticleIndex, source_text: str):
+        self.gaps = text_gaps(words, source_text)
+        self.states: List[Optional[Tuple]] = [None] * words.nb_types
+        self.fragments: List[str] = [""] * words.nb_types
+        self.nb_rebuilt = 0  # Fragments rebuilt by the last render
 
-        # Determine if this word is affected by the last guess
-        is_last_guess = words_match(word_info.best_guess, last_guess)
-        # Check if the word was just fully revealed by the last guess
-        just_revealed = word_info.normalized in session_state.revealed and words_match(
-            last_guess, word_info.word
-        )
+    def fragment(self, words: ArticleIndex, t: int, state: Tuple) -> str:
+        word = words.words[t]
+        word_length = len(word)
+        kind = state[0]
 
-        if just_revealed:
-            # Strong green box + white text for newly revealed words
-            word_length = len(word_info.word)
-            box_width = f"{word_length * 0.6 + 1.6}em"
-            parts.append(f"""<span style='position: relative; display: inline-block; 
-                                                background-color: #27AE60; width: {box_width}; height: 1.2em; 
-                                                border-radius: 4px; vertical-align: middle; 
-                                                box-shadow: 0 2px 4px rgba(0,0,0,0.2);'>
-                        <span style='position: absolute; left: 50%; top: 45%; transform: translate(-50%, -50%);
-                                    color: #fff; font-weight: bold; white-space: nowrap;'>{word_info.word}</span>
-                        <span style='position: absolute; right: 3px; bottom: -1px; font-size: 0.55em; color: #bdc3c7;'>{word_length}</span>
-                    </span>""")
-
-        elif word_info.normalized in session_state.revealed:
-            # Previously revealed words: normal green bold text
-            parts.append(
-                f"<span style='color: #27AE60; font-weight: bold;'>{word_info.word}</span>"
-            )
+        if kind == "found":
+            return f"<span class='px-found'>{word}</span>"
 
-        # Check for revealed_end words that haven't been fully guessed/revealed yet
-        elif word_info.normalized in session_state.revealed_end:
-            word_length = len(word_info.word)
-            box_width = f"{word_length * 0.6 + 1.6}em"
-            color = "#D67DDF"  # Purple color for revealed_end
-            parts.append(f"""<span style='position: relative; display: inline-block; 
-                                                background-color: #2c3e50; width: {box_width}; height: 1.2em; 
-                                                border-radius: 4px; vertical-align: middle; 
-                                                box-shadow: 0 2px 4px rgba(0,0,0,0.2);'>
-                        <span style='position: absolute; left: 50%; top: 45%; transform: translate(-50%, -50%);
-                                    color: {color}; font-weight: bold; white-space: nowrap;'>{word_info.word}</span>
-                        <span style='position: absolute; right: 3px; bottom: -1px; font-size: 0.55em; color: #bdc3c7;'>{word_length}</span>
-                    </span>""")
-
-        # Words with a guess (that are NOT fully revealed or revealed_end)
-        elif word_info.best_guess:
-            # Word has a guess
-            norm_similarity = (word_info.best_similarity - SIMILARITY_THRESHOLD) / (
-                1 - SIMILARITY_THRESHOLD
+        if kind == "hidden":
+            return (
+                f"<span class='px-box' style='width:{word_length * 0.6 + 1.1:g}em'>"
+                f"<span class='px-len'>{word_length}</span></span>"
             )
-            norm_similarity = max(0, min(norm_similarity, 1))
-            guess_length = max(len(word_info.best_guess), len(word_info.word))
-            box_width = f"{guess_length * 0.6 + 1.6}em"
-
-            if is_last_guess:
-                # Most recent guess: gradient for similar, green for exact
-                if norm_similarity >= 1:  # exact match
-                    color = "#27AE60"
-                else:  # similar guess
-                    if norm_similarity < 0.5:
-                        ratio = norm_similarity / 0.5
-                        red_tone = 210
-                        red = int(red_tone + (254 - red_tone) * ratio)
-                        green = int(255 * ratio)
-                    else:
-                        ratio = (norm_similarity - 0.5) / 0.5
-                        red = int(255 * (1 - ratio))
-                        green = 255
-                    color = f"rgb({red},{green},0)"
-
-            else:
-                # Previous guesses: grayscale
-                gray = int(90 + 210 * norm_similarity)
-                color = f"rgb({gray},{gray},{gray})"
-
-            parts.append(f"""<span style='position: relative; display: inline-block; 
-                                                background-color: #2c3e50; width: {box_width}; height: 1.2em; 
-                                                border-radius: 4px; vertical-align: middle; 
-                                                box-shadow: 0 2px 4px rgba(0,0,0,0.2);'>
-                        <span style='position: absolute; left: 50%; top: 45%; transform: translate(-50%, -50%);
-                                    color: {color}; font-weight: bold; white-space: nowrap;'>{word_info.best_guess}</span>
-                        <span style='position: absolute; right: 3px; bottom: -1px; font-size: 0.55em; color: #bdc3c7;'>{len(word_info.word)}</span>
-                    </span>""")
 
+        if kind == "guess":
+            _, best_guess, best_similarity, is_last_guess = state
+            box_width = max(len(best_guess), word_length) * 0.6 + 1.6
+            shown = html.escape(best_guess)
+            style = f" style='color:{similarity_color(best_similarity, is_last_guess)}'"
         else:
-            # Not guessed yet
-            word_length = len(word_info.word)
-            box_width = f"{word_length * 0.6 + 1.1}em"
-            parts.append(f"""<span style='position: relative; display: inline-block; background-color: #2c3e50; 
-                                                width: {box_width}; height: 1.2em; border-radius: 4px; 
-                                                vertical-align: middle; 
-                                                box-shadow: 0 2px 4px rgba(0,0,0,0.2);'>
-                        <span style='position: absolute; right: 3px; bottom: -1px; font-size: 0.55em; color: #bdc3c7;'>{word_length}</span>
-                    </span>""")
-
-        current_pos = word_info.end
-
-    parts.append(source_text[current_pos:])
-    return "".join(parts)
-
-
-def display_article(session_state: SessionState):
-    last_guess = session_state.guesses[-1] if session_state.guesses else None
-    title_html = build_display_parts(
-        session_state, session_state.title_words, session_state.article.title, last_guess
-    )
-    text_html = build_display_parts(
-        session_state, session_state.article_words, session_state.article.text, last_guess
-    )
+            box_width = word_length * 0.6 + 1.6
+            shown = word
+            style = " style='color:#D67DDF'" if kind == "end" else ""
+
+        box_class = "px-box px-new" if kind == "new" else "px-box"
+        return (
+            f"<span class='{box_class}' style='width:{box_width:g}em'>"
+            f"<span class='px-word'{style}>{shown}</span>"
+            f"<span class='px-len'>{word_length}</span></span>"
+        )
+
+    def render(
+        self,
+        words: ArticleIndex,
+        revealed: Set[str],
+        revealed_end: Set[str],
+        last_guess: Optional[str],
+    ) -> str:
+        last_norm = normalize_word(last_guess) if last_guess else None
+
+        self.nb_rebuilt = 0
+        for t in range(words.nb_types):
+            state = word_state(words, t, revealed, revealed_end, last_norm)
+            if state != self.states[t]:
+                self.states[t] = state
+                self.fragments[t] = self.fragment(words, t, state)
+                self.nb_rebuilt += 1
+
+        parts = [""] * (2 * len(self.gaps) - 1)
+        parts[0::2] = self.gaps
+        parts[1::2] = [self.fragments[t] for t in words.type_ids]
+        return "".join(parts)
+
+
+def get_renderer(word_list: ArticleIndex, source_text: str) -> ArticleRenderer:
+    renderer = _renderers.get(word_list)
+    if renderer is None:
+        renderer = ArticleRenderer(word_list, source_text)
+        _renderers[word_list] = renderer
+    return renderer
+
+
+def build_display_parts(
+    game: Game,
+    word_list: ArticleIndex,
+    source_text: str,
+    last_guess: str,
+):
+    """Build HTML parts for displaying text with revealed/similar words (used for title or text)"""
+    renderer = get_renderer(word_list, source_text)
+    return renderer.render(word_list, game.revealed, game.revealed_end, last_guess)
+
+
+def display_article(game: Game):
+    last_guess = game.guesses[-1] if game.guesses else None
+    title_html = build_display_parts(game, game.title_words, game.article.title, last_guess)
+    text_html = build_display_parts(game, game.article_words, game.article.text, last_guess)
 
     st.markdown(
-        f"""
-            <div style='font-size: 1.1em; line-height: 1.8; padding: 16px 20px; 
-                        background-color: #ecf0f1; border-radius: 10px; 
-                        font-family: -apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, "Helvetica Neue", Arial, sans-serif; white-space: pre-line;'>
-                <div style='font-size: 1.3em; font-weight: bold; margin: 0 0 8px 0; line-height: 1.3;'>{title_html}</div>
+        f"""{ui.get_article_style()}
+            <div class='px-article'>
+                <div class='px-title'>{title_html}</div>
                 <div>{text_html}</div>
             </div>
             """,
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, cast
+
+import streamlit as st
+
+if TYPE_CHECKING:
+    from game.engine import Game
+
+
+class SessionState:
+    _defaults: Dict[str, Any] = {
+        "phase": "language",  # Current screen: language | mode | choose | play
+        "batch_titles": [],  # Random batch titles offered in the pass-and-play chooser
+        "language": None,  # The language we play the game with ('en' or 'fr')
+        "game": None,  # The game being played (Game type)
+        "titles": [],  # The list of potential titles that could have been chosen
+        "liked_titles": [],  # The titles that the user liked
+        "guess_input": "",  # The user's input
+        "feedback_color": "555",  # Color of the feedback
+        "feedback_content": "💡 Tapez un mot dans la barre !",  # Feedback for the last guess
+    }
+
+    def __init__(self):
+        for key, value in self._defaults.items():
+            st.session_state.setdefault(key, value)
+
+    def _get(self, key: str) -> Any:
+        return st.session_state.get(key, self._defaults[key])
+
+    def _set(self, key: str, value: Any):
+        st.session_state[key] = value
+
+    phase: str = property(
+        lambda self: cast(str, self._get("phase")), lambda self, v: self._set("phase", v)
+    )
+    batch_titles: List[str] = property(
+        lambda self: cast(List[str], self._get("batch_titles")),
+        lambda self, v: self._set("batch_titles", v),
+    )
+    language: Optional[str] = property(
+        lambda self: self._get("language"), lambda self, v: self._set("language", v)
+    )
+    game: Optional[Game] = property(
+        lambda self: self._get("game"), lambda self, v: self._set("game", v)
+    )
+    titles: List[str] = property(
+        lambda self: self._get("titles"), lambda self, v: self._set("titles", v)
+    )
+    liked_titles: List[str] = property(
+        lambda self: self._get("liked_titles"), lambda self, v: self._set("liked_titles", v)
+    )
+    guess_input: str = property(
+        lambda self: cast(str, self._get("guess_input")),
+        lambda self, v: self._set("guess_input", v),
+    )
+    feedback_color: str = property(
+        lambda self: cast(str, self._get("feedback_color")),
+        lambda self, v: self._set("feedback_color", v),
+    )
+    feedback_content: str = property(
+        lambda self: cast(str, self._get("feedback_content")),
+        lambda self, v: self._set("feedback_content", v),
+    )
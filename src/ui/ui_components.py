@@ -250,3 +250,57 @@ def get_main_menu_button():
         }
         </style>
     """
+
+
+def get_article_style():
+    return """
+        <style>
+        .px-article {
+            font-size: 1.1em;
+            line-height: 1.8;
+            padding: 16px 20px;
+            background-color: #ecf0f1;
+            border-radius: 10px;
+            font-family: -apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, "Helvetica Neue", Arial, sans-serif;
+            white-space: pre-line;
+        }
+        .px-title {
+            font-size: 1.3em;
+            font-weight: bold;
+            margin: 0 0 8px 0;
+            line-height: 1.3;
+        }
+        .px-found {
+            color: #27AE60;
+            font-weight: bold;
+        }
+        .px-box {
+            position: relative;
+            display: inline-block;
+            background-color: #2c3e50;
+            height: 1.2em;
+            border-radius: 4px;
+            vertical-align: middle;
+            box-shadow: 0 2px 4px rgba(0,0,0,0.2);
+        }
+        .px-box.px-new {
+            background-color: #27AE60;
+        }
+        .px-word {
+            position: absolute;
+            left: 50%;
+            top: 45%;
+            transform: translate(-50%, -50%);
+            color: #fff;
+            font-weight: bold;
+            white-space: nowrap;
+        }
+        .px-len {
+            position: absolute;
+            right: 3px;
+            bottom: -1px;
+            font-size: 0.55em;
+            color: #bdc3c7;
+        }
+        </style>
+    """
@@ -1,22 +1,21 @@
 import asyncio
 import json
 import os
+import random
 
 import streamlit as st
-from streamlit_searchbox import st_searchbox
 
 import ui.ui_components as ui
-from classes import SessionState
-from config import NB_ARTICLES_CLASSIFIER
-from game.game_logic import (
-    build_game_from_title,
-    fetch_ranked_candidates,
-    load_game,
-    process_guess,
-    warmup_imports,
-)
-from game.wiki_api import search_wikipedia_titles
-from ui.display_article import display_article
+from config import NB_ARTICLES_CLASSIFIER, USE_ARTICLE_COMPONENT
+from game.metrics import start_metrics_server
+from game.profiling import profile, profile_mode
+from game.tracing import span
+from game.warmup import language_from_locale, warmup
+from ui.session_state import SessionState
+
+# Only what the language menu needs is imported above, so that it paints without waiting for
+# the game modules (aiohttp, numpy, bs4, ...): these are imported by the functions using them,
+# and preloaded meanwhile by game.warmup. Check with `python -m benchmarks.startup check`.
 
 
 def save_liked_articles(titles, liked_titles, language):
@@ -43,16 +42,10 @@ def _spinner(status_text=""):
 
 def reset_game(state):
     """Return to the language menu, clearing all per-game state."""
-    state.guesses = []
-    state.revealed = set()
-    state.revealed_end = set()
-    state.game_won = False
+    state.game = None
     state.feedback_color = "555"
     state.feedback_content = "💡 Tapez un mot dans la barre !"
     state.liked_titles = []
-    state.article = None
-    state.article_words = []
-    state.title_words = []
     state.titles = []
     state.batch_titles = []
     state.language = None
@@ -60,28 +53,17 @@ def reset_game(state):
 
 
 def start_game(state, game, choices=None):
-    """Install a loaded game dict into the session and switch to the play screen.
+    """Install a loaded game into the session and switch to the play screen.
 
     `choices` are the candidate titles to rate after winning (solo mode only);
     pass-and-play leaves it empty so the article stays hidden from the player.
     """
-    state.article = game["article"]
-    state.article_words = game["article_words"]
-    state.title_words = game["title_words"]
-    state.model = game["model"]
+    state.game = game
     state.titles = choices or []
-
-    with open(f"vocab/words_{state.language}.txt", encoding="utf-8") as f:
-        state.all_words = [line.strip() for line in f]
-
     state.phase = "play"
 
 
 def render_language_menu(state):
-    # Preload heavy ML imports in the background while the user picks a language,
-    # so the first game load doesn't stall on them.
-    warmup_imports()
-
     st.markdown(ui.get_language_button(), unsafe_allow_html=True)
     st.markdown("<div style='margin-top: 20vh;'></div>", unsafe_allow_html=True)
     _, col_center, _ = st.columns([1, 2, 1])
@@ -93,16 +75,26 @@ def render_language_menu(state):
         with col1:
             if st.button("🇫🇷", use_container_width=True):
                 state.language = "fr"
+                warmup("fr", picked=True)
                 state.phase = "mode"
                 st.rerun()
         with col2:
             if st.button("🇬🇧", use_container_width=True):
                 state.language = "en"
+                warmup("en", picked=True)
                 state.phase = "mode"
                 st.rerun()
 
+    # Once the menu is painted: preload the game in the background while the player picks a
+    # language, starting with the model of the browser's language, so that the first game
+    # load doesn't stall on imports
+    warmup(language_from_locale(st.context.locale))
+
 
 def render_mode_menu(state):
+    from game.game_logic import build_game_from_pack, load_game
+    from game.packs import pack_paths, pack_sets
+
     st.markdown(ui.get_main_menu_button(), unsafe_allow_html=True)
     st.markdown("<div style='margin-top: 15vh;'></div>", unsafe_allow_html=True)
     _, col_center, _ = st.columns([1, 2, 1])
@@ -115,9 +107,10 @@ def render_mode_menu(state):
 
         if st.button("🎲 Solo (page aléatoire)", use_container_width=True):
             _spinner()
-            game = asyncio.run(load_game(state.language, _spinner))
-            if game:
-                start_game(state, game, choices=game.get("wikipedia_choices"))
+            loaded = asyncio.run(load_game(state.language, _spinner))
+            if loaded:
+                game, choices = loaded
+                start_game(state, game, choices=choices)
                 st.rerun()
             else:
                 st.error("Erreur chargement du jeu.")
@@ -126,12 +119,25 @@ def render_mode_menu(state):
             state.phase = "choose"
             st.rerun()
 
+        for name in pack_sets(state.language):
+            if st.button(f"📦 Pack de puzzles : {name}", use_container_width=True):
+                try:
+                    game = build_game_from_pack(random.choice(pack_paths(state.language, name)))
+                except Exception as e:
+                    print(f"Error loading a pack of {name}: {e}")
+                    st.error("Impossible de charger ce pack.")
+                else:
+                    start_game(state, game)
+                    st.rerun()
+
         if st.button("⬅ Changer de langue", use_container_width=True):
             reset_game(state)
             st.rerun()
 
 
 def _load_and_start(state, title):
+    from game.game_logic import build_game_from_title
+
     _spinner("Récupération de l'article...")
     game = build_game_from_title(title, state.language, _spinner)
     if game:
@@ -143,6 +149,11 @@ def _load_and_start(state, title):
 
 
 def render_chooser(state):
+    from streamlit_searchbox import st_searchbox
+
+    from game.game_logic import fetch_ranked_candidates
+    from game.wiki_api import search_wikipedia_titles
+
     st.markdown("### 👥 Choix de la page")
 
     if st.button("⬅ Retour"):
@@ -177,12 +188,21 @@ def render_chooser(state):
 
 
 def render_game(state):
+    from game.game_logic import give_hint, process_guess
+    from ui.article_component import article_component
+    from ui.display_article import display_article
+
+    game = state.game
+
     with st.sidebar:
+        if not game.won and st.button("💡 Indice", use_container_width=True):
+            state.feedback_content, state.feedback_color = give_hint(state)
+
         st.markdown("#### Mots proposés")
 
         guesses_html = ""
-        if state.guesses:
-            for i, guess in reversed(list(enumerate(state.guesses, 1))):
+        if game.guesses:
+            for i, guess in reversed(list(enumerate(game.guesses, 1))):
                 guesses_html += f"<div> <b>{i}.</b> {guess}</div>"
         else:
             guesses_html = "<div>Aucune tentative</div>"
@@ -196,21 +216,21 @@ def render_game(state):
         st.markdown(f"### Jeu en {language_map.get(state.language, state.language)}")
 
     with col2:
-        st.metric("Essais", len(state.guesses))
+        st.metric("Essais", len(game.guesses))
 
     with col3:
-        revealed_count = len(state.revealed)
-        total_unique = len(set(w.normalized for w in state.article_words))
+        revealed_count = len(game.revealed)
+        total_unique = len(set(game.article_words.normalized))
         st.metric(
             "Progression",
             f"{revealed_count}/{total_unique} ({round(revealed_count / total_unique * 100, 1)}%)",
         )
 
-    if state.game_won:
+    if game.won:
         st.markdown(ui.get_winner_style(), unsafe_allow_html=True)
 
         st.markdown(
-            ui.get_winner_bar(state.article.title, len(state.guesses), state.article.url),
+            ui.get_winner_bar(game.article.title, len(game.guesses), game.article.url),
             unsafe_allow_html=True,
         )
 
@@ -223,11 +243,7 @@ def render_game(state):
 
         with col3:
             if st.button("Afficher tout", use_container_width=True):
-                state.revealed_end.update(
-                    word_info.normalized
-                    for word_info in state.article_words
-                    if word_info.normalized not in state.revealed
-                )
+                game.reveal_all()
 
     st.markdown(
         ui.get_text_input(),
@@ -238,7 +254,9 @@ def render_game(state):
         guess = state.guess_input
         state.guess_input = ""
 
-        content, color = process_guess(guess, state)
+        # Callbacks run before main(): the profiling query parameter is applied here too
+        with profile_mode(st.query_params.get("profile")):
+            content, color = process_guess(guess, state)
         state.feedback_content = content
         state.feedback_color = color
 
@@ -256,11 +274,15 @@ def render_game(state):
         unsafe_allow_html=True,
     )
 
-    display_article(state)
+    with span("render", guesses=len(game.guesses)):
+        if USE_ARTICLE_COMPONENT:
+            article_component(game)
+        else:
+            display_article(game)
 
     _, col_center, _ = st.columns([2, 1, 2])
 
-    if state.game_won and state.titles:
+    if game.won and state.titles:
         st.markdown("### Note les autres choix potentiels de page :")
         col1, col2 = st.columns(2)
         for i, wiki_title in enumerate(state.titles):
@@ -289,15 +311,26 @@ def render_game(state):
 def main():
     state = SessionState()
     st.set_page_config(page_title="Pedantix Illimité", page_icon="🎮", layout="wide")
-
-    if state.phase == "language":
-        render_language_menu(state)
-    elif state.phase == "mode":
-        render_mode_menu(state)
-    elif state.phase == "choose":
-        render_chooser(state)
-    elif state.article and state.article_words:
-        render_game(state)
+    start_metrics_server()  # Once per process, if enabled
+
+    # Hidden ?profile=cprofile or ?profile=sampling: profile this session (see game.profiling)
+    with (
+        profile_mode(st.query_params.get("profile")),
+        profile(
+            "rerun",
+            language=state.language,
+            phase=state.phase,
+            title=state.game.article.title if state.game else None,
+        ),
+    ):
+        if state.phase == "language":
+            render_language_menu(state)
+        elif state.phase == "mode":
+            render_mode_menu(state)
+        elif state.phase == "choose":
+            render_chooser(state)
+        elif state.game:
+            render_game(state)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,15 @@
+"""Cold start of the language menu, against its budget (see benchmarks.startup)"""
+
+import pytest
+
+pytest.importorskip("streamlit.testing.v1")
+
+from benchmarks.startup import PAINT_BUDGET_MS, first_paint, problems  # noqa: E402
+
+RUNS = 3
+
+
+def test_menu_first_paint():
+    runs = [first_paint() for _ in range(RUNS)]
+    found = problems(runs, PAINT_BUDGET_MS)
+    assert not found, "\n".join(found)